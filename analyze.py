@@ -6,44 +6,51 @@ import os
 import datetime
 import time
 import json
+from contextlib import contextmanager
 from typing import List, Dict
-from bertopic import BERTopic
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
-from pymongo import MongoClient
-import torch
-
-# Check for GPU availability
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Using device: {device} ({'GPU' if torch.cuda.is_available() else 'CPU'})")
-
-# Try to import snscrape (optional, has compatibility issues with Python 3.12)
-sntwitter = None
-try:
-    import snscrape.modules.twitter as sntwitter
-except (ImportError, AttributeError):
-    # snscrape has compatibility issues with Python 3.12+
-    print("Warning: snscrape not available (Python 3.12+ compatibility issue)")
-    print("Using sample data instead")
-
-
-def scrape_twitter_data(queries: List[str], limit: int = 500) -> List[str]:
-    """Scrape tweets from Twitter using snscrape with multiple queries"""
+from mongo_store import bulk_insert, get_collection
+from rollups import update_rollups
+from burst_detector import update_burst_detector
+from near_dedup import DuplicateClusters, cluster_near_duplicates
+from encoding_pool import encode_texts, use_pool
+from model_registry import EMBEDDING_MODEL, SENTIMENT_MODEL, get_device, get_model, warmup
+from metrics import ITEMS_CLASSIFIED, POSTS_SCRAPED, start_exporter
+from profiling import configure_from_argv, print_stage_summary, reset as reset_stages, stage
+from scheduler import FixedRateScheduler
+from snscrape_stream import load_sntwitter
+
+# torch, transformers, bertopic (with umap and hdbscan) and snscrape are imported on the code paths that use them,
+# so importing this module (benchmarks, large_corpus, API routes) stays fast
+
+
+def scrape_twitter_data(queries: List[str], limit: int = 500) -> List[Dict]:
+    """
+    Scrape tweets from Twitter using snscrape with multiple queries
+    
+    Returns:
+        Post dicts with text, tweet_id, posted_at (the tweet's own date) and
+        stream (the query's search terms); sample posts only carry text
+    """
+    sntwitter = load_sntwitter()
     if sntwitter is None:
+        # snscrape has compatibility issues with Python 3.12+
+        print("Warning: snscrape not available (Python 3.12+ compatibility issue)")
         print("Using expanded sample data (snscrape not available)")
-        return get_expanded_sample_data()
+        return [{"text": text} for text in get_expanded_sample_data()]
     
     print(f"Scraping {len(queries)} different topics with {limit} posts each...")
     all_data = []
     
     for query in queries:
         print(f"\n📡 Query: {query}")
+        stream = query.split(" lang:")[0]  # Stable name for this query across runs
         data = []
         try:
             for i, tweet in enumerate(sntwitter.TwitterSearchScraper(query).get_items()):
                 if i >= limit:
                     break
-                data.append(tweet.rawContent)
+                data.append({"text": tweet.rawContent, "tweet_id": str(tweet.id), "posted_at": tweet.date,
+                             "stream": stream})
                 if (i + 1) % 50 == 0:
                     print(f"   Scraped {i + 1} tweets...")
             print(f"   ✅ Got {len(data)} tweets from this query")
@@ -52,7 +59,7 @@ def scrape_twitter_data(queries: List[str], limit: int = 500) -> List[str]:
             print(f"   ❌ Error: {e}")
     
     print(f"\n🎯 Total scraped: {len(all_data)} tweets across all queries")
-    return all_data if all_data else get_expanded_sample_data()
+    return all_data if all_data else [{"text": text} for text in get_expanded_sample_data()]
 
 
 def get_sample_data() -> List[str]:
@@ -234,13 +241,59 @@ def get_expanded_sample_data() -> List[str]:
     return all_data
 
 
-def analyze_sentiment(texts: List[str]) -> List[Dict]:
-    """Analyze sentiment using pre-trained BERT model"""
+def generate_synthetic_corpus(size: int, duplicate_rate: float = 0.2, mean_words: float = 18,
+                              length_sigma: float = 0.5, seed: int = 42) -> List[str]:
+    """
+    Synthetic corpus for benchmarks, grown from the expanded sample posts
+    
+    Args:
+        size: Number of posts to generate
+        duplicate_rate: Share of posts that are retweets / exact copies of an earlier post
+        mean_words: Median post length in words (lengths are log-normal)
+        length_sigma: Spread of the log-normal length distribution
+        seed: Random seed (the same arguments always give the same corpus)
+    
+    Returns:
+        List of post texts
+    """
+    import random
+    import math
+    
+    rng = random.Random(seed)
+    # get_expanded_sample_data lists 6 categories of 30 posts each; keep them apart so topics stay coherent
+    base = get_expanded_sample_data()
+    categories = [base[i:i + 30] for i in range(0, len(base), 30)]
+    vocabularies = [sorted({w.strip('.,!?').lower() for post in posts for w in post.split()}) for posts in categories]
+    
+    corpus = []
+    for _ in range(size):
+        if corpus and rng.random() < duplicate_rate:
+            original = rng.choice(corpus)
+            corpus.append(f"RT @user{rng.randint(1, 9999)}: {original}" if rng.random() < 0.5 else original)
+            continue
+        
+        category = rng.randrange(len(categories))
+        words = rng.choice(categories[category]).split()
+        target = max(3, min(200, int(rng.lognormvariate(math.log(mean_words), length_sigma))))
+        if target < len(words):
+            words = words[:target]
+        while len(words) < target:
+            words.append(rng.choice(vocabularies[category]))
+        words.append(f"#{rng.choice(vocabularies[category])}{rng.randint(1, 10 ** 6)}")
+        corpus.append(" ".join(words))
+    
+    return corpus
+
+
+def analyze_sentiment(texts: List[str], latencies: List[float] = None) -> List[Dict]:
+    """Analyze sentiment using pre-trained BERT model (per-text seconds appended to `latencies` if given)"""
     print("Analyzing sentiment...")
-    sentiment_model = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest", device=0 if torch.cuda.is_available() else -1)
+    # Resident across calls - only the first run in a process pays the load
+    sentiment_model = get_model("sentiment", SENTIMENT_MODEL, get_device())
     sentiments = []
     
     for i, text in enumerate(texts):
+        started = time.perf_counter()
         try:
             # Truncate to model's max length
             truncated = text[:512]
@@ -252,88 +305,101 @@ def analyze_sentiment(texts: List[str]) -> List[Dict]:
         except Exception as e:
             print(f"   Error analyzing sentiment for text {i}: {e}")
             sentiments.append({"label": "NEUTRAL", "score": 0.5})
+        if latencies is not None:
+            latencies.append(time.perf_counter() - started)
     
     print(f"Analyzed sentiment for {len(sentiments)} texts")
     return sentiments
 
 
+@contextmanager
+def _fitted_once(*models):
+    """Make the next fit() on already-fitted models a no-op, so BERTopic reuses them as they are"""
+    for model in models:
+        model.fit = lambda *args, _model=model, **kwargs: _model
+    try:
+        yield
+    finally:
+        for model in models:
+            del model.fit  # Back to the class method, so the fitted model pickles and refits normally
+
+
 def detect_topics(texts: List[str]) -> tuple:
-    """Detect topics using BERTopic"""
+    """
+    Detect topics using BERTopic
+    Embedding, UMAP and HDBSCAN run as their own profiling stages ahead of
+    BERTopic, which then only builds the topic representations
+    """
+    from bertopic import BERTopic
+    from hdbscan import HDBSCAN
+    from umap import UMAP
+    
     print("Detecting topics...")
     
     # Use lightweight embedding model for speed with GPU if available
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+    embedding_model = get_model("embedding", EMBEDDING_MODEL, get_device())
+    
+    # Large CPU corpora are embedded up front by the multi-process pool
+    with stage("topic_embeddings", items=len(texts)):
+        if use_pool(len(texts), get_device()):
+            embeddings = encode_texts(texts)
+        else:
+            embeddings = embedding_model.encode(texts, show_progress_bar=False)
+    
+    # BERTopic's default reduction and clustering, fitted here so each is timed on its own
+    umap_model = UMAP(n_neighbors=15, n_components=5, min_dist=0.0, metric='cosine', low_memory=False)
+    with stage("topic_umap", items=len(texts)):
+        umap_model.fit(embeddings)
+    hdbscan_model = HDBSCAN(min_cluster_size=10, metric='euclidean', cluster_selection_method='eom',
+                            prediction_data=True)
+    with stage("topic_hdbscan", items=len(texts)):
+        hdbscan_model.fit(umap_model.embedding_)
     
     # Initialize BERTopic - let it automatically determine optimal topic count
     topic_model = BERTopic(
         embedding_model=embedding_model,
+        umap_model=umap_model,
+        hdbscan_model=hdbscan_model,
         nr_topics="auto",  # Auto-detect optimal number
         min_topic_size=10,  # Minimum 10 posts per topic
         verbose=True
     )
     
-    # Fit and transform
-    topics, probs = topic_model.fit_transform(texts)
+    with stage("topics", items=len(texts)), _fitted_once(umap_model, hdbscan_model):
+        topics, probs = topic_model.fit_transform(texts, embeddings=embeddings)
     
     print(f"Detected {len(set(topics))} topics")
     return topics, topic_model
 
 
 def store_in_mongodb(posts: List[Dict], mongo_uri: str, database: str = "trenddb", collection: str = "posts", clear_old: bool = True):
-    """Store analyzed data in MongoDB"""
+    """Store analyzed data in MongoDB; returns the number of posts inserted, or None if storing failed"""
     print(f"Storing data in MongoDB...")
     
     try:
-        client = MongoClient(mongo_uri)
-        db = client[database]
-        col = db[collection]
+        col = get_collection(mongo_uri, collection, database)
         
         # Clear old data if requested
         if clear_old:
             deleted_count = col.delete_many({}).deleted_count
             print(f"Cleared {deleted_count} old documents")
         
-        # Insert new data
-        result = col.insert_many(posts)
-        print(f"Inserted {len(result.inserted_ids)} documents")
+        # Insert new data (batched on the shared pooled client)
+        inserted = bulk_insert(col, posts)
+        print(f"Inserted {inserted} documents")
         
-        client.close()
+        # Fold the batch into the per-topic time-bucket rollups
+        totals = update_rollups(posts, mongo_uri, database)
+        print(f"Updated rollups with {totals['counted']} new posts ({totals['upserted']} new buckets, {totals['modified']} updated)")
+        return inserted
     except Exception as e:
         print(f"Error storing in MongoDB: {e}")
         print("   Make sure MONGO_URI is set correctly")
+        return None
 
 
-def main():
-    # Configuration
-    MONGO_URI = os.getenv("MONGO_URI", "")
-    
-    if not MONGO_URI:
-        print("MONGO_URI not set. Using demo mode.")
-        print("   Set MONGO_URI environment variable to connect to MongoDB Atlas")
-        MONGO_URI = "mongodb://localhost:27017/"  # Fallback to local
-    
-    # Step 1: Scrape data from multiple topics for diversity
-    queries = [
-        "AI OR artificial intelligence OR machine learning lang:en since:2025-01-01",
-        "climate change OR global warming OR environment lang:en since:2025-01-01", 
-        "election OR politics OR candidate lang:en since:2025-01-01",
-        "healthcare OR medical OR treatment lang:en since:2025-01-01",
-        "business OR economy OR startup lang:en since:2025-01-01",
-        "education OR learning OR school lang:en since:2025-01-01"
-    ]
-    data = scrape_twitter_data(queries, limit=300)  # Increased limit per query
-    
-    if not data:
-        print("No data scraped. Exiting.")
-        return
-    
-    # Step 2: Analyze sentiment
-    sentiments = analyze_sentiment(data)
-    
-    # Step 3: Detect topics
-    topics, topic_model = detect_topics(data)
-    
-    # Step 3.5: Get topic names from BERTopic
+def build_topic_names(topic_model, topics: List[int]) -> Dict[int, str]:
+    """Readable name for each topic id, built from BERTopic's top keywords"""
     topic_names = {}
     try:
         topic_info = topic_model.get_topic_info()
@@ -390,9 +456,17 @@ def main():
         for topic_id in unique_topics:
             topic_names[topic_id] = f"Topic {topic_id}"
     
-    # Step 4: Prepare documents for MongoDB
+    return topic_names
+
+
+def build_documents(texts: List[str], topics: List[int], sentiments: List[Dict], topic_names: Dict[int, str],
+                    clusters: DuplicateClusters = None, posts: List[Dict] = None) -> List[Dict]:
+    """
+    Build MongoDB post documents from per-text model outputs (with near-duplicate cluster info if given)
+    tweet_id, posted_at and stream are copied from the scraped posts when given
+    """
     docs = []
-    for text, topic, sent in zip(data, topics, sentiments):
+    for i, (text, topic, sent) in enumerate(zip(texts, topics, sentiments)):
         # Map sentiment labels to more readable format
         sentiment_label = sent["label"]
         if sentiment_label == "LABEL_0":  # Negative
@@ -425,10 +499,103 @@ def main():
             "url": search_url,
             "timestamp": datetime.datetime.utcnow()
         })
+        if posts is not None:
+            for field in ("tweet_id", "posted_at", "stream"):
+                if posts[i].get(field) is not None:
+                    docs[-1][field] = posts[i][field]
+        if clusters is not None:
+            cluster = clusters.assignment[i]
+            docs[-1]["cluster_id"] = clusters.ids[cluster]
+            docs[-1]["cluster_size"] = clusters.sizes[cluster]
+    
+    return docs
+
+
+TWITTER_QUERIES = [
+    "AI OR artificial intelligence OR machine learning lang:en since:2025-01-01",
+    "climate change OR global warming OR environment lang:en since:2025-01-01", 
+    "election OR politics OR candidate lang:en since:2025-01-01",
+    "healthcare OR medical OR treatment lang:en since:2025-01-01",
+    "business OR economy OR startup lang:en since:2025-01-01",
+    "education OR learning OR school lang:en since:2025-01-01"
+]
+
+
+def get_mongo_uri() -> str:
+    """MONGO_URI, falling back to a local server in demo mode"""
+    mongo_uri = os.getenv("MONGO_URI", "")
+    
+    if not mongo_uri:
+        print("MONGO_URI not set. Using demo mode.")
+        print("   Set MONGO_URI environment variable to connect to MongoDB Atlas")
+        mongo_uri = "mongodb://localhost:27017/"  # Fallback to local
+    return mongo_uri
+
+
+def collect() -> List[Dict]:
+    """Step 1: Scrape data from multiple topics for diversity"""
+    with stage("scrape") as s:
+        data = scrape_twitter_data(TWITTER_QUERIES, limit=300)  # Increased limit per query
+        s.items = len(data)
+    POSTS_SCRAPED.inc(len(data), source="twitter" if load_sntwitter() else "sample")
+    return data
+
+
+def data_watermark(data: List[Dict]) -> str:
+    """
+    Fingerprint of a scraped batch; unchanged when nothing new was posted
+    (tweet ids where the scraper has them, the text itself for sample posts)
+    """
+    import hashlib
+    
+    digest = hashlib.sha1()
+    for text in sorted({post.get("tweet_id") or post["text"] for post in data}):
+        digest.update(text.encode('utf-8', 'replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def process(data: List[Dict], mongo_uri: str):
+    """Steps 1.5-6: dedup, sentiment, topics, storage and burst detection for one scraped batch"""
+    if not data:
+        print("No data scraped. Exiting.")
+        return
+    texts = [post["text"] for post in data]
+    
+    # Step 1.5: Collapse near-duplicates (retweets, templated posts) so models see each text once
+    with stage("dedup", items=len(texts)):
+        clusters = cluster_near_duplicates(texts)
+    unique_texts = [texts[i] for i in clusters.representatives]
+    print(f"Collapsed {len(data)} posts into {len(clusters)} near-duplicate clusters")
+    
+    # Step 2: Analyze sentiment (representatives only, propagated to cluster members)
+    with stage("sentiment", items=len(unique_texts)):
+        sentiments = clusters.expand(analyze_sentiment(unique_texts))
+    ITEMS_CLASSIFIED.inc(len(unique_texts), model="roberta")
+    
+    # Step 3: Detect topics
+    representative_topics, topic_model = detect_topics(unique_texts)  # Records its own stages
+    topics = clusters.expand(representative_topics)
+    
+    # Step 3.5: Get topic names from BERTopic
+    with stage("topic_naming"):
+        topic_names = build_topic_names(topic_model, topics)
+    
+    # Step 4: Prepare documents for MongoDB
+    with stage("documents", items=len(data)):
+        docs = build_documents(texts, topics, sentiments, topic_names, clusters, posts=data)
     
     # Step 5: Store in MongoDB
-    if MONGO_URI:
-        store_in_mongodb(docs, MONGO_URI)
+    if mongo_uri:
+        with stage("store", items=len(docs)):
+            store_in_mongodb(docs, mongo_uri)
+    
+    # Step 6: Update per-topic burst baselines (state persists between iterations)
+    with stage("bursts", items=len(docs)):
+        bursts = update_burst_detector(docs)
+    for burst in bursts:
+        print(f"🔥 Burst: {burst['topic']} ({', '.join(burst['reasons'])}) - "
+              f"{burst['count']} posts vs ~{burst['expected']} expected, z={max(burst['volumeZ'], burst['negativeZ'])}")
     
     print("\nAnalysis complete!")
     print(f"   Processed {len(docs)} posts")
@@ -441,12 +608,30 @@ def main():
         topic_info = topic_model.get_topic_info()
         print("\nTopic Summary:")
         print(topic_info.head(10).to_string(index=False))
+    
+    print_stage_summary()
+    # With overlapping ticks the next scrape may already be recorded; it is reported with this run
+    reset_stages()
+
 
+def main():
+    # Stage timings are reported per run (per iteration in realtime mode)
+    reset_stages()
+    
+    mongo_uri = get_mongo_uri()
+    process(collect(), mongo_uri)
 
-def run_realtime_loop(interval=300):
-    """Run analysis continuously in a loop"""
+
+def run_realtime_loop(interval=300, overlap=False):
+    """
+    Run analysis continuously on a fixed-rate schedule
+    
+    Args:
+        interval: Seconds between ticks (kept fixed regardless of how long a run takes)
+        overlap: Scrape the next tick while the previous one is still running inference
+    """
     print("🚀 Starting real-time trend analysis...")
-    print(f"⏰ Running every {interval // 60} minutes")
+    print(f"⏰ Running every {interval // 60} minutes{' (scrape overlaps inference)' if overlap else ''}")
     print("Press Ctrl+C to stop\n")
     
     import signal
@@ -458,33 +643,46 @@ def run_realtime_loop(interval=300):
     
     signal.signal(signal.SIGINT, signal_handler)
     
-    iteration = 1
-    while True:
-        try:
-            print(f"\n{'='*60}")
-            print(f"🔄 Iteration #{iteration} - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"{'='*60}\n")
-            
-            main()
-            
-            iteration += 1
-            print(f"\n✅ Analysis complete. Next run in {interval // 60} minutes...")
-            time.sleep(interval)
-        except KeyboardInterrupt:
-            print("\n\n👋 Stopping...")
-            sys.exit(0)
-        except Exception as e:
-            print(f"\n❌ Error in loop: {e}")
-            print("   Continuing after interval...")
-            time.sleep(interval)
+    # METRICS_PORT serves /metrics, METRICS_TEXTFILE is rewritten after every iteration
+    if start_exporter():
+        print("📈 Exporting metrics")
+    
+    mongo_uri = get_mongo_uri()
+    
+    # Load and warm the models once; every tick reuses them from the registry
+    warmup([("sentiment", SENTIMENT_MODEL), ("embedding", EMBEDDING_MODEL)], device=get_device())
+    
+    def collect_tick():
+        print(f"\n{'='*60}")
+        print(f"🔄 Iteration #{scheduler.ticks} - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"{'='*60}\n")
+        return collect()
+    
+    scheduler = FixedRateScheduler(
+        interval,
+        collect=collect_tick,
+        process=lambda data: process(data, mongo_uri),
+        watermark=data_watermark,  # Unchanged scrape -> no model load, no rewrite of the collection
+        overlap=overlap,
+        name="analyze"
+    )
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("\n\n👋 Stopping...")
+        sys.exit(0)
 
 
 if __name__ == "__main__":
     import sys
     
+    # --profile[=cprofile|sample] writes per-stage collapsed stacks (or set PROFILE_STAGES)
+    sys.argv = configure_from_argv(sys.argv)
+    
     # Check if continuous mode is requested
+    # --overlap scrapes the next tick while the current one is still in inference
     if len(sys.argv) > 1 and sys.argv[1] == "--realtime":
-        run_realtime_loop(interval=300)  # Run every 5 minutes
+        run_realtime_loop(interval=300, overlap="--overlap" in sys.argv)  # Run every 5 minutes
     else:
         main()
 
@@ -0,0 +1,214 @@
+"""
+Async News Scraper
+Fans out many Google News searches over one pooled, keep-alive HTTP session
+Yields formatted articles as each query completes (NDJSON CLI for streaming)
+"""
+import asyncio
+import contextlib
+import json
+import random
+import sys
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from news_scraper import AdvancedNewsScraper, google_news_search_url
+
+# Prefer aiohttp for native async I/O, fall back to pooled requests in threads
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class AsyncNewsScraper:
+    """
+    Asyncio scraping engine for multi-query Google News searches
+
+    Args:
+        max_concurrency: Maximum number of requests in flight at once
+        timeout: Per-request deadline in seconds (covers connect + read)
+        max_retries: Attempts per query before giving up
+        respect_robots: Check robots.txt once per host before fetching
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 10.0,
+                 max_retries: int = 3, respect_robots: bool = True):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.respect_robots = respect_robots
+        # Reuse the blocking scraper's selector configs and extraction logic
+        self.parser = AdvancedNewsScraper(delay=0)
+        self._robots = {}
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if AIOHTTP_AVAILABLE:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_concurrency,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            self._session.headers.update({'User-Agent': USER_AGENT})
+            adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            if AIOHTTP_AVAILABLE:
+                await self._session.close()
+            else:
+                self._session.close()
+            self._session = None
+
+    async def _get(self, url: str) -> Tuple[int, bytes]:
+        """Fetch a URL on the shared session, returning (status, body)"""
+        if AIOHTTP_AVAILABLE:
+            async with self._session.get(url) as response:
+                return response.status, await response.read()
+
+        response = await asyncio.to_thread(self._session.get, url, timeout=self.timeout)
+        return response.status_code, response.content
+
+    async def _load_robots(self, base_url: str) -> RobotFileParser:
+        rp = RobotFileParser()
+        try:
+            status, body = await asyncio.wait_for(self._get(f"{base_url}/robots.txt"), self.timeout)
+            rp.parse(body.decode('utf-8', errors='ignore').splitlines() if status == 200 else [])
+        except Exception:
+            rp.parse([])
+        return rp
+
+    async def _can_fetch(self, url: str) -> bool:
+        """Check robots.txt, caching the parsed rules per host"""
+        if not self.respect_robots:
+            return True
+
+        parsed = urlparse(url)
+        base_url = f"{parsed.scheme}://{parsed.netloc}"
+        # Cache the in-flight task, so concurrent queries to one host share a single robots.txt fetch
+        if base_url not in self._robots:
+            self._robots[base_url] = asyncio.create_task(self._load_robots(base_url))
+        # Shielded: a cancelled caller must not cancel the fetch the other callers are awaiting
+        rp = await asyncio.shield(self._robots[base_url])
+        return rp.can_fetch('*', url)
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """Fetch a page with bounded concurrency, a per-request deadline and retries"""
+        if not await self._can_fetch(url):
+            print(f"Robots.txt disallows: {url}", file=sys.stderr)
+            return None
+
+        for attempt in range(self.max_retries):
+            try:
+                async with self._semaphore:
+                    status, body = await asyncio.wait_for(self._get(url), self.timeout)
+                if status == 200:
+                    return body
+                print(f"Attempt {attempt + 1} failed: HTTP {status}", file=sys.stderr)
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed: {e!r}", file=sys.stderr)
+
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(2 ** attempt + random.uniform(0, 0.5))  # Exponential backoff
+
+        return None
+
+    async def search_google_news(self, query: str, max_results: int = 10) -> List[Dict]:
+        """Search Google News for one query and return formatted articles"""
+        html = await self.fetch(google_news_search_url(query))
+        if not html:
+            return []
+        # Parsing is CPU bound - keep it off the event loop so other fetches progress
+        return await asyncio.to_thread(self.parser.parse_google_news, html, max_results)
+
+    async def stream(self, queries: Iterable[str], max_results: int = 10) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """Yield (query, articles) pairs in completion order"""
+        async def run(query):
+            try:
+                return query, await self.search_google_news(query, max_results)
+            except Exception as e:
+                print(f"Error searching Google News for {query}: {e}", file=sys.stderr)
+                return query, []
+
+        tasks = [asyncio.create_task(run(query)) for query in queries]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def search_many(queries: Iterable[str], max_results: int = 10, **options) -> Dict[str, List[Dict]]:
+    """Convenience wrapper: search all queries concurrently and collect results"""
+    results = {}
+    async with AsyncNewsScraper(**options) as scraper:
+        async for query, articles in scraper.stream(queries, max_results):
+            results[query] = articles
+    return results
+
+
+async def _stream_ndjson(queries: List[str], max_results: int, options: Dict, out):
+    async with AsyncNewsScraper(**options) as scraper:
+        async for query, articles in scraper.stream(queries, max_results):
+            for article in articles:
+                out.write(json.dumps({'query': query, **article}) + '\n')
+            out.flush()
+
+
+def main():
+    """
+    Stream articles for many queries as NDJSON (one article per line)
+    Usage: python async_news_scraper.py "query one" "query two" ... [--max-results N]
+           [--concurrency N] [--timeout SECONDS]
+    Pass "-" to read queries from stdin, one per line.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent Google News search with NDJSON output")
+    parser.add_argument('queries', nargs='+', help="Search queries, or '-' to read them from stdin")
+    parser.add_argument('--max-results', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--no-robots', action='store_true', help="Skip robots.txt checks")
+    args = parser.parse_args()
+
+    queries = []
+    for query in args.queries:
+        if query == '-':
+            queries.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            queries.append(query)
+
+    options = {
+        'max_concurrency': args.concurrency,
+        'timeout': args.timeout,
+        'respect_robots': not args.no_robots
+    }
+    # Keep stdout clean for NDJSON - diagnostics from the extractors go to stderr
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(_stream_ndjson(queries, args.max_results, options, out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Inference backend benchmark and parity check
+Serves the sentiment and embedding models through each CPU backend
+(fp32 PyTorch, dynamic int8 PyTorch, ONNX Runtime) over the same synthetic
+corpus and reports throughput plus parity with fp32: label agreement and score
+drift for sentiment, cosine drift for embeddings
+Usage: python benchmarks/bench_backends.py [--size 2000] [--threads 4] [--backends torch:fp32,torch:int8,onnx:fp32]
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import analyze
+from model_registry import EMBEDDING_MODEL, SENTIMENT_MODEL, ModelRegistry
+
+DEFAULT_BACKENDS = "torch:fp32,torch:int8,onnx:fp32"
+REFERENCE = ("torch", "fp32")
+BATCH_SIZE = 32
+# int8 results beyond these are worth a look before switching production over
+MIN_LABEL_AGREEMENT = 0.97
+MAX_MEAN_COSINE_DRIFT = 0.01
+
+
+def run_backend(registry, backend, precision, texts):
+    """Outputs and timings for one backend (load time excluded from throughput)"""
+    result = {"backend": backend, "precision": precision}
+
+    started = time.perf_counter()
+    sentiment = registry.get("sentiment", SENTIMENT_MODEL, "cpu", precision, backend)
+    embedder = registry.get("embedding", EMBEDDING_MODEL, "cpu", precision, backend)
+    result["loadSeconds"] = round(time.perf_counter() - started, 2)
+    for kind in ("sentiment", "embedding"):
+        registry.warmup(kind, SENTIMENT_MODEL if kind == "sentiment" else EMBEDDING_MODEL, "cpu", precision, backend)
+
+    started = time.perf_counter()
+    labels = sentiment([text[:512] for text in texts], batch_size=BATCH_SIZE, truncation=True)
+    seconds = time.perf_counter() - started
+    result["sentimentTextsPerSecond"] = round(len(texts) / seconds, 1)
+
+    started = time.perf_counter()
+    embeddings = embedder.encode(texts, batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+    seconds = time.perf_counter() - started
+    result["embeddingTextsPerSecond"] = round(len(texts) / seconds, 1)
+
+    registry.clear()
+    return result, labels, np.asarray(embeddings, dtype=np.float32)
+
+
+def parity(reference, candidate):
+    """Agreement of a backend's outputs with the fp32 reference"""
+    ref_labels, ref_embeddings = reference
+    labels, embeddings = candidate
+    agree = sum(a["label"] == b["label"] for a, b in zip(ref_labels, labels)) / len(labels)
+    score_drift = [abs(a["score"] - b["score"]) for a, b in zip(ref_labels, labels) if a["label"] == b["label"]]
+
+    ref_norm = ref_embeddings / np.maximum(np.linalg.norm(ref_embeddings, axis=1, keepdims=True), 1e-12)
+    norm = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    cosine_drift = 1.0 - np.sum(ref_norm * norm, axis=1)
+
+    result = {
+        "labelAgreement": round(agree, 4),
+        "meanScoreDrift": round(float(np.mean(score_drift)), 5) if score_drift else None,
+        "meanCosineDrift": round(float(np.mean(cosine_drift)), 6),
+        "maxCosineDrift": round(float(np.max(cosine_drift)), 6),
+    }
+    result["withinTolerance"] = agree >= MIN_LABEL_AGREEMENT and result["meanCosineDrift"] <= MAX_MEAN_COSINE_DRIFT
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare CPU inference backends against fp32")
+    parser.add_argument('--size', type=int, default=2000, help="Synthetic posts to run through each backend")
+    parser.add_argument('--backends', default=DEFAULT_BACKENDS, help="Comma-separated backend:precision pairs")
+    parser.add_argument('--threads', type=int, default=None, help="INFERENCE_THREADS for every backend")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.threads:
+        import model_registry
+        model_registry.INFERENCE_THREADS = args.threads
+
+    configs = [tuple(pair.split(':', 1)) for pair in args.backends.split(',') if pair]
+    if REFERENCE not in configs:
+        configs.insert(0, REFERENCE)
+    else:
+        configs.insert(0, configs.pop(configs.index(REFERENCE)))
+
+    texts = analyze.generate_synthetic_corpus(args.size, duplicate_rate=0.0, seed=args.seed)
+    registry = ModelRegistry(idle_seconds=0)
+    runs, reference = [], None
+    for backend, precision in configs:
+        print(f"⚙️  {backend}:{precision}...", file=sys.stderr)
+        try:
+            result, labels, embeddings = run_backend(registry, backend, precision, texts)
+        except ImportError as e:
+            registry.clear()
+            runs.append({"backend": backend, "precision": precision, "skipped": f"missing dependency: {e.name}"})
+            continue
+        if (backend, precision) == REFERENCE:
+            reference = (labels, embeddings)
+        elif reference is not None:
+            result["parity"] = parity(reference, (labels, embeddings))
+            base = runs[0]
+            result["speedup"] = {
+                "sentiment": round(result["sentimentTextsPerSecond"] / base["sentimentTextsPerSecond"], 2),
+                "embedding": round(result["embeddingTextsPerSecond"] / base["embeddingTextsPerSecond"], 2),
+            }
+        runs.append(result)
+
+    print(json.dumps({
+        "benchmark": "backends",
+        "python": platform.python_version(),
+        "cpuCount": os.cpu_count(),
+        "threads": args.threads or os.getenv("INFERENCE_THREADS") or "default",
+        "size": args.size,
+        "runs": runs
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
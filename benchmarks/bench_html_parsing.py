@@ -0,0 +1,106 @@
+"""
+Google News HTML parsing benchmark
+Compares the original html.parser + per-call select_one extraction against the
+html_parsing backend (fast tree builder, article-only strainer, precompiled selectors)
+Also compares the HTML page against the RSS search feed (bytes and parse time)
+Usage: python benchmarks/bench_html_parsing.py [fixture.html ...] [--repeat N]
+"""
+import glob
+import json
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import html_parsing
+from news_scraper import AdvancedNewsScraper, GOOGLE_NEWS_CONFIG
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def baseline_extract(html, config):
+    """The pre-backend extraction: full html.parser tree, selectors re-parsed on every call"""
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = []
+    for article_elem in soup.select(config['article_selector']):
+        article_data = {}
+        if title_elem := article_elem.select_one(config.get('title_selector', '')):
+            article_data['title'] = title_elem.get_text().strip()
+        if link_elem := article_elem.select_one(config.get('link_selector', 'a')):
+            href = link_elem.get('href', '')
+            if href:
+                article_data['url'] = href if href.startswith('http') else urljoin(config['base_url'], href)
+        if summary_elem := article_elem.select_one(config.get('summary_selector', '')):
+            article_data['summary'] = summary_elem.get_text().strip()
+        if date_elem := article_elem.select_one(config.get('date_selector', '')):
+            article_data['date'] = date_elem.get_text().strip()
+        if img_elem := article_elem.select_one(config.get('image_selector', 'img')):
+            article_data['image_url'] = img_elem.get('src', '')
+        if source_elem := article_elem.select_one(config.get('source_selector', '')):
+            article_data['publisher'] = source_elem.get_text().strip()
+        if article_data.get('title') and article_data.get('url'):
+            articles.append(article_data)
+    return articles
+
+
+def time_extractor(extract, pages, repeat):
+    """Best-of-repeat seconds to extract every page once, plus the article count"""
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(len(extract(html, GOOGLE_NEWS_CONFIG)) for html in pages)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark Google News HTML extraction")
+    parser.add_argument('fixtures', nargs='*', help="Saved result pages (default: benchmarks/fixtures/google_news*.html)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, "google_news*.html")))
+    pages = [open(path, 'rb').read() for path in paths]
+    repeat = args.repeat
+    scraper = AdvancedNewsScraper(delay=0)
+
+    results = {"fixtures": [os.path.basename(p) for p in paths], "repeat": repeat, "runs": {}}
+    base_time, base_count = time_extractor(baseline_extract, pages, repeat)
+    results["runs"]["baseline (html.parser, uncompiled)"] = {"seconds": round(base_time, 4), "articles": base_count}
+
+    for name in html_parsing.PREFERRED_PARSERS:
+        try:
+            BeautifulSoup("", name)
+        except Exception:
+            continue
+        html_parsing.HTML_PARSER = name
+        elapsed, count = time_extractor(scraper.extract_news_data, pages, repeat)
+        results["runs"][f"backend ({name}, strained, compiled)"] = {
+            "seconds": round(elapsed, 4),
+            "articles": count,
+            "speedup": round(base_time / elapsed, 2) if elapsed else None
+        }
+
+    rss_path = os.path.join(FIXTURE_DIR, "google_news_rss.xml")
+    if os.path.exists(rss_path) and pages:
+        feed = open(rss_path, 'rb').read()
+        html_time, html_count = time_extractor(lambda page, _: scraper.parse_google_news(page, None), pages[:1], repeat)
+        rss_time, rss_count = time_extractor(lambda page, _: scraper.parse_google_news_rss(page, None), [feed], repeat)
+        results["rss_vs_html"] = {
+            "html": {"bytes": len(pages[0]), "seconds": round(html_time, 4), "articles": html_count},
+            "rss": {"bytes": len(feed), "seconds": round(rss_time, 4), "articles": rss_count},
+            "parse_speedup": round(html_time / rss_time, 2) if rss_time else None
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
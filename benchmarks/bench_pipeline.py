@@ -0,0 +1,212 @@
+"""
+analyze.py pipeline benchmark
+Runs each analyze.main stage separately over synthetic corpora of increasing
+size and writes throughput and peak RSS per stage to a JSON report that can be
+diffed between commits. Stages that handle posts one at a time (sentiment,
+documents) or in small batches (store) also report p50/p99 latency measured per
+item or batch; dedup, topics and naming work on the whole corpus at once, so
+they report throughput only
+Usage: python benchmarks/bench_pipeline.py [--sizes 1000,10000] [--duplicate-rate 0.2]
+                                           [--skip sentiment,topics] [--output report.json]
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyze
+from model_registry import default_device
+from near_dedup import cluster_near_duplicates
+
+STAGES = ("dedup", "sentiment", "topics", "naming", "documents", "store")
+STORE_BATCH = 100  # Posts per timed store call
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10, 1)
+
+
+def percentile_ms(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 3)
+
+
+def stage_result(seconds, items, latencies=None, basis=None):
+    """Stage summary; latencies are seconds per unit of work, the unit named by basis"""
+    result = {
+        "seconds": round(seconds, 4),
+        "items": items,
+        "itemsPerSecond": round(items / seconds, 1) if seconds else None,
+        "peakRssMb": peak_rss_mb()
+    }
+    if latencies:
+        result.update(p50Ms=percentile_ms(latencies, 50), p99Ms=percentile_ms(latencies, 99), latencyBasis=basis)
+    return result
+
+
+def timed_batches(items, fn, batch_size=1):
+    """Run fn over batch_size slices; returns (outputs, seconds, seconds per batch)"""
+    outputs, latencies = [], []
+    started = time.perf_counter()
+    for start in range(0, len(items), batch_size):
+        batch_started = time.perf_counter()
+        outputs.append(fn(start, items[start:start + batch_size]))
+        latencies.append(time.perf_counter() - batch_started)
+    return outputs, time.perf_counter() - started, latencies
+
+
+def run_size(size, config):
+    """Benchmark every stage for one corpus size (run in its own process so peak RSS is per size)"""
+    # Pipeline progress goes to stderr so stdout stays a clean report
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        return _run_size(size, config)
+    finally:
+        sys.stdout = stdout
+
+
+def _run_size(size, config):
+    skip = set(config["skip"])
+    corpus = analyze.generate_synthetic_corpus(
+        size, config["duplicate_rate"], config["mean_words"], config["length_sigma"], config["seed"]
+    )
+    stages = {}
+
+    started = time.perf_counter()
+    clusters = cluster_near_duplicates(corpus)
+    stages["dedup"] = stage_result(time.perf_counter() - started, size)
+    unique_texts = [corpus[i] for i in clusters.representatives]
+
+    if "sentiment" in skip:
+        unique_sentiments = [{"label": "NEUTRAL", "score": 0.5}] * len(unique_texts)
+    else:
+        latencies = []
+        started = time.perf_counter()
+        unique_sentiments = analyze.analyze_sentiment(unique_texts, latencies)
+        stages["sentiment"] = stage_result(time.perf_counter() - started, len(unique_texts), latencies, "per item")
+    sentiments = clusters.expand(unique_sentiments)
+
+    topic_names = {}
+    if "topics" in skip:
+        topics = [-1] * size
+    else:
+        started = time.perf_counter()
+        unique_topics, topic_model = analyze.detect_topics(unique_texts)
+        stages["topics"] = stage_result(time.perf_counter() - started, len(unique_texts))
+        topics = clusters.expand(unique_topics)
+
+        if "naming" not in skip:
+            started = time.perf_counter()
+            topic_names = analyze.build_topic_names(topic_model, topics)
+            stages["naming"] = stage_result(time.perf_counter() - started, len(topic_names))
+
+    positions = list(range(size))
+    batches, seconds, latencies = timed_batches(positions, lambda start, batch: analyze.build_documents(
+        corpus[start:start + len(batch)], topics[start:start + len(batch)],
+        sentiments[start:start + len(batch)], topic_names
+    ))
+    docs = [doc for batch in batches for doc in batch]
+    stages["documents"] = stage_result(seconds, size, latencies, "per item")
+
+    if "store" not in skip:
+        def store(start, batch):
+            # store_in_mongodb reports failures instead of raising; a failed store must not be timed as a pass
+            inserted = analyze.store_in_mongodb(batch, config["mongo_uri"], clear_old=(start == 0))
+            if inserted != len(batch):
+                raise RuntimeError(f"store stage inserted {inserted} of {len(batch)} posts")
+
+        _, seconds, latencies = timed_batches(docs, store, STORE_BATCH)
+        stages["store"] = stage_result(seconds, size, latencies, f"per {STORE_BATCH}-post batch")
+
+    return {
+        "size": size,
+        "uniquePosts": len(unique_texts),
+        "peakRssMb": peak_rss_mb(),
+        "stages": stages
+    }
+
+
+def report_device(skip) -> str:
+    """Device the model stages ran on ('n/a' when they were skipped or torch is missing)"""
+    if {"sentiment", "topics"} <= set(skip):
+        return "n/a"
+    try:
+        return default_device()
+    except ImportError:
+        return "n/a"
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Benchmark the analyze.py pipeline stage by stage")
+    parser.add_argument('--sizes', default="1000,10000", help="Comma-separated corpus sizes (up to 1000000)")
+    parser.add_argument('--duplicate-rate', type=float, default=0.2)
+    parser.add_argument('--mean-words', type=float, default=18)
+    parser.add_argument('--length-sigma', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip', default="", help=f"Comma-separated stages to skip: {', '.join(STAGES[1:])}")
+    parser.add_argument('--mongo-uri', default=os.getenv("BENCH_MONGO_URI", "memory://bench"),
+                        help="Stand-in store (memory:// uses mongomock)")
+    parser.add_argument('--no-isolate', action='store_true', help="Run every size in this process")
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    config = {
+        "duplicate_rate": args.duplicate_rate,
+        "mean_words": args.mean_words,
+        "length_sigma": args.length_sigma,
+        "seed": args.seed,
+        "skip": [s for s in args.skip.split(',') if s],
+        "mongo_uri": args.mongo_uri
+    }
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    runs = []
+    for size in sizes:
+        print(f"📏 Benchmarking {size} posts...", file=sys.stderr)
+        if args.no_isolate:
+            runs.append(run_size(size, config))
+        else:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                runs.append(pool.apply(run_size, (size, config)))
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "device": report_device(config["skip"]),
+        "config": config,
+        "runs": runs
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Offline scraper extraction benchmark
+Replays recorded responses (fixture_store) and snscrape items through each
+extractor and reports pages/s, articles/s and allocations per page
+Usage: python benchmarks/bench_scrapers.py --record [--topics "a,b"]   capture live responses once
+       python benchmarks/bench_scrapers.py [--topics "a,b"] [--repeat N]  replay offline
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixture_store
+from fetch_trends import stream_twitter_trends
+from fixture_store import RECORD, REPLAY, FixtureMissing, FixtureStore, install_fixtures
+from news_data_collector import NewsDataCollector
+from news_scraper import AdvancedNewsScraper, GOOGLE_NEWS_CONFIG, google_news_search_url
+from snscrape_stream import SnscrapeSource, item_to_dict
+
+DEFAULT_TOPICS = "artificial intelligence,climate change,elections"
+
+
+class CountingStore(FixtureStore):
+    """FixtureStore that remembers which requests had no recording"""
+
+    def __init__(self, fixture_dir):
+        super().__init__(fixture_dir)
+        self.misses = []
+
+    def load(self, method, url):
+        entry = super().load(method, url)
+        if entry is None:
+            self.misses.append(url)
+        return entry
+
+
+class RecordedItemSource:
+    """
+    snscrape search items kept next to the HTTP recordings, one <key>.jsonl per query
+    under snscrape/; recording pulls them from live snscrape (limit items per query)
+    """
+
+    def __init__(self, store, mode, limit=50):
+        self.store = store
+        self.mode = mode
+        self.limit = limit
+        self.live = None
+
+    def _path(self, query):
+        key = hashlib.sha256(query.encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.store.fixture_dir, "snscrape", f"{key}.jsonl")
+
+    def search(self, query):
+        path = self._path(query)
+        if self.mode == RECORD:
+            self.live = self.live or SnscrapeSource()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for i, item in enumerate(self.live.search(query)):
+                    if i >= self.limit:
+                        break
+                    f.write(json.dumps(item_to_dict(item), default=str) + "\n")
+        if not os.path.exists(path):
+            self.store.misses.append(f"snscrape:{query}")
+            raise FixtureMissing(f"No recorded snscrape items for {query!r}")
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def build_extractors(mode, store):
+    """name -> fn(topic) returning the extracted items, all sessions routed through the store"""
+    collector = NewsDataCollector(use_ml_classifier=False, google_news_mode="html")
+    rss_collector = NewsDataCollector(use_ml_classifier=False, google_news_mode="rss")
+    scraper = AdvancedNewsScraper(delay=0, google_news_mode="html")
+    scraper.fixture_mode = mode
+    for session in (collector.session, rss_collector.session, scraper.session):
+        install_fixtures(session, mode, store)
+    items = RecordedItemSource(store, mode)
+
+    def extract_news_data(topic):
+        html = scraper.session.get(google_news_search_url(topic), timeout=10).content
+        return scraper.extract_news_data(html, GOOGLE_NEWS_CONFIG)
+
+    return {
+        "AdvancedNewsScraper.extract_news_data": extract_news_data,
+        "NewsDataCollector._scrape_google_news": collector._scrape_google_news,
+        "NewsDataCollector._scrape_bing_news": collector._scrape_bing_news,
+        "NewsDataCollector._scrape_reddit": collector._scrape_reddit,
+        "NewsDataCollector._fetch_google_news_rss": rss_collector._fetch_google_news_rss,
+        "fetch_trends.stream_twitter_trends": lambda topic: list(
+            stream_twitter_trends(topic, items.limit, timeout=None, source=items)),
+    }
+
+
+def measure(extract, topics, repeat):
+    """Best-of-repeat pages/s and articles/s, then per-page peak allocation and new blocks"""
+    best, articles = float('inf'), 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        articles = sum(len(extract(topic)) for topic in topics)
+        best = min(best, time.perf_counter() - started)
+
+    peaks, blocks = [], 0
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for topic in topics:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            extract(topic)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        after = tracemalloc.take_snapshot()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    finally:
+        tracemalloc.stop()
+
+    pages = len(topics)
+    return {
+        "pages": pages,
+        "articles": articles,
+        "seconds": round(best, 4),
+        "pagesPerSecond": round(pages / best, 1) if best else None,
+        "articlesPerSecond": round(articles / best, 1) if best else None,
+        "peakKbPerPage": round(sum(peaks) / pages / 1024, 1),
+        "retainedBlocksPerPage": round(blocks / pages, 1)
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark scraper extraction from recorded fixtures")
+    parser.add_argument('--topics', default=DEFAULT_TOPICS, help="Comma-separated search topics")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--record', action='store_true', help="Fetch live responses into the fixture store")
+    parser.add_argument('--fixture-dir', default=fixture_store.DEFAULT_FIXTURE_DIR)
+    args = parser.parse_args()
+
+    topics = [t.strip() for t in args.topics.split(',') if t.strip()]
+    mode = RECORD if args.record else REPLAY
+    store = CountingStore(args.fixture_dir)
+
+    # Extractors print their own progress and errors; keep stdout for the report
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        extractors = build_extractors(mode, store)
+        if mode == RECORD:
+            for name, extract in extractors.items():
+                for topic in topics:
+                    try:
+                        print(f"⏺  {name}: {topic} -> {len(extract(topic))} items")
+                    except Exception as e:
+                        print(f"⚠️ {name}: {topic} not recorded: {e}")
+            results = {"recorded": len(list(store.entries())), "fixtureDir": args.fixture_dir}
+        else:
+            results = {"fixtureDir": args.fixture_dir, "topics": topics, "repeat": args.repeat, "runs": {}}
+            for name, extract in extractors.items():
+                # Probe once: topics without a recording would only measure the error path
+                available = []
+                for topic in topics:
+                    misses = len(store.misses)
+                    try:
+                        extract(topic)
+                    except FixtureMissing:
+                        pass
+                    if len(store.misses) == misses:
+                        available.append(topic)
+                if not available:
+                    results["runs"][name] = {"skipped": "no recorded responses (run with --record)"}
+                    continue
+                results["runs"][name] = measure(extract, available, args.repeat)
+    finally:
+        sys.stdout = stdout
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Entry-point startup benchmark
+Measures, in fresh interpreters, how long each script takes to import and how
+long its CLI takes to produce its first byte of output (what an API-route exec
+waits for). Keyword-fallback paths should stay well under a second
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--only analyze,semantic_search]
+"""
+import json
+import os
+import platform
+import select
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> CLI arguments run for time-to-first-output (None: import time only, the CLI needs the network)
+ENTRY_POINTS = {
+    "sentiment_classifier": ["Markets rally on great earnings news"],
+    "enhanced_sentiment_classifier": ["Markets rally on great earnings news"],
+    "semantic_search": ["climate policy"],
+    "analyze": [],
+    "news_data_collector": [],
+    "fetch_trends": None,
+    "trend_poller": ["--help"],
+    "rollups": ["--help"],
+    "large_corpus": ["--help"],
+    "prepare_models": ["--help"],
+}
+# Paths that never touch torch/tensorflow and should start in well under a second
+FALLBACK_PATHS = ("sentiment_classifier", "enhanced_sentiment_classifier")
+FALLBACK_BUDGET_SECONDS = 1.0
+
+IMPORT_PROBE = (
+    "import sys, time; sys.path.insert(0, {root!r}); started = time.perf_counter(); import {module}; "
+    "sys.stderr.write('\\nIMPORT_SECONDS=%f\\n' % (time.perf_counter() - started))"
+)
+
+
+def _env():
+    # No database or cache side effects: without MONGO_URI the scripts stop at their first message
+    env = {k: v for k, v in os.environ.items() if k not in ("MONGO_URI", "METRICS_PORT", "PROFILE_STAGES")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def interpreter_seconds() -> float:
+    """Bare interpreter start-up: the floor every entry point pays"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - started
+
+
+def import_seconds(module: str) -> float:
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(root=ROOT, module=module)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True
+    )
+    for line in reversed(completed.stderr.splitlines()):
+        if line.startswith("IMPORT_SECONDS="):
+            return float(line.split("=", 1)[1])
+    raise RuntimeError(f"import {module} failed: {(completed.stderr.strip().splitlines() or ['?'])[-1]}")
+
+
+def first_output_seconds(module: str, argv, timeout: float = 60.0) -> float:
+    """Spawn-to-first-byte on stdout/stderr; the process is stopped as soon as it speaks"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, f"{module}.py"), *argv],
+        cwd=ROOT, env=_env(), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    try:
+        ready, _, _ = select.select([process.stdout], [], [], timeout)
+        elapsed = time.perf_counter() - started
+        if not ready or not os.read(process.stdout.fileno(), 1):
+            raise RuntimeError(f"{module} produced no output within {timeout:.0f}s")
+        return elapsed
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+
+
+def measure(module: str, argv, repeat: int) -> dict:
+    result = {"importSeconds": round(statistics.median(import_seconds(module) for _ in range(repeat)), 3)}
+    if argv is not None:
+        result["argv"] = argv
+        result["firstOutputSeconds"] = round(statistics.median(
+            first_output_seconds(module, argv) for _ in range(repeat)
+        ), 3)
+    if module in FALLBACK_PATHS:
+        result["withinBudget"] = result.get("firstOutputSeconds", result["importSeconds"]) < FALLBACK_BUDGET_SECONDS
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark import time and time-to-first-output per script")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (median reported)")
+    parser.add_argument('--only', default="", help=f"Comma-separated subset of: {', '.join(ENTRY_POINTS)}")
+    args = parser.parse_args()
+
+    selected = [m for m in args.only.split(',') if m] or list(ENTRY_POINTS)
+    report = {
+        "benchmark": "startup",
+        "python": platform.python_version(),
+        "interpreterSeconds": round(statistics.median(interpreter_seconds() for _ in range(args.repeat)), 3),
+        "fallbackBudgetSeconds": FALLBACK_BUDGET_SECONDS,
+        "entryPoints": {}
+    }
+    for module in selected:
+        print(f"⏱  {module}...", file=sys.stderr)
+        try:
+            report["entryPoints"][module] = measure(module, ENTRY_POINTS[module], args.repeat)
+        except RuntimeError as e:
+            report["entryPoints"][module] = {"error": str(e)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
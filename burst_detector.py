@@ -0,0 +1,233 @@
+"""
+Streaming trend-burst detection
+Keeps per-topic EWMA mean/variance of bucket volume and negative-sentiment
+share, updated in O(1) per post, and flags topics whose current bucket sits
+more than a z-score threshold above their recent baseline. Posts are bucketed
+by their own date, and keys of observed posts are remembered so a re-scraped
+post is only counted once
+"""
+import datetime
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+from post_identity import post_keys, post_time
+
+DEFAULT_STATE_PATH = os.getenv("BURST_STATE_PATH", ".burst_state.json")
+BURST_BUCKET_SECONDS = int(os.getenv("BURST_BUCKET_SECONDS", "300"))
+BURST_Z_THRESHOLD = float(os.getenv("BURST_Z_THRESHOLD", "3.0"))
+# How long observed post keys are remembered; older posts are ignored rather than risk a recount
+BURST_SEEN_SECONDS = float(os.getenv("BURST_SEEN_SECONDS", str(6 * 3600)))
+
+# Empty buckets folded in after a long gap; beyond this the baseline has decayed anyway
+MAX_GAP_BUCKETS = 50
+
+
+def _epoch(timestamp) -> float:
+    if isinstance(timestamp, datetime.datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def topic_key(post: Dict) -> str:
+    """
+    Baseline a post counts toward: its scrape stream (query terms), which is the
+    same every run. Posts without one (sample data) fall back to their BERTopic
+    label, which changes between fits, so those baselines rarely survive a refit
+    """
+    return post.get("stream") or post.get("topic_name") or f"Topic {post.get('topic', -1)}"
+
+
+def _ewma(mean: float, var: float, value: float, alpha: float):
+    """Incremental exponentially weighted mean and variance"""
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+class BurstDetector:
+    """
+    Per-topic burst detector persisted to a JSON state file
+
+    Args:
+        path: State file (survives between run_realtime_loop iterations and restarts)
+        bucket_seconds: Width of the volume buckets
+        alpha: EWMA smoothing factor (higher reacts faster)
+        z_threshold: z-score above which a topic is flagged
+        min_buckets: Completed buckets needed before a topic can be flagged
+        min_count: Posts needed in the current bucket before its negative share is judged
+        seen_seconds: How long observed post keys are remembered (see observe_posts)
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, bucket_seconds: int = BURST_BUCKET_SECONDS,
+                 alpha: float = 0.3, z_threshold: float = BURST_Z_THRESHOLD, min_buckets: int = 3,
+                 min_count: int = 5, seen_seconds: float = BURST_SEEN_SECONDS):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_buckets = min_buckets
+        self.min_count = min_count
+        self.seen_seconds = seen_seconds
+        self.topics: Dict[str, Dict] = {}
+        self.seen: Dict[str, float] = {}  # Post key -> post time (epoch seconds)
+        self.latest = 0.0  # Newest post time observed
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("bucket_seconds") == self.bucket_seconds:
+            self.topics = state.get("topics", {})
+            self.seen = state.get("seen", {})
+            self.latest = state.get("latest", 0.0)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"bucket_seconds": self.bucket_seconds, "topics": self.topics,
+                       "seen": self.seen, "latest": self.latest}, f)
+        os.replace(tmp, self.path)
+
+    def _fold(self, entry: Dict, count: int, negative: int):
+        """Fold one completed bucket into the topic's baseline"""
+        entry["rate_mean"], entry["rate_var"] = _ewma(entry["rate_mean"], entry["rate_var"], count, self.alpha)
+        if count:
+            share = negative / count
+            entry["neg_mean"], entry["neg_var"] = _ewma(entry["neg_mean"], entry["neg_var"], share, self.alpha)
+        entry["buckets"] += 1
+
+    def _advance(self, entry: Dict, bucket: int):
+        """Close the current bucket (and any empty ones after it) when time moves past it"""
+        if bucket <= entry["bucket"]:
+            return
+        self._fold(entry, entry["count"], entry["negative"])
+        for _ in range(min(bucket - entry["bucket"] - 1, MAX_GAP_BUCKETS)):
+            self._fold(entry, 0, 0)
+        entry.update(bucket=bucket, count=0, negative=0)
+
+    def observe(self, topic: str, sentiment: str, timestamp) -> None:
+        """Count one post (O(1)); late posts for an already closed bucket count toward the current one"""
+        bucket = int(_epoch(timestamp) // self.bucket_seconds)
+        entry = self.topics.get(topic)
+        if entry is None:
+            entry = self.topics[topic] = {
+                "bucket": bucket, "count": 0, "negative": 0, "buckets": 0,
+                "rate_mean": 0.0, "rate_var": 0.0, "neg_mean": 0.0, "neg_var": 0.0
+            }
+        self._advance(entry, bucket)
+        entry["count"] += 1
+        if sentiment == "NEGATIVE":
+            entry["negative"] += 1
+
+    def observe_posts(self, posts: Iterable[Dict]) -> int:
+        """
+        Count the posts no earlier batch counted, oldest first, so bucket volume
+        tracks posting velocity rather than how many posts each scrape returns.
+        Posts older than seen_seconds before the newest one are skipped, as their
+        keys may already be forgotten
+
+        Returns:
+            Number of posts counted
+        """
+        posts = list(posts)
+        fresh = [(_epoch(post_time(post)), key, post)
+                 for key, post in zip(post_keys(posts), posts) if key not in self.seen]
+        if not fresh:
+            return 0
+        self.latest = max(self.latest, max(epoch for epoch, _, _ in fresh))
+        cutoff = self.latest - self.seen_seconds
+
+        counted = 0
+        for epoch, key, post in sorted(fresh, key=lambda item: (item[0], item[1])):
+            if epoch < cutoff:
+                continue
+            self.seen[key] = epoch
+            self.observe(topic_key(post), post.get("sentiment", "NEUTRAL"), epoch)
+            counted += 1
+        self.seen = {key: epoch for key, epoch in self.seen.items() if epoch >= cutoff}
+        return counted
+
+    def _score(self, topic: str, entry: Dict) -> Dict:
+        # Volume is count-like: floor the deviation at Poisson noise so quiet topics don't flag on +1
+        rate_std = max(math.sqrt(entry["rate_var"]), math.sqrt(max(entry["rate_mean"], 1.0)))
+        rate_z = (entry["count"] - entry["rate_mean"]) / rate_std
+
+        negative_share = entry["negative"] / entry["count"] if entry["count"] else 0.0
+        neg_z = 0.0
+        if entry["count"] >= self.min_count:
+            neg_std = max(math.sqrt(entry["neg_var"]), 0.05)
+            neg_z = (negative_share - entry["neg_mean"]) / neg_std
+
+        reasons = []
+        if entry["buckets"] >= self.min_buckets:
+            if rate_z >= self.z_threshold:
+                reasons.append("volume")
+            if neg_z >= self.z_threshold:
+                reasons.append("negative_share")
+
+        return {
+            "topic": topic,
+            "count": entry["count"],
+            "expected": round(entry["rate_mean"], 2),
+            "volumeZ": round(rate_z, 2),
+            "negativeShare": round(negative_share, 3),
+            "expectedNegativeShare": round(entry["neg_mean"], 3),
+            "negativeZ": round(neg_z, 2),
+            "bursting": bool(reasons),
+            "reasons": reasons
+        }
+
+    def bursts(self, now=None) -> List[Dict]:
+        """Topics spiking in the current bucket, highest z-score first"""
+        bucket = int(_epoch(now if now is not None else datetime.datetime.utcnow()) // self.bucket_seconds)
+        flagged = []
+        for topic, entry in self.topics.items():
+            if entry["bucket"] != bucket:
+                continue  # Nothing seen for this topic in the current bucket
+            score = self._score(topic, entry)
+            if score["bursting"]:
+                flagged.append(score)
+        return sorted(flagged, key=lambda s: max(s["volumeZ"], s["negativeZ"]), reverse=True)
+
+    def status(self, topic: str) -> Optional[Dict]:
+        entry = self.topics.get(topic)
+        return self._score(topic, entry) if entry else None
+
+
+def update_burst_detector(posts: List[Dict], path: str = DEFAULT_STATE_PATH) -> List[Dict]:
+    """Feed a batch of stored posts through the persisted detector; returns bursts as of the newest post"""
+    detector = BurstDetector(path)
+    detector.observe_posts(posts)
+    detector.save()
+    return detector.bursts(detector.latest or None)
+
+
+def main():
+    """
+    Usage: python burst_detector.py [--all]
+    Prints topics bursting in the current bucket (or every topic's status) as JSON
+    """
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Per-topic trend burst detection")
+    parser.add_argument('--all', action='store_true', help="Status of every tracked topic")
+    args = parser.parse_args()
+
+    detector = BurstDetector()
+    if args.all:
+        result = [detector.status(topic) for topic in detector.topics]
+    else:
+        result = detector.bursts()
+    sys.stdout.write(json.dumps(result) + '\n')
+
+
+if __name__ == "__main__":
+    main()
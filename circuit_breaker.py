@@ -0,0 +1,169 @@
+"""
+Per-source circuit breakers for the trend fetchers
+Failure rates and latencies are persisted across invocations, so a source known
+to be dead fails in milliseconds instead of waiting out its timeout every call
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows - state updates are best-effort without a lock
+    fcntl = None
+
+DEFAULT_STATE_PATH = os.getenv("CIRCUIT_STATE_PATH", ".circuit_state.json")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """The source's circuit is open - fail fast without calling it"""
+
+
+@contextmanager
+def _locked_state(path: str):
+    """Load the shared state file under an exclusive lock and write it back on exit"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            yield state
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker with half-open probing and adaptive timeouts
+
+    Args:
+        name: Source name (key in the shared state file)
+        state_path: JSON file shared by every process
+        window: Number of recent calls considered
+        min_calls: Calls needed in the window before the breaker may open
+        failure_threshold: Failure rate that opens the circuit
+        cooldown: Seconds to stay open before allowing a half-open probe
+        default_timeout: Timeout used until enough latencies are known
+        min_timeout / max_timeout: Bounds for the adaptive timeout
+        latency_percentile: Percentile of recent successful latencies to base the timeout on
+        timeout_multiplier: Headroom applied to that percentile
+    """
+
+    def __init__(self, name: str, state_path: str = DEFAULT_STATE_PATH, window: int = 20,
+                 min_calls: int = 3, failure_threshold: float = 0.5, cooldown: float = 120,
+                 default_timeout: float = 30, min_timeout: float = 1, max_timeout: float = 30,
+                 latency_percentile: float = 95, timeout_multiplier: float = 2):
+        self.name = name
+        self.state_path = state_path
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.latency_percentile = latency_percentile
+        self.timeout_multiplier = timeout_multiplier
+
+    def _entry(self, state: Dict) -> Dict:
+        return state.setdefault(self.name, {"state": CLOSED, "opened_at": 0.0, "probe_at": 0.0, "calls": []})
+
+    def snapshot(self) -> Dict:
+        """Current breaker state, failure rate and adaptive timeout"""
+        with _locked_state(self.state_path) as state:
+            entry = self._entry(state)
+            calls = entry["calls"]
+            failures = sum(1 for _, ok, _ in calls if not ok)
+            return {
+                "state": entry["state"],
+                "calls": len(calls),
+                "failureRate": round(failures / len(calls), 3) if calls else 0.0,
+                "timeout": self._timeout(calls)
+            }
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the half-open probe if due)"""
+        now = time.time()
+        with _locked_state(self.state_path) as state:
+            entry = self._entry(state)
+            if entry["state"] == CLOSED:
+                return True
+            if entry["state"] == OPEN and now - entry["opened_at"] < self.cooldown:
+                return False
+            # Only one probe at a time; a probe that never reported back expires after max_timeout
+            if entry["state"] == HALF_OPEN and now - entry["probe_at"] < self.max_timeout:
+                return False
+            entry["state"] = HALF_OPEN
+            entry["probe_at"] = now
+            return True
+
+    def _record(self, ok: bool, latency: float):
+        now = time.time()
+        with _locked_state(self.state_path) as state:
+            entry = self._entry(state)
+            entry["calls"] = (entry["calls"] + [[now, ok, round(latency, 4)]])[-self.window:]
+
+            if entry["state"] == HALF_OPEN:
+                if ok:
+                    entry.update(state=CLOSED, calls=[[now, ok, round(latency, 4)]])
+                else:
+                    entry.update(state=OPEN, opened_at=now)
+                return
+
+            calls = entry["calls"]
+            failures = sum(1 for _, call_ok, _ in calls if not call_ok)
+            if len(calls) >= self.min_calls and failures / len(calls) >= self.failure_threshold:
+                entry.update(state=OPEN, opened_at=now)
+
+    def record_success(self, latency: float):
+        self._record(True, latency)
+
+    def record_failure(self, latency: float):
+        self._record(False, latency)
+
+    def _timeout(self, calls: List) -> float:
+        latencies = [latency for _, ok, latency in calls if ok]
+        if len(latencies) < self.min_calls:
+            return self.default_timeout
+        adaptive = _percentile(latencies, self.latency_percentile) * self.timeout_multiplier
+        return round(min(self.max_timeout, max(self.min_timeout, adaptive)), 3)
+
+    def timeout(self) -> float:
+        """Timeout derived from recent successful latencies (default until enough are known)"""
+        with _locked_state(self.state_path) as state:
+            return self._timeout(self._entry(state)["calls"])
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError without calling it when open"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.monotonic() - started)
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
@@ -0,0 +1,280 @@
+"""
+Multi-process encoding pool for large embedding backfills
+Shards texts across worker processes, each holding its own copy of the
+embedding model with a pinned thread count, and streams the results back in
+order into a preallocated float32 array or on-disk memmap. With a checkpoint
+file an interrupted backfill resumes from the last flushed row
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model_registry import EMBEDDING_MODEL
+
+ENCODING_WORKERS = int(os.getenv("ENCODING_WORKERS", "0"))  # 0: one per core
+ENCODING_THREADS_PER_WORKER = int(os.getenv("ENCODING_THREADS_PER_WORKER", "1"))
+ENCODING_CHUNK_SIZE = int(os.getenv("ENCODING_CHUNK_SIZE", "1024"))
+# Below this many texts a single in-process encode beats spawning workers
+ENCODING_POOL_MIN_TEXTS = int(os.getenv("ENCODING_POOL_MIN_TEXTS", "20000"))
+
+BATCH_SIZE = 64
+CHECKPOINT_EVERY = 8  # Chunks between checkpoint flushes
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int, precision: Optional[str], backend: Optional[str]):
+    """Pin the worker's thread pools before torch is imported, then load its model copy"""
+    global _worker_model
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"  # Parallelism comes from the processes
+
+    import model_registry
+    model_registry.INFERENCE_THREADS = threads
+    _worker_model = model_registry.get_model("embedding", model_name, "cpu", precision, backend)
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    embeddings = _worker_model.encode(texts, batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def use_pool(count: int, device: str) -> bool:
+    """Pool only large CPU workloads; a GPU is better fed from one process"""
+    return device == "cpu" and count >= ENCODING_POOL_MIN_TEXTS and (ENCODING_WORKERS or os.cpu_count() or 1) > 1
+
+
+def texts_fingerprint(texts: List[str], model_name: str) -> str:
+    """Identifies a backfill, so a checkpoint is only resumed against the same inputs and model"""
+    digest = hashlib.sha1(f"{model_name}\0{len(texts)}\0".encode('utf-8'))
+    for text in texts:
+        digest.update(text.encode('utf-8', 'replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _load_checkpoint(path: Optional[str], fingerprint: str) -> Optional[Dict]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("fingerprint") == fingerprint else None
+
+
+def _save_checkpoint(path: str, state: Dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class EncodingPool:
+    """
+    Worker processes with resident embedding models
+
+    Args:
+        workers: Worker processes (defaults to cores / threads_per_worker)
+        threads_per_worker: Intra-op threads each worker is pinned to
+        model_name: Embedding model every worker loads
+        chunk_size: Texts per task; also the checkpoint granularity
+        precision / backend: Passed to the model registry (e.g. 'int8', 'onnx')
+    """
+
+    def __init__(self, workers: Optional[int] = None, threads_per_worker: int = ENCODING_THREADS_PER_WORKER,
+                 model_name: str = EMBEDDING_MODEL, chunk_size: int = ENCODING_CHUNK_SIZE,
+                 precision: Optional[str] = None, backend: Optional[str] = None):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.workers = workers or ENCODING_WORKERS or max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        self.model_name = model_name
+        self.chunk_size = chunk_size
+        # spawn: fork would copy a parent that may already hold torch thread pools or a CUDA context.
+        # A worker that fails to load its model breaks the executor instead of being respawned forever
+        self._pool = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+            initargs=(model_name, self.threads_per_worker, precision, backend)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def encode(self, texts: List[str], output: Optional[str] = None, checkpoint: Optional[str] = None,
+               fingerprint: Optional[str] = None) -> np.ndarray:
+        """
+        Embed texts in input order
+
+        Args:
+            texts: Texts to embed (on resume, rows before the checkpoint are never read)
+            output: .f32 memmap path (rows x dim float32); in memory when None
+            checkpoint: Progress file for resuming (defaults to <output>.checkpoint.json when output is set)
+            fingerprint: Identity of the input a checkpoint must match (defaults to a hash of texts)
+
+        Returns:
+            float32 array (a np.memmap when output is set) with one row per text
+        """
+        total = len(texts)
+        checkpoint = (checkpoint or f"{output}.checkpoint.json") if output else None
+        if checkpoint and fingerprint is None:
+            fingerprint = texts_fingerprint(texts, self.model_name)
+        state = _load_checkpoint(checkpoint, fingerprint) if output else None
+
+        embeddings = None
+        done = 0
+        if state and os.path.exists(output):
+            embeddings = np.memmap(output, dtype=np.float32, mode='r+', shape=(total, state["dim"]))
+            done = state["rows"]
+            print(f"↩️  Resuming backfill at row {done}/{total}", file=sys.stderr)
+
+        ranges = [(start, min(start + self.chunk_size, total)) for start in range(done, total, self.chunk_size)]
+        pending = deque()
+        started = time.perf_counter()
+        since_checkpoint = 0
+
+        def collect_next():
+            nonlocal embeddings, done, since_checkpoint
+            start, end, result = pending.popleft()
+            chunk = result.result()
+            if embeddings is None:
+                shape = (total, chunk.shape[1])
+                embeddings = (np.memmap(output, dtype=np.float32, mode='w+', shape=shape)
+                              if output else np.empty(shape, dtype=np.float32))
+            embeddings[start:end] = chunk
+            done = end
+            since_checkpoint += 1
+            if checkpoint and (since_checkpoint >= CHECKPOINT_EVERY or done == total):
+                # Rows are flushed before the checkpoint claims them
+                if isinstance(embeddings, np.memmap):
+                    embeddings.flush()
+                _save_checkpoint(checkpoint, {"fingerprint": fingerprint, "rows": done, "total": total,
+                                              "dim": int(embeddings.shape[1]), "model": self.model_name})
+                since_checkpoint = 0
+
+        # Bounded in-flight window: results stream back in order without queueing the whole corpus
+        for start, end in ranges:
+            while len(pending) >= self.workers * 2:
+                collect_next()
+            pending.append((start, end, self._pool.submit(_encode_chunk, texts[start:end])))
+        while pending:
+            collect_next()
+
+        seconds = time.perf_counter() - started
+        if ranges:
+            encoded = total - ranges[0][0]
+            print(f"Encoded {encoded} texts in {seconds:.1f}s ({encoded / seconds:.0f} texts/s, "
+                  f"{self.workers} workers x {self.threads_per_worker} threads)", file=sys.stderr)
+        if embeddings is None:  # Nothing to encode (empty input or already complete)
+            if state and os.path.exists(output):
+                embeddings = np.memmap(output, dtype=np.float32, mode='r+', shape=(total, state["dim"]))
+            else:
+                embeddings = np.empty((0, 0), dtype=np.float32)
+        return embeddings
+
+
+def encode_texts(texts: List[str], output: Optional[str] = None, checkpoint: Optional[str] = None,
+                 workers: Optional[int] = None, threads_per_worker: int = ENCODING_THREADS_PER_WORKER,
+                 model_name: str = EMBEDDING_MODEL) -> np.ndarray:
+    """
+    One-off pooled encode (starts and stops the workers around the call)
+    Worker start-up costs seconds, so this is for batch jobs, not per-request paths
+    """
+    with EncodingPool(workers, threads_per_worker, model_name) as pool:
+        return pool.encode(texts, output, checkpoint)
+
+
+def _id_value(id_str: str):
+    from bson import ObjectId
+    return ObjectId(id_str) if ObjectId.is_valid(id_str) else id_str
+
+
+def ids_fingerprint(ids: List[str], model_name: str) -> str:
+    """Identifies a backfill snapshot by its document ids, so inserts after it do not invalidate the checkpoint"""
+    digest = hashlib.sha1(f"{model_name}\0{len(ids)}\0".encode('utf-8'))
+    for id_str in ids:
+        digest.update(id_str.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def main():
+    """
+    Usage: python encoding_pool.py --output .embeddings/posts.f32 [--collection posts] [--workers N] [--threads T]
+                                   [--restart]
+    Backfills embeddings for every post (in _id order); re-run the same command to resume.
+    The first run snapshots the ids to <output>.ids.json and a resumed run continues
+    through that snapshot, so posts inserted in between wait for the next --restart
+    """
+    import argparse
+
+    from mongo_store import DEFAULT_DATABASE, get_collection
+
+    parser = argparse.ArgumentParser(description="Embed a MongoDB collection with a multi-process pool")
+    parser.add_argument('--output', required=True, help="float32 memmap written here; ids go to <output>.ids.json")
+    parser.add_argument('--collection', default="posts")
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=ENCODING_THREADS_PER_WORKER, help="Threads per worker")
+    parser.add_argument('--chunk-size', type=int, default=ENCODING_CHUNK_SIZE)
+    parser.add_argument('--restart', action='store_true', help="Take a new id snapshot instead of resuming")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI", "")
+    if not mongo_uri:
+        print("MONGO_URI not set")
+        sys.exit(1)
+
+    col = get_collection(mongo_uri, args.collection, args.database)
+    ids_path = f"{args.output}.ids.json"
+    checkpoint = f"{args.output}.checkpoint.json"
+
+    ids, state = None, None
+    if not args.restart and os.path.exists(ids_path):
+        with open(ids_path, 'r', encoding='utf-8') as f:
+            ids = json.load(f)
+        state = _load_checkpoint(checkpoint, ids_fingerprint(ids, EMBEDDING_MODEL))
+
+    if state and os.path.exists(args.output):
+        # Resume: only the snapshot's remaining rows are read back, by _id range
+        done = state["rows"]
+        texts = [""] * done
+        if done < len(ids):
+            found = {}
+            query = {"_id": {"$gte": _id_value(ids[done]), "$lte": _id_value(ids[-1])}}
+            for doc in col.find(query, {"text": 1}):
+                found[str(doc["_id"])] = doc.get("text", "")
+            # Posts deleted since the snapshot keep their row, embedded as empty text
+            texts.extend(found.get(id_str, "") for id_str in ids[done:])
+    else:
+        ids, texts = [], []
+        for doc in col.find({}, {"text": 1}).sort("_id", 1):
+            ids.append(str(doc["_id"]))
+            texts.append(doc.get("text", ""))
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(ids_path, 'w', encoding='utf-8') as f:
+            json.dump(ids, f)
+
+    with EncodingPool(args.workers, args.threads, chunk_size=args.chunk_size) as pool:
+        embeddings = pool.encode(texts, args.output, checkpoint, fingerprint=ids_fingerprint(ids, EMBEDDING_MODEL))
+    print(json.dumps({"rows": int(embeddings.shape[0]), "dim": int(embeddings.shape[1]) if embeddings.size else 0,
+                      "output": args.output}))
+
+
+if __name__ == "__main__":
+    main()
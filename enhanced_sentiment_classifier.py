@@ -5,16 +5,14 @@ Uses TensorFlow Lite model with proper confidence scoring
 """
 
 import json
+import os
 import sys
-import numpy as np
+from importlib.util import find_spec
 from typing import Dict, List, Tuple, Optional
 
-# TensorFlow Lite imports
-try:
-    import tensorflow as tf
-    TFLITE_AVAILABLE = True
-except ImportError:
-    TFLITE_AVAILABLE = False
+# TensorFlow Lite imports - deferred until a model is actually loaded (importing
+# tensorflow takes seconds; the keyword fallback does not need it or numpy)
+TFLITE_AVAILABLE = find_spec("tensorflow") is not None
 
 class EnhancedSentimentClassifier:
     """
@@ -26,8 +24,11 @@ class EnhancedSentimentClassifier:
         self.model_path = model_path
         self.interpreter = None
         
-        if TFLITE_AVAILABLE:
+        if TFLITE_AVAILABLE and not os.path.exists(model_path):
+            print(f"Warning: Could not load TFLite model: {model_path} not found")
+        elif TFLITE_AVAILABLE:
             try:
+                import tensorflow as tf
                 self.interpreter = tf.lite.Interpreter(model_path=model_path)
                 self.interpreter.allocate_tensors()
                 self.input_details = self.interpreter.get_input_details()
@@ -44,6 +45,8 @@ class EnhancedSentimentClassifier:
         if not self.interpreter:
             return self._fallback_sentiment(text)
         
+        import numpy as np
+        
         try:
             # Prepare input - the model expects string input
             try:
@@ -146,7 +149,7 @@ class EnhancedSentimentClassifier:
         # Calculate averages
         avg_positive = total_positive / analyzed_count if analyzed_count > 0 else 0.0
         avg_negative = total_negative / analyzed_count if analyzed_count > 0 else 0.0
-        avg_confidence = np.mean(confidence_scores) if confidence_scores else 0.0
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.0
         
         # Sort by sentiment for top insights
         top_positive = sorted(
@@ -2,19 +2,46 @@
 Fetch Real-Time Trending Topics from the Internet
 Uses snscrape to get real trending topics from Twitter/X
 """
+import builtins
 import requests
 import json
 import subprocess
 import sys
+import threading
+import time
+import queue
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Callable, Iterator, Tuple
+from urllib.parse import quote_plus
 import os
 import re
+from trend_cache import TrendCache
+from snscrape_stream import get_item_source, iter_items
+from circuit_breaker import CircuitBreaker
+from metrics import SOURCE_FETCHES, SOURCE_FETCH_SECONDS, TREND_CACHE_LOOKUPS
+
+# Request-level deadline (seconds) for fetch_real_trends - whatever has arrived by then is returned
+TRENDS_DEADLINE = float(os.getenv("TRENDS_DEADLINE", "8"))
+
+# Shared lookup cache (seconds fresh, then seconds served stale while refreshing); TRENDS_CACHE=0 disables it
+TRENDS_CACHE_TTL = float(os.getenv("TRENDS_CACHE_TTL", "60"))
+TRENDS_CACHE_STALE_TTL = float(os.getenv("TRENDS_CACHE_STALE_TTL", "600"))
+
+# Circuit breaker names for the sources that can actually fail (the rest are simulated)
+SOURCE_BREAKERS = {
+    "twitter": "twitter_search",
+    "twitter_trending": "twitter_trending",
+}
+
+
+class FallbackTrends(list):
+    """Simulated trends standing in for a source that failed; fan_out reports it as 'fallback'"""
+
 
 # Redirect all print statements to stderr so only JSON goes to stdout
 def print(*args, **kwargs):
     """Override print to output to stderr"""
-    __builtins__['print'](*args, file=sys.stderr, **kwargs)
+    builtins.print(*args, file=sys.stderr, **kwargs)
 
 def analyze_sentiment_simple(text: str) -> str:
     """Simple keyword-based sentiment analysis"""
@@ -33,63 +60,57 @@ def analyze_sentiment_simple(text: str) -> str:
     else:
         return "NEUTRAL"
 
-def fetch_twitter_trends(keyword: str, limit: int = 10) -> List[Dict]:
-    """Fetch REAL trending topics from Twitter/X using snscrape"""
-    trends = []
+def stream_twitter_trends(keyword: str, limit: int = 10, timeout: float = 30, source=None) -> Iterator[Dict]:
+    """Lazily yield trend dicts for tweets about a keyword, stopping at `limit`"""
+    source = source or get_item_source()
+    # Search for recent tweets with the keyword
+    query = f"{keyword} -filter:links min_faves:10"
     
-    try:
-        # Use snscrape to fetch tweets about the keyword
-        # Search for recent tweets with the keyword
-        query = f"{keyword} -filter:links min_faves:10"
+    for tweet in iter_items(source.search(query), limit, timeout):
+        content = tweet.get('rawContent', '')
+        author = (tweet.get('user') or {}).get('username') or 'Twitter'
+        if not content:
+            continue
         
-        print(f"Fetching tweets for: {keyword}")
+        # Analyze sentiment (simple keyword-based)
+        sentiment = analyze_sentiment_simple(content)
         
-        # Run snscrape command
-        cmd = f'snscrape --jsonl --max-results {limit} twitter-search "{query}"'
-        
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
-        if result.returncode == 0 and result.stdout:
-            # Parse snscrape output (JSONL format)
-            lines = result.stdout.strip().split('\n')
+        yield {
+            "text": content[:280],  # Limit to tweet length
+            "source": f"@{author}",
+            "sentiment": sentiment,
+            "url": f"https://twitter.com/{author}/status/{tweet.get('id', '')}"
+        }
+
+
+def fetch_twitter_trends(keyword: str, limit: int = 10, timeout: float = 30, source=None) -> List[Dict]:
+    """Fetch REAL trending topics from Twitter/X using snscrape"""
+    trends = []
+    breaker = CircuitBreaker(SOURCE_BREAKERS["twitter"])
+    
+    if not breaker.allow():
+        print("⚡ snscrape circuit is open, skipping straight to fallback data")
+    else:
+        started = time.monotonic()
+        try:
+            print(f"Fetching tweets for: {keyword}")
+            # Never wait much longer than snscrape has recently needed
+            for trend in stream_twitter_trends(keyword, limit, min(timeout, breaker.timeout()), source):
+                trends.append(trend)
             
-            for i, line in enumerate(lines[:limit]):
-                if not line:
-                    continue
-                    
-                try:
-                    tweet = json.loads(line)
-                    content = tweet.get('rawContent', '')
-                    author = tweet.get('user', {}).get('username', 'Twitter')
-                    
-                    # Analyze sentiment (simple keyword-based)
-                    sentiment = analyze_sentiment_simple(content)
-                    
-                    trends.append({
-                        "text": content[:280],  # Limit to tweet length
-                        "source": f"@{author}",
-                        "sentiment": sentiment,
-                        "url": f"https://twitter.com/{author}/status/{tweet.get('id', '')}"
-                    })
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing tweet {i}: {e}")
-                    continue
-        
-        print(f"✅ Fetched {len(trends)} real tweets using snscrape")
-        
-    except subprocess.TimeoutExpired:
-        print("⚠️ snscrape timed out, using fallback data")
-    except Exception as e:
-        print(f"⚠️ Error fetching from snscrape: {e}")
+            breaker.record_success(time.monotonic() - started)
+            print(f"✅ Fetched {len(trends)} real tweets using snscrape")
+            
+        except TimeoutError:
+            breaker.record_failure(time.monotonic() - started)
+            print(f"⚠️ snscrape timed out after {len(trends)} tweets, using what arrived")
+        except Exception as e:
+            breaker.record_failure(time.monotonic() - started)
+            print(f"⚠️ Error fetching from snscrape: {e}")
     
     # Fallback to simulated data if snscrape fails or returns no results
-    if not trends:
+    simulated = not trends
+    if simulated:
         print("Using fallback simulated data")
         if keyword.lower() in ['ai', 'artificial', 'intelligence']:
             trends = [
@@ -108,7 +129,7 @@ def fetch_twitter_trends(keyword: str, limit: int = 10) -> List[Dict]:
                 {"text": f"Experts discuss future of {keyword}", "source": "Twitter", "sentiment": "NEUTRAL"},
             ]
     
-    return trends[:limit]
+    return FallbackTrends(trends[:limit]) if simulated else trends[:limit]
 
 
 def fetch_reddit_trends(keyword: str, limit: int = 10) -> List[Dict]:
@@ -168,16 +189,14 @@ def fetch_linkedin_trends(keyword: str, limit: int = 10) -> List[Dict]:
     return trends[:limit]
 
 
-def fetch_twitter_trending_by_location(location: str = "India", limit: int = 10) -> List[Dict]:
+def fetch_twitter_trending_by_location(location: str = "India", limit: int = 10, timeout: float = 30, source=None) -> List[Dict]:
     """Fetch REAL trending topics from Twitter by location using snscrape"""
     trends = []
     
     try:
         print(f"Fetching trending topics for {location}...")
         
-        # Use snscrape to fetch trending topics
-        # Note: snscrape requires specific location codes
-        # For India, we can use "23424848" or try the country name
+        # Location codes (WOEIDs) for the supported regions
         location_codes = {
             "India": "23424848",
             "USA": "23424977",
@@ -186,38 +205,29 @@ def fetch_twitter_trending_by_location(location: str = "India", limit: int = 10)
         }
         
         location_id = location_codes.get(location, location_codes["India"])
+        breaker = CircuitBreaker(SOURCE_BREAKERS["twitter_trending"])
+        if not breaker.allow():
+            print("⚡ snscrape trends circuit is open, skipping")
+            return trends
         
-        # Try to fetch trending topics
-        cmd = f'snscrape --jsonl --max-results {limit} twitter-trend "{location_id}"'
-        
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            timeout=30
-        )
-        
-        if result.returncode == 0 and result.stdout:
-            lines = result.stdout.strip().split('\n')
-            
-            for i, line in enumerate(lines[:limit]):
-                if not line:
-                    continue
-                    
-                try:
-                    trend = json.loads(line)
-                    name = trend.get('name', '')
-                    
-                    if name:
-                        sentiment = analyze_sentiment_simple(name)
-                        trends.append({
-                            "text": name,
-                            "source": "Twitter Trending",
-                            "sentiment": sentiment,
-                            "url": f"https://twitter.com/search?q={name}"
-                        })
-                except json.JSONDecodeError:
-                    continue
+        started = time.monotonic()
+        try:
+            source = source or get_item_source()
+            for trend in iter_items(source.trends(location_id), limit, min(timeout, breaker.timeout())):
+                name = trend.get('name', '')
+                
+                if name:
+                    sentiment = analyze_sentiment_simple(name)
+                    trends.append({
+                        "text": name,
+                        "source": "Twitter Trending",
+                        "sentiment": sentiment,
+                        "url": f"https://twitter.com/search?q={quote_plus(name)}"
+                    })
+        except Exception:
+            breaker.record_failure(time.monotonic() - started)
+            raise
+        breaker.record_success(time.monotonic() - started)
         
         print(f"✅ Fetched {len(trends)} real trending topics")
         
@@ -318,18 +328,78 @@ def fetch_all_trending_topics() -> Dict:
     }
 
 
-def fetch_real_trends(keyword: str) -> Dict:
-    """Fetch trending topics from multiple sources"""
+def fan_out(keyword: str, sources: List[Tuple[str, Callable, int]], deadline: float) -> Tuple[Dict[str, List[Dict]], Dict[str, Dict]]:
+    """
+    Run every source concurrently and wait at most `deadline` seconds
+    
+    Sources run on daemon threads so a hung source can neither delay the
+    response nor keep the process alive after it is written.
+    
+    Returns:
+        (results by source name, status by source name with latency in ms)
+    """
+    done = queue.Queue()
+    started = time.monotonic()
+    
+    def run(name, fetch, limit):
+        begin = time.monotonic()
+        try:
+            trends = fetch(keyword, limit=limit)
+            outcome = ("fallback" if isinstance(trends, FallbackTrends) else "ok", trends, None)
+        except Exception as e:
+            outcome = ("error", [], str(e))
+        done.put((name, outcome, time.monotonic() - begin))
+    
+    for name, fetch, limit in sources:
+        threading.Thread(target=run, args=(name, fetch, limit), name=f"trends-{name}", daemon=True).start()
+    
+    results = {}
+    status = {}
+    while len(status) < len(sources):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        try:
+            name, (state, trends, error), latency = done.get(timeout=remaining)
+        except queue.Empty:
+            break
+        results[name] = trends
+        status[name] = {"status": state, "latencyMs": round(latency * 1000), "count": len(trends)}
+        SOURCE_FETCH_SECONDS.observe(latency, source=name)
+        if error:
+            status[name]["error"] = error
+    
+    for name, _, _ in sources:
+        if name not in status:
+            print(f"⚠️ {name} missed the {deadline:.1f}s deadline")
+            status[name] = {"status": "timeout", "latencyMs": round(deadline * 1000), "count": 0}
+            # Breaker-backed sources bound their own wait by the deadline and record the
+            # timeout themselves, so it is not counted against the breaker here as well
+        if name in SOURCE_BREAKERS:
+            status[name]["circuit"] = CircuitBreaker(SOURCE_BREAKERS[name]).snapshot()["state"]
+        SOURCE_FETCHES.inc(source=name, status=status[name]["status"])
+    
+    return results, {name: status[name] for name, _, _ in sources}
+
+
+def fetch_real_trends(keyword: str, deadline: float = TRENDS_DEADLINE) -> Dict:
+    """Fetch trending topics from multiple sources concurrently under a deadline"""
     print(f"Fetching real trends for: {keyword}")
+    started = time.monotonic()
     
-    # Fetch from multiple sources
-    twitter_trends = fetch_twitter_trends(keyword, limit=5)
-    reddit_trends = fetch_reddit_trends(keyword, limit=3)
-    news_trends = fetch_news_trends(keyword, limit=3)
-    linkedin_trends = fetch_linkedin_trends(keyword, limit=2)
+    # Fetch from multiple sources; snscrape never gets longer than the request deadline
+    sources = [
+        ("twitter", lambda kw, limit: fetch_twitter_trends(kw, limit=limit, timeout=min(30, deadline)), 5),
+        ("reddit", fetch_reddit_trends, 3),
+        ("news", fetch_news_trends, 3),
+        ("linkedin", fetch_linkedin_trends, 2),
+    ]
+    results, source_status = fan_out(keyword, sources, deadline)
     
-    # Combine all trends
-    all_trends = twitter_trends + reddit_trends + news_trends + linkedin_trends
+    # Combine in a stable source order, whatever arrived in time
+    all_trends = []
+    for name, _, _ in sources:
+        all_trends.extend(results.get(name, []))
     
     # Add URLs
     for trend in all_trends:
@@ -359,16 +429,19 @@ def fetch_real_trends(keyword: str) -> Dict:
             "positive": positive,
             "negative": negative,
             "neutral": neutral,
-            "positivePercent": f"{(positive/total*100):.1f}",
-            "negativePercent": f"{(negative/total*100):.1f}",
+            "positivePercent": f"{(positive/total*100):.1f}" if total else "0.0",
+            "negativePercent": f"{(negative/total*100):.1f}" if total else "0.0",
         },
+        "sources": source_status,
+        "deadlineMs": round(deadline * 1000),
+        "elapsedMs": round((time.monotonic() - started) * 1000),
         "timestamp": datetime.utcnow().isoformat()
     }
 
 
 def store_in_mongodb(data: Dict):
     """Store trends in MongoDB"""
-    from pymongo import MongoClient
+    from mongo_store import bulk_insert, get_collection
     
     mongo_uri = os.getenv("MONGO_URI", "")
     if not mongo_uri:
@@ -376,9 +449,7 @@ def store_in_mongodb(data: Dict):
         return
     
     try:
-        client = MongoClient(mongo_uri)
-        db = client["trenddb"]
-        col = db["internet_trends"]
+        col = get_collection(mongo_uri, "internet_trends")
         
         # Store each trend as a document
         documents = []
@@ -392,35 +463,100 @@ def store_in_mongodb(data: Dict):
                 "timestamp": data['timestamp']
             })
         
-        col.insert_many(documents)
-        print(f"Stored {len(documents)} trends in MongoDB")
-        client.close()
+        inserted = bulk_insert(col, documents)
+        print(f"Stored {inserted} trends in MongoDB")
     except Exception as e:
         print(f"Error storing in MongoDB: {e}")
 
 
+def _cache_key(keyword: str = None) -> str:
+    """Keyword lookups share one entry whatever their casing"""
+    return f"keyword:{keyword.strip().lower()}" if keyword else "all"
+
+
+def _fetcher_for(key: str, deadline: float = TRENDS_DEADLINE, keyword: str = None) -> Callable[[], Dict]:
+    """
+    The uncached lookup behind a cache key (keyword results are also stored in MongoDB)
+    `keyword` is the caller's spelling; background refreshes only have the lowercased key
+    """
+    if key == "all":
+        return fetch_all_trending_topics
+    
+    keyword = keyword or key.split(":", 1)[1]
+    
+    def fetch_and_store():
+        trends = fetch_real_trends(keyword, deadline=deadline)
+        store_in_mongodb(trends)
+        return trends
+    
+    return fetch_and_store
+
+
+def _spawn_refresh(key: str, owner: str):
+    """Refresh a stale entry in a detached process so the current request returns immediately"""
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--refresh", key, owner],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except Exception as e:
+        print(f"⚠️ Could not start background refresh: {e}")
+        TrendCache().release(key, owner)
+
+
+def cached_trends(keyword: str = None, deadline: float = TRENDS_DEADLINE) -> Tuple[Dict, str]:
+    """
+    fetch_real_trends / fetch_all_trending_topics behind the shared TTL cache
+    
+    Identical concurrent lookups are coalesced into one fetch (and one MongoDB
+    insert); stale entries are served immediately and refreshed in the background.
+    
+    Returns:
+        (result, cache status: 'hit', 'stale', 'fetched' or 'coalesced')
+    """
+    keyword = keyword.strip() if keyword else None
+    key = _cache_key(keyword)
+    fetch = _fetcher_for(key, deadline, keyword)
+    if os.getenv("TRENDS_CACHE", "1") == "0":
+        return fetch(), "fetched"
+    
+    cache = TrendCache(ttl=TRENDS_CACHE_TTL, stale_ttl=TRENDS_CACHE_STALE_TTL, lease=deadline + 30)
+    try:
+        result, status = cache.get_or_fetch(key, fetch, revalidate=_spawn_refresh)
+    finally:
+        cache.close()
+    TREND_CACHE_LOOKUPS.inc(status=status)
+    # The entry may have been filled by a lookup spelled differently; echo this caller's keyword
+    if keyword and isinstance(result, dict) and "keyword" in result:
+        result = dict(result, keyword=keyword)
+    return result, status
+
+
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) < 2:
-        # Fetch all trending topics
-        trends = fetch_all_trending_topics()
-        # Print to stdout (not stderr)
-        sys.stdout.write(json.dumps(trends, indent=2))
-        sys.stdout.write('\n')
-    elif sys.argv[1] == "--all":
+    if len(sys.argv) > 3 and sys.argv[1] == "--refresh":
+        # Background refresh of a stale cache entry (the spawning process handed over its lease)
+        key, owner = sys.argv[2], sys.argv[3]
+        cache = TrendCache(ttl=TRENDS_CACHE_TTL, stale_ttl=TRENDS_CACHE_STALE_TTL)
+        cache.fetch_and_store(key, _fetcher_for(key), owner)
+        cache.close()
+    elif len(sys.argv) < 2 or sys.argv[1] == "--all":
         # Fetch all trending topics
-        trends = fetch_all_trending_topics()
+        trends, cache_status = cached_trends()
+        print(f"Trend cache: {cache_status}")
         # Print to stdout (not stderr)
         sys.stdout.write(json.dumps(trends, indent=2))
         sys.stdout.write('\n')
     else:
-        # Fetch trends for specific keyword
+        # Fetch trends for specific keyword (stored in MongoDB only when actually fetched)
         keyword = sys.argv[1]
-        trends = fetch_real_trends(keyword)
-        
-        # Store in MongoDB
-        store_in_mongodb(trends)
+        deadline = float(sys.argv[sys.argv.index("--deadline") + 1]) if "--deadline" in sys.argv else TRENDS_DEADLINE
+        trends, cache_status = cached_trends(keyword, deadline=deadline)
+        print(f"Trend cache: {cache_status}")
         
         # Print results to stdout (not stderr)
         sys.stdout.write(json.dumps(trends, indent=2))
@@ -0,0 +1,148 @@
+"""
+Record/replay fixture store for the scraper sessions
+In record mode every GET goes to the network and the response is saved; in
+replay mode responses come only from the store, so extraction can be exercised
+and benchmarked offline and reproducibly
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_FIXTURE_DIR = os.getenv(
+    "SCRAPER_FIXTURE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "recorded")
+)
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Headers describing the wire encoding - the stored body is already decoded
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+class FixtureMissing(requests.ConnectionError):
+    """Replay mode found no recorded response for the request"""
+
+
+class FixtureStore:
+    """
+    Recorded responses keyed by method and URL
+
+    Args:
+        fixture_dir: Directory holding <key>.json metadata and <key>.body payloads,
+            created by the first recording
+    """
+
+    def __init__(self, fixture_dir: str = DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+
+    def _paths(self, method: str, url: str):
+        key = hashlib.sha256(f"{method.upper()} {url}".encode('utf-8')).hexdigest()[:24]
+        base = os.path.join(self.fixture_dir, key)
+        return f"{base}.json", f"{base}.body"
+
+    def save(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes,
+             reason: Optional[str] = None):
+        meta_path, body_path = self._paths(method, url)
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with open(body_path, 'wb') as f:
+            f.write(body)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "method": method.upper(),
+                "url": url,
+                "status": status,
+                "reason": reason,
+                "headers": {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS}
+            }, f, indent=2)
+
+    def load(self, method: str, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(method, url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def entries(self) -> Iterator[Dict]:
+        """Every recorded response (metadata and body), in file name order"""
+        if not os.path.isdir(self.fixture_dir):
+            return
+        for name in sorted(os.listdir(self.fixture_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.fixture_dir, name), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                entry = self.load(meta["method"], meta["url"])
+                if entry:
+                    yield entry
+
+
+class FixtureAdapter(HTTPAdapter):
+    """Transport adapter that records responses to, or replays them from, a FixtureStore"""
+
+    def __init__(self, store: FixtureStore, mode: str, **kwargs):
+        super().__init__(**kwargs)
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown fixture mode: {mode}")
+        self.store = store
+        self.mode = mode
+
+    def _replayed_response(self, request, entry: Dict) -> Response:
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        # Served locally - callers skip their politeness delay as for cache hits
+        response.from_cache = True
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.mode == REPLAY:
+            entry = self.store.load(request.method, request.url)
+            if entry is None:
+                raise FixtureMissing(f"No recorded response for {request.method} {request.url}", request=request)
+            return self._replayed_response(request, entry)
+
+        response = super().send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        self.store.save(request.method, request.url, response.status_code, dict(response.headers),
+                        response.content, response.reason)
+        response.from_cache = False
+        return response
+
+
+def fixture_mode(mode: Optional[str] = None) -> Optional[str]:
+    """'record', 'replay' or None, from `mode` or SCRAPER_FIXTURES"""
+    mode = (mode or os.getenv("SCRAPER_FIXTURES", "")).lower()
+    return mode if mode in (RECORD, REPLAY) else None
+
+
+def install_fixtures(session, mode: Optional[str] = None,
+                     store: Optional[FixtureStore] = None) -> Optional[FixtureStore]:
+    """
+    Mount the fixture adapter when SCRAPER_FIXTURES (or `mode`) is 'record' or 'replay'
+    It replaces any cache adapter, so recordings reflect the live site
+    """
+    mode = fixture_mode(mode)
+    if mode is None:
+        return None
+    store = store or FixtureStore()
+    adapter = FixtureAdapter(store, mode)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return store
@@ -0,0 +1,82 @@
+"""
+Google News RSS ingestion
+Lightweight alternative to scraping news.google.com/search HTML: the RSS search
+feed is streamed and parsed incrementally, stopping once enough items are read
+"""
+import html
+import re
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import quote_plus
+from xml.etree.ElementTree import XMLPullParser
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def google_news_rss_url(query: str, hl: str = "en-IN", gl: str = "IN", ceid: str = "IN:en") -> str:
+    """Build the Google News RSS search feed URL for a query"""
+    return f"https://news.google.com/rss/search?q={quote_plus(query)}&hl={hl}&gl={gl}&ceid={ceid}"
+
+
+def _clean_text(value: Optional[str]) -> str:
+    """Strip the HTML markup Google embeds in item descriptions"""
+    if not value:
+        return ""
+    return html.unescape(TAG_PATTERN.sub(' ', value)).replace('\xa0', ' ').strip()
+
+
+def _item_to_dict(item) -> Dict:
+    publisher = _clean_text(item.findtext('source'))
+    title = _clean_text(item.findtext('title'))
+    # Feed titles are "Headline - Publisher"; drop the publisher suffix
+    if publisher and title.endswith(f" - {publisher}"):
+        title = title[:-len(publisher) - 3]
+
+    description = _clean_text(item.findtext('description'))
+    if publisher and description.endswith(publisher):
+        description = description[:-len(publisher)].strip()
+
+    return {
+        "title": title,
+        "url": (item.findtext('link') or "").strip(),
+        "published": (item.findtext('pubDate') or "").strip(),
+        "publisher": publisher,
+        "description": description
+    }
+
+
+def parse_rss_items(chunks: Iterable[bytes], max_items: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Incrementally parse RSS <item> elements from byte chunks
+    Each item is released once yielded, so memory stays flat for long feeds
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    channel = None
+    count = 0
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                if element.tag == 'channel':
+                    channel = element
+                continue
+            if element.tag != 'item':
+                continue
+
+            yield _item_to_dict(element)
+            count += 1
+            if channel is not None:
+                channel.remove(element)
+            if max_items is not None and count >= max_items:
+                return
+
+
+def fetch_rss_items(session, query: str, max_items: Optional[int] = None,
+                    timeout: float = 15, chunk_size: int = 16 * 1024) -> Iterator[Dict]:
+    """Stream the RSS search feed for a query, closing the connection once max_items are read"""
+    response = session.get(google_news_rss_url(query), timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        yield from parse_rss_items(response.iter_content(chunk_size=chunk_size), max_items)
+    finally:
+        response.close()
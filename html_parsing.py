@@ -0,0 +1,95 @@
+"""
+HTML parsing backend for the news scrapers
+Picks the fastest available BeautifulSoup tree builder, restricts parsing to
+article subtrees and precompiles CSS selectors once per config
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Parser preference: C-accelerated lxml first, pure-Python html.parser as fallback
+PREFERRED_PARSERS = ["lxml", "html.parser"]
+
+
+def _detect_parser() -> str:
+    forced = os.getenv("SCRAPER_HTML_PARSER", "")
+    if forced:
+        return forced
+    for name in PREFERRED_PARSERS:
+        try:
+            BeautifulSoup("", name)
+            return name
+        except Exception:
+            continue
+    return "html.parser"
+
+
+HTML_PARSER = _detect_parser()
+
+# Selectors simple enough to express as a SoupStrainer: "tag", ".class" or "tag.class"
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:\.([\w-]+))?$')
+
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str):
+    """Compile a CSS selector once; empty selectors compile to None"""
+    if not selector:
+        return None
+    return soupsieve.compile(selector)
+
+
+def select_first(element, selector):
+    """select_one with a precompiled selector (None-safe)"""
+    if selector is None:
+        return None
+    return selector.select_one(element)
+
+
+@lru_cache(maxsize=64)
+def _compile_config(items) -> Dict:
+    return {key: compile_selector(value) if key.endswith('_selector') else value for key, value in items}
+
+
+def compile_config(config: Dict, defaults: Optional[Dict] = None) -> Dict:
+    """Return the config with every *_selector value precompiled (cached per config)"""
+    merged = dict(defaults or {})
+    merged.update(config)
+    return _compile_config(tuple(sorted(merged.items())))
+
+
+def strainer_for(selector: str) -> Optional[SoupStrainer]:
+    """Build a SoupStrainer for each comma-separated part, or None if any part is too complex"""
+    names, classes = [], []
+    for part in (p.strip() for p in selector.split(',')):
+        match = SIMPLE_SELECTOR.match(part)
+        if not part or not match:
+            return None
+        name, css_class = match.groups()
+        if name and css_class:
+            # Mixed tag+class parts cannot be OR-ed with others in one strainer
+            if len(selector.split(',')) > 1:
+                return None
+            return SoupStrainer(name, class_=css_class)
+        if name:
+            names.append(name)
+        else:
+            classes.append(css_class)
+
+    if names and classes:
+        return None
+    if names:
+        return SoupStrainer(names)
+    return SoupStrainer(class_=classes)
+
+
+def make_soup(html, parse_only: Optional[str] = None) -> BeautifulSoup:
+    """
+    Parse HTML with the configured backend
+    If parse_only is a selector, only matching subtrees are built
+    """
+    strainer = strainer_for(parse_only) if parse_only else None
+    return BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
@@ -0,0 +1,317 @@
+"""
+HTTP response cache for the scraper requests sessions
+Stores bodies compressed on disk with their ETag/Last-Modified validators,
+serves fresh entries locally and revalidates stale ones with conditional GETs.
+Entries stale for longer than max_stale are pruned, and the directory is kept
+under max_bytes by dropping the least recently written entries
+"""
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from metrics import HTTP_CACHE_REQUESTS
+
+DEFAULT_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+DEFAULT_MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "256")) * 2 ** 20)
+DEFAULT_MAX_STALE = float(os.getenv("HTTP_CACHE_MAX_STALE", str(7 * 24 * 3600)))  # Seconds past expiry
+
+PRUNE_EVERY = 200  # Stores between prune passes
+PRUNE_INTERVAL = float(os.getenv("HTTP_CACHE_PRUNE_INTERVAL", "3600"))  # Seconds between startup prunes
+PRUNE_STAMP = ".last_prune"
+
+# Headers describing the wire encoding - the stored body is already decoded
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def _freshness_lifetime(headers, default_ttl: float) -> Optional[float]:
+    """Seconds a response stays fresh, or None if it must not be stored"""
+    directives = _parse_cache_control(headers.get('Cache-Control', ''))
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                pass
+    if headers.get('Expires'):
+        try:
+            expires = email.utils.parsedate_to_datetime(headers['Expires']).timestamp()
+            return max(0.0, expires - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+def _varies(headers) -> bool:
+    """
+    True if the response varies on request headers the URL key does not capture.
+    Accept-Encoding is ignored: bodies are stored decoded and requests always
+    sends the same value
+    """
+    fields = {f.strip().lower() for f in headers.get('Vary', '').split(',') if f.strip()}
+    return bool(fields - {'accept-encoding'})
+
+
+class HTTPCache:
+    """
+    On-disk response cache keyed by URL (responses that vary on other request headers are not stored)
+
+    Args:
+        cache_dir: Directory holding <key>.json metadata and <key>.body compressed bodies
+        default_ttl: Freshness for responses without Cache-Control/Expires
+        min_ttl: Serve entries locally for at least this long, whatever the server says
+        max_bytes: Size budget for stored bodies and metadata (0 disables the size limit)
+        max_stale: Drop entries this many seconds past expiry, as they are unlikely to revalidate
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, default_ttl: float = 0.0, min_ttl: float = 0.0,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_stale: float = DEFAULT_MAX_STALE):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self.counts = {"hit": 0, "revalidated": 0, "miss": 0}
+        self._lock = threading.Lock()
+        self._stores = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.json", f"{base}.body"
+
+    def load(self, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = zlib.decompress(f.read())
+            return entry
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def _write(self, url: str, entry: Dict, body: Optional[bytes] = None):
+        meta_path, body_path = self._paths(url)
+        if body is not None:
+            tmp = f"{body_path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(tmp, body_path)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def store(self, url: str, response: Response) -> Optional[Dict]:
+        """Store a 200 response if it is cacheable"""
+        lifetime = _freshness_lifetime(response.headers, self.default_ttl)
+        if lifetime is None or _varies(response.headers):
+            self._remove(os.path.splitext(self._paths(url)[0])[0])  # Never serve a stale copy in its place
+            return None
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS}
+        entry = {
+            "url": url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+            "stored_at": time.time(),
+            "expires_at": time.time() + max(lifetime, self.min_ttl),
+            "etag": response.headers.get('ETag'),
+            "last_modified": response.headers.get('Last-Modified')
+        }
+        self._write(url, entry, response.content)
+        with self._lock:
+            self._stores += 1
+            due = self._stores % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+        return entry
+
+    def refresh(self, url: str, entry: Dict, not_modified: Response):
+        """Extend a revalidated entry using the 304 response headers"""
+        for name in ('Cache-Control', 'Expires', 'ETag', 'Last-Modified', 'Date'):
+            if name in not_modified.headers:
+                entry['headers'][name] = not_modified.headers[name]
+        lifetime = _freshness_lifetime(CaseInsensitiveDict(entry['headers']), self.default_ttl) or 0.0
+        entry['expires_at'] = time.time() + max(lifetime, self.min_ttl)
+        entry['etag'] = entry['headers'].get('ETag', entry.get('etag'))
+        entry['last_modified'] = entry['headers'].get('Last-Modified', entry.get('last_modified'))
+        self._write(url, entry)
+
+    @staticmethod
+    def _remove(base: str):
+        for path in (f"{base}.json", f"{base}.body"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def prune(self) -> int:
+        """
+        Remove long-expired entries, then the least recently written ones until
+        the directory fits in max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            base = os.path.join(self.cache_dir, name[:-len('.json')])
+            try:
+                with open(f"{base}.json", 'r', encoding='utf-8') as f:
+                    expires_at = json.load(f).get('expires_at', 0)
+                meta = os.stat(f"{base}.json")
+                size = meta.st_size + (os.path.getsize(f"{base}.body") if os.path.exists(f"{base}.body") else 0)
+            except (OSError, ValueError):
+                continue  # Being written or removed by another process
+            entries.append((meta.st_mtime, size, expires_at, base))
+
+        removed = 0
+        total = sum(size for _, size, _, _ in entries)
+        # Oldest first, so the size budget evicts the least recently stored or refreshed entries
+        for mtime, size, expires_at, base in sorted(entries):
+            if expires_at + self.max_stale >= now and (not self.max_bytes or total <= self.max_bytes):
+                continue
+            self._remove(base)
+            total -= size
+            removed += 1
+        return removed
+
+    def prune_if_due(self, interval: float = PRUNE_INTERVAL) -> int:
+        """
+        Prune unless some process already did within `interval` seconds
+        A stamp file's mtime records the last pass, so short-lived processes
+        do not each scan the whole directory on startup
+        """
+        stamp = os.path.join(self.cache_dir, PRUNE_STAMP)
+        try:
+            if time.time() - os.path.getmtime(stamp) < interval:
+                return 0
+        except OSError:
+            pass  # Never pruned
+        with open(stamp, 'a'):
+            os.utime(stamp)
+        return self.prune()
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+        HTTP_CACHE_REQUESTS.inc(outcome=outcome)
+
+    def stats(self) -> Dict:
+        """Hit / revalidate / miss counts and rates since this cache was created"""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        stats = dict(counts, total=total)
+        for outcome, count in counts.items():
+            stats[f"{outcome}_rate"] = round(count / total, 3) if total else 0.0
+        return stats
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that answers GETs from an HTTPCache when it can"""
+
+    def __init__(self, cache: HTTPCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def _cached_response(self, request, entry: Dict) -> Response:
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if request.method != 'GET':
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        url = request.url
+        entry = self.cache.load(url)
+        if entry and entry['expires_at'] > time.time():
+            self.cache.record("hit")
+            return self._cached_response(request, entry)
+
+        if entry:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        # Buffered bodies are stored; streamed ones are passed through so the caller can stop
+        # reading early (e.g. the RSS feed once enough items are parsed), and are not stored
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        if response.status_code == 304 and entry:
+            self.cache.record("revalidated")
+            self.cache.refresh(url, entry, response)
+            response.close()
+            return self._cached_response(request, entry)
+
+        self.cache.record("miss")
+        if response.status_code == 200 and not stream:
+            self.cache.store(url, response)
+        response.from_cache = False
+        return response
+
+
+_shared_caches: Dict[str, HTTPCache] = {}
+
+
+def get_shared_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> HTTPCache:
+    """One HTTPCache per directory per process, so every session reports into the same stats"""
+    if cache_dir not in _shared_caches:
+        _shared_caches[cache_dir] = HTTPCache(
+            cache_dir,
+            default_ttl=float(os.getenv("HTTP_CACHE_DEFAULT_TTL", "0")),
+            min_ttl=float(os.getenv("HTTP_CACHE_MIN_TTL", "0"))
+        )
+        _shared_caches[cache_dir].prune_if_due()
+    return _shared_caches[cache_dir]
+
+
+def install_cache(session, cache: Optional[HTTPCache] = None) -> Optional[HTTPCache]:
+    """Mount the caching adapter on a requests session (disable with HTTP_CACHE=0)"""
+    if os.getenv("HTTP_CACHE", "1") == "0":
+        return None
+    cache = cache or get_shared_cache()
+    adapter = CachingAdapter(cache)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return cache
@@ -0,0 +1,176 @@
+"""
+Large-corpus topic modeling
+Fits BERTopic on a bounded reservoir sample of stored posts, then assigns topics
+to the full collection with transform() in fixed-size chunks streamed from
+MongoDB, so peak memory depends on the sample and chunk sizes, not the corpus
+"""
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from analyze import build_topic_names, detect_topics
+from mongo_store import DEFAULT_DATABASE, bulk_write, get_collection, update_op
+
+TOPIC_SAMPLE_SIZE = int(os.getenv("TOPIC_SAMPLE_SIZE", "50000"))
+TOPIC_CHUNK_SIZE = int(os.getenv("TOPIC_CHUNK_SIZE", "5000"))
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10  # bytes on macOS, KiB on Linux
+    except ImportError:
+        return 0.0
+
+
+def reservoir_sample(items: Iterable, size: int, seed: Optional[int] = None) -> List:
+    """Uniform sample of `size` items from a stream of unknown length (Algorithm R)"""
+    rng = random.Random(seed)
+    sample = []
+    for seen, item in enumerate(items):
+        if seen < size:
+            sample.append(item)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < size:
+                sample[slot] = item
+    return sample
+
+
+def iter_chunks(cursor, chunk_size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_large_corpus_topics(mongo_uri: str, sample_size: int = TOPIC_SAMPLE_SIZE,
+                            chunk_size: int = TOPIC_CHUNK_SIZE, query: Optional[Dict] = None,
+                            database: str = DEFAULT_DATABASE, collection: str = "posts",
+                            seed: Optional[int] = None) -> Dict:
+    """
+    Re-topic every matching post without holding the corpus in memory
+
+    Args:
+        mongo_uri: MongoDB connection string
+        sample_size: Posts the model is fitted on (bounds UMAP/HDBSCAN memory)
+        chunk_size: Posts embedded and assigned per transform() call
+        query: Filter selecting the posts to model (all posts by default)
+        database / collection: Where the posts live
+        seed: Reservoir sampling seed
+
+    Returns:
+        Summary with sample/fit timings and per-chunk throughput and RSS
+    """
+    col = get_collection(mongo_uri, collection, database)
+    query = query or {}
+
+    # Pass 1: reservoir-sample the texts (only the sample is kept)
+    started = time.perf_counter()
+    cursor = col.find(query, {"text": 1, "_id": 0}).batch_size(chunk_size)
+    sample = reservoir_sample((doc.get("text", "") for doc in cursor), sample_size, seed)
+    if not sample:
+        print("No posts to model", file=sys.stderr)
+        return {"sampled": 0, "chunks": []}
+    sample_seconds = time.perf_counter() - started
+    sampled = len(sample)
+    print(f"Sampled {sampled} posts in {sample_seconds:.1f}s (RSS {rss_mb():.0f} MiB)", file=sys.stderr)
+
+    # Fit on the sample only
+    started = time.perf_counter()
+    sample_topics, topic_model = detect_topics(sample)
+    topic_names = build_topic_names(topic_model, sample_topics)
+    fit_seconds = time.perf_counter() - started
+    del sample, sample_topics
+    print(f"Fitted topic model in {fit_seconds:.1f}s (RSS {rss_mb():.0f} MiB)", file=sys.stderr)
+
+    # Pass 2: stream the corpus through transform() chunk by chunk
+    chunks = []
+    total = 0
+    # _id order keeps the scan stable while the same documents are being updated
+    cursor = col.find(query, {"text": 1}).sort("_id", 1).batch_size(chunk_size)
+    for number, chunk in enumerate(iter_chunks(cursor, chunk_size), 1):
+        chunk_started = time.perf_counter()
+        topics, _ = topic_model.transform([doc.get("text", "") for doc in chunk])
+        bulk_write(col, [
+            update_op({"_id": doc["_id"]}, {"$set": {
+                "topic": int(topic),
+                "topic_name": topic_names.get(int(topic), f"Topic {topic}")
+            }})
+            for doc, topic in zip(chunk, topics)
+        ])
+        seconds = time.perf_counter() - chunk_started
+        total += len(chunk)
+        stats = {
+            "chunk": number,
+            "posts": len(chunk),
+            "seconds": round(seconds, 3),
+            "postsPerSecond": round(len(chunk) / seconds, 1) if seconds else 0.0,
+            "rssMb": round(rss_mb(), 1)
+        }
+        chunks.append(stats)
+        print(f"   Chunk {number}: {stats['posts']} posts, {stats['postsPerSecond']} posts/s, RSS {stats['rssMb']} MiB", file=sys.stderr)
+
+    return {
+        "sampled": sampled,
+        "posts": total,
+        "topics": len(topic_names),
+        "sampleSeconds": round(sample_seconds, 3),
+        "fitSeconds": round(fit_seconds, 3),
+        "chunks": chunks,
+        "peakRssMb": max((c["rssMb"] for c in chunks), default=round(rss_mb(), 1))
+    }
+
+
+def main():
+    """
+    Usage: python large_corpus.py [--sample-size N] [--chunk-size N] [--since-hours H] [--json]
+    """
+    import argparse
+    import datetime
+    import json
+
+    parser = argparse.ArgumentParser(description="Sample-fit, stream-transform topic modeling")
+    parser.add_argument('--sample-size', type=int, default=TOPIC_SAMPLE_SIZE)
+    parser.add_argument('--chunk-size', type=int, default=TOPIC_CHUNK_SIZE)
+    parser.add_argument('--since-hours', type=float, default=None, help="Only model recent posts")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="Print the run summary as JSON")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI", "")
+    if not mongo_uri:
+        print("MONGO_URI not set")
+        sys.exit(1)
+
+    query = None
+    if args.since_hours is not None:
+        query = {"timestamp": {"$gte": datetime.datetime.utcnow() - datetime.timedelta(hours=args.since_hours)}}
+
+    # With --json only the summary goes to stdout; progress (including detect_topics') goes to stderr
+    stdout = sys.stdout
+    if args.json:
+        sys.stdout = sys.stderr
+    try:
+        summary = run_large_corpus_topics(mongo_uri, args.sample_size, args.chunk_size, query, seed=args.seed)
+    finally:
+        sys.stdout = stdout
+    if args.json:
+        print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
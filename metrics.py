@@ -0,0 +1,228 @@
+"""
+Process metrics in the Prometheus text exposition format
+Counters, gauges and latency histograms shared by the scrapers, caches, Mongo
+layer and long-running loops; exported on a local HTTP port (METRICS_PORT)
+and/or written atomically to a textfile (METRICS_TEXTFILE) for node_exporter
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+METRICS_PORT = os.getenv("METRICS_PORT", "")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+
+# Seconds; covers cache hits through slow model passes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: Dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+                    for key, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple, List] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+def _get_or_create(cls, name, documentation, labels, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, documentation, labels, **kwargs)
+        elif type(metric) is not cls or metric.label_names != tuple(labels):
+            raise ValueError(f"Metric {name} already registered with a different type or labels")
+        return metric
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    return _get_or_create(Counter, name, documentation, labels)
+
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    return _get_or_create(Gauge, name, documentation, labels)
+
+
+def histogram(name: str, documentation: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+
+def render() -> str:
+    """Every registered metric in the text exposition format"""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def write_textfile(path: Optional[str] = None) -> Optional[str]:
+    """Atomically write the current metrics (node_exporter textfile collector format)"""
+    path = path or METRICS_TEXTFILE
+    if not path:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the loop's own output
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread (idempotent per process)"""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+def start_exporter() -> bool:
+    """Start whatever METRICS_PORT / METRICS_TEXTFILE configure; True if anything exports"""
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT))
+    return bool(METRICS_PORT or METRICS_TEXTFILE)
+
+
+# Shared metrics (defined here so every module reports into the same series)
+POSTS_SCRAPED = counter("trends_posts_scraped_total", "Posts collected by the scrapers", ["source"])
+ITEMS_CLASSIFIED = counter("trends_items_classified_total", "Texts run through a sentiment model", ["model"])
+HTTP_CACHE_REQUESTS = counter("trends_http_cache_requests_total", "Scraper HTTP cache lookups", ["outcome"])
+TREND_CACHE_LOOKUPS = counter("trends_trend_cache_lookups_total", "Shared trend cache lookups", ["status"])
+MONGO_WRITE_SECONDS = histogram("trends_mongo_write_seconds", "MongoDB batch write latency", ["collection", "operation"])
+SOURCE_FETCH_SECONDS = histogram("trends_source_fetch_seconds", "Per-source trend fetch latency", ["source"])
+SOURCE_FETCHES = counter("trends_source_fetches_total", "Per-source trend fetches by outcome", ["source", "status"])
+ITERATION_SECONDS = histogram("trends_loop_iteration_seconds", "Duration of one long-running loop iteration", ["loop"])
+ITERATIONS = counter("trends_loop_iterations_total", "Long-running loop iterations by outcome", ["loop", "status"])
+LAST_ITERATION = gauge("trends_loop_last_success_timestamp_seconds", "Unix time of the last successful iteration", ["loop"])
+LOOP_PHASE_SECONDS = histogram("trends_loop_phase_seconds", "Duration of a loop's collect and process phases", ["loop", "phase"])
+TICKS_MISSED = counter("trends_loop_missed_ticks_total", "Scheduled ticks coalesced into a late run", ["loop"])
+MODEL_LOAD_SECONDS = histogram("trends_model_load_seconds", "Time to load a model into the registry", ["model"])
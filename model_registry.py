@@ -0,0 +1,413 @@
+"""
+Process-wide model registry
+Each model is loaded once per process and kept resident, keyed by kind, name,
+device, precision and backend, so repeated analysis runs (realtime iterations,
+chat searches) pay the load cost only once. Supports explicit warmup and
+optional eviction of models left idle for MODEL_IDLE_SECONDS
+
+On CPU the models can be served with dynamic int8 quantization
+(MODEL_PRECISION=int8) or as exported ONNX graphs on onnxruntime
+(INFERENCE_BACKEND=onnx, needs optimum[onnxruntime]), with INFERENCE_THREADS
+fixing the intra-op thread pool. Each model is exported to ONNX once, into
+ONNX_DIR, and later processes load the saved graph
+"""
+import functools
+import gc
+import inspect
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import MODEL_LOAD_SECONDS
+
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "cardiffnlp/twitter-roberta-base-sentiment-latest")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# 0 leaves the framework default (one thread per core)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# 0 keeps models resident for the life of the process
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "0"))
+# Output of prepare_models.py; set MODELS_DIR="" to always go through the hub cache
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+# Saved ONNX graphs (written by prepare_models.py --onnx, or on first use)
+ONNX_DIR = os.getenv("ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "onnx"))
+# Written last by prepare_models.py, so a half-finished export is never used
+PREPARED_MARKER = "prepared.json"
+
+PRECISIONS = ("fp32", "fp16", "int8")
+BACKENDS = ("torch", "onnx")
+WARMUP_TEXT = "Warming up the model with a short example sentence."
+
+# (kind, name, device, precision, backend)
+ModelKey = Tuple[str, str, str, str, str]
+
+
+def default_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@functools.lru_cache(maxsize=None)
+def get_device() -> str:
+    """default_device(), announced once per process (imports torch on first call)"""
+    device = default_device()
+    print(f"Using device: {device} ({'GPU' if device == 'cuda' else 'CPU'})")
+    return device
+
+
+def _resolve_backend(device: str, backend: Optional[str]) -> str:
+    backend = (backend or INFERENCE_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    # The ONNX path is CPU-only here; GPUs keep running PyTorch
+    return "torch" if device != "cpu" else backend
+
+
+def _resolve_precision(device: str, precision: Optional[str], backend: str) -> str:
+    precision = (precision or MODEL_PRECISION).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+    if backend == "onnx":
+        return "fp32"  # onnxruntime runs the exported fp32 graph
+    # Half precision only pays off (and is only reliably supported) on GPU,
+    # dynamic int8 quantization only exists for CPU kernels
+    if device == "cpu":
+        return "fp32" if precision == "fp16" else precision
+    return "fp32" if precision == "int8" else precision
+
+
+def _set_torch_threads():
+    if INFERENCE_THREADS:
+        import torch
+        torch.set_num_threads(INFERENCE_THREADS)
+
+
+def _onnx_session_options():
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    if INFERENCE_THREADS:
+        options.intra_op_num_threads = INFERENCE_THREADS
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _quantize_int8(module):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations quantized per batch)"""
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def prepared_path(name: str, models_dir: Optional[str] = None) -> str:
+    """Directory prepare_models.py exports `name` to (hub-cache style slug)"""
+    return os.path.join(MODELS_DIR if models_dir is None else models_dir, name.replace("/", "--"))
+
+
+def resolve_source(name: str, models_dir: Optional[str] = None) -> str:
+    """
+    Prepared local copy of the model if one exists (in models_dir, MODELS_DIR by default), else the hub name
+    A prepared directory holds safetensors weights (memory-mapped on load) and a
+    serialized fast tokenizer, and loads without network access or hub lookups
+    """
+    models_dir = MODELS_DIR if models_dir is None else models_dir
+    if models_dir:
+        path = prepared_path(name, models_dir)
+        if os.path.exists(os.path.join(path, PREPARED_MARKER)):
+            return path
+    return name
+
+
+def onnx_path(name: str, onnx_dir: Optional[str] = None) -> str:
+    """Directory holding the saved ONNX export of `name`"""
+    return prepared_path(name, ONNX_DIR if onnx_dir is None else onnx_dir)
+
+
+def _require_sentence_transformers_onnx():
+    from sentence_transformers import SentenceTransformer
+
+    if "backend" not in inspect.signature(SentenceTransformer.__init__).parameters:
+        raise ImportError("INFERENCE_BACKEND=onnx needs sentence-transformers>=3.2", name="sentence-transformers>=3.2")
+
+
+def _export_onnx_sentiment(source: str, path: str, local: Dict):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    ORTModelForSequenceClassification.from_pretrained(source, export=True, **local).save_pretrained(path)
+    AutoTokenizer.from_pretrained(source, **local).save_pretrained(path)
+
+
+def _export_onnx_embedding(source: str, path: str, local: Dict):
+    from sentence_transformers import SentenceTransformer
+
+    _require_sentence_transformers_onnx()
+    # Exports through optimum because the source has no model.onnx; save() keeps onnx/model.onnx
+    SentenceTransformer(source, device="cpu", backend="onnx").save(path)
+
+
+def export_onnx(kind: str, name: str, onnx_dir: Optional[str] = None, force: bool = False,
+                models_dir: Optional[str] = None) -> str:
+    """
+    Export a model to ONNX once and return the saved directory
+    Like prepare_models.py, the export is written next to the target and swapped
+    in with its marker already present, so loaders never see a partial graph
+
+    Args:
+        kind: 'sentiment' or 'embedding'
+        name: Hub model name (the prepared copy is exported when there is one)
+        onnx_dir: Parent directory (ONNX_DIR by default)
+        force: Re-export even if a saved graph exists
+        models_dir: Where to look for the prepared copy (MODELS_DIR by default)
+    """
+    path = onnx_path(name, onnx_dir)
+    if os.path.exists(os.path.join(path, PREPARED_MARKER)) and not force:
+        return path
+
+    source = resolve_source(name, models_dir)
+    local = {"local_files_only": True} if source != name else {}
+    print(f"📦 Exporting {kind} model {name} to ONNX (once, into {path})...", file=sys.stderr)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    started = time.perf_counter()
+    ONNX_EXPORTERS[kind](source, tmp, local)
+    with open(os.path.join(tmp, PREPARED_MARKER), 'w', encoding='utf-8') as f:
+        json.dump({"kind": kind, "name": name, "backend": "onnx",
+                   "exportSeconds": round(time.perf_counter() - started, 2),
+                   "preparedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+
+ONNX_EXPORTERS = {"sentiment": _export_onnx_sentiment, "embedding": _export_onnx_embedding}
+
+
+def _load_sentiment(name: str, device: str, precision: str, backend: str):
+    from transformers import pipeline
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        path = export_onnx("sentiment", name)
+        model = ORTModelForSequenceClassification.from_pretrained(
+            path, session_options=_onnx_session_options(), local_files_only=True
+        )
+        return pipeline("sentiment-analysis", model=model, tokenizer=AutoTokenizer.from_pretrained(path, local_files_only=True))
+
+    source = resolve_source(name)
+    local = {"local_files_only": True} if source != name else {}
+
+    import torch
+
+    _set_torch_threads()
+    kwargs = {"torch_dtype": torch.float16} if precision == "fp16" else {}
+    if local:
+        kwargs["model_kwargs"] = local
+    sentiment = pipeline("sentiment-analysis", model=source, tokenizer=source, device=0 if device == "cuda" else -1, **kwargs)
+    if precision == "int8":
+        sentiment.model = _quantize_int8(sentiment.model)
+    return sentiment
+
+
+def _load_embedding(name: str, device: str, precision: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        _require_sentence_transformers_onnx()
+        return SentenceTransformer(export_onnx("embedding", name), device="cpu", backend="onnx",
+                                   model_kwargs={"session_options": _onnx_session_options()}, local_files_only=True)
+
+    _set_torch_threads()
+    model = SentenceTransformer(resolve_source(name), device=device)
+    if precision == "int8":
+        return _quantize_int8(model)
+    return model.half() if precision == "fp16" else model
+
+
+def _warm_sentiment(model):
+    model(WARMUP_TEXT)
+
+
+def _warm_embedding(model):
+    model.encode([WARMUP_TEXT], show_progress_bar=False)
+
+
+# kind -> (loader, warmup)
+MODEL_KINDS: Dict[str, Tuple[Callable, Callable]] = {
+    "sentiment": (_load_sentiment, _warm_sentiment),
+    "embedding": (_load_embedding, _warm_embedding),
+}
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.model = None
+        self.warm = False
+        self.load_seconds = 0.0
+        self.last_used = 0.0
+        self.uses = 0
+
+
+class ModelRegistry:
+    """
+    Loaded models keyed by (kind, name, device, precision, backend)
+
+    Args:
+        idle_seconds: Evict models unused for this long (0 disables eviction)
+    """
+
+    def __init__(self, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def key(self, kind: str, name: str, device: Optional[str] = None, precision: Optional[str] = None,
+            backend: Optional[str] = None) -> ModelKey:
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"Unknown model kind: {kind} (expected one of {', '.join(MODEL_KINDS)})")
+        device = device or default_device()
+        backend = _resolve_backend(device, backend)
+        return kind, name, device, _resolve_precision(device, precision, backend), backend
+
+    def get(self, kind: str, name: str, device: Optional[str] = None, precision: Optional[str] = None,
+            backend: Optional[str] = None):
+        """The resident model, loading it on first use (concurrent callers share one load)"""
+        key = self.key(kind, name, device, precision, backend)
+        while True:
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry())
+            with entry.lock:
+                if self._entries.get(key) is not entry:
+                    continue  # Evicted while we waited for the lock
+                if entry.model is None:
+                    started = time.perf_counter()
+                    prepared = " from prepared copy" if resolve_source(name) != name else ""
+                    print(f"📦 Loading {kind} model {name}{prepared} ({', '.join(key[2:])})...", file=sys.stderr)
+                    entry.model = MODEL_KINDS[kind][0](name, *key[2:])
+                    entry.load_seconds = time.perf_counter() - started
+                    MODEL_LOAD_SECONDS.observe(entry.load_seconds, model=f"{kind}:{name}")
+                entry.last_used = time.monotonic()
+                entry.uses += 1
+                self._start_reaper()
+                return entry.model
+
+    def warmup(self, kind: str, name: str, device: Optional[str] = None, precision: Optional[str] = None,
+               backend: Optional[str] = None):
+        """Load the model and run one throwaway inference so the first real batch is not slowed down"""
+        model = self.get(kind, name, device, precision, backend)
+        entry = self._entries.get(self.key(kind, name, device, precision, backend))
+        if entry is not None:
+            with entry.lock:
+                if not entry.warm and entry.model is model:
+                    MODEL_KINDS[kind][1](model)
+                    entry.warm = True
+        return model
+
+    def evict(self, kind: str, name: str, device: Optional[str] = None, precision: Optional[str] = None,
+              backend: Optional[str] = None) -> bool:
+        key = self.key(kind, name, device, precision, backend)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry.model is None:
+            return False
+        with entry.lock:
+            entry.model = None
+        self._release_memory(key[2])
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> List[ModelKey]:
+        """Drop models unused for idle_seconds; returns the evicted keys"""
+        if not self.idle_seconds:
+            return []
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                # Skip models that are being loaded or warmed right now
+                if entry.model is not None and now - entry.last_used >= self.idle_seconds and entry.lock.acquire(False):
+                    try:
+                        del self._entries[key]
+                        entry.model = None
+                    finally:
+                        entry.lock.release()
+                    evicted.append(key)
+        for key in evicted:
+            print(f"🧹 Evicted idle {key[0]} model {key[1]} ({', '.join(key[2:])})", file=sys.stderr)
+        if evicted:
+            self._release_memory(*{key[2] for key in evicted})
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            devices = {key[2] for key in self._entries}
+            self._entries.clear()
+        self._release_memory(*devices)
+
+    def loaded(self) -> List[Dict]:
+        """Resident models with their load time and use count"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"kind": key[0], "name": key[1], "device": key[2], "precision": key[3], "backend": key[4],
+                 "warm": entry.warm,
+                 "loadSeconds": round(entry.load_seconds, 3), "uses": entry.uses,
+                 "idleSeconds": round(now - entry.last_used, 1)}
+                for key, entry in self._entries.items() if entry.model is not None
+            ]
+
+    def _release_memory(self, *devices: str):
+        gc.collect()
+        if "cuda" in devices:
+            import torch
+            torch.cuda.empty_cache()
+
+    def _start_reaper(self):
+        if not self.idle_seconds or self._reaper is not None:
+            return
+        interval = max(1.0, self.idle_seconds / 4)
+
+        def reap():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+
+def get_model(kind: str, name: str, device: Optional[str] = None, precision: Optional[str] = None,
+              backend: Optional[str] = None):
+    """Resident model from the process-wide registry"""
+    return _registry.get(kind, name, device, precision, backend)
+
+
+def warmup(models: Iterable[Tuple[str, str]], device: Optional[str] = None, precision: Optional[str] = None,
+           backend: Optional[str] = None):
+    """Load and warm (kind, name) pairs up front, e.g. before the first realtime tick"""
+    for kind, name in models:
+        started = time.perf_counter()
+        _registry.warmup(kind, name, device, precision, backend)
+        print(f"🔥 {kind} model {name} ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def sentiment_pipeline(device: Optional[str] = None, precision: Optional[str] = None, backend: Optional[str] = None):
+    return get_model("sentiment", SENTIMENT_MODEL, device, precision, backend)
+
+
+def embedding_model(device: Optional[str] = None, precision: Optional[str] = None, backend: Optional[str] = None):
+    return get_model("embedding", EMBEDDING_MODEL, device, precision, backend)
@@ -0,0 +1,257 @@
+"""
+Shared MongoDB access layer
+One lazily created, pooled MongoClient per URI for the whole process, indexes
+ensured once per collection, and batched bulk writes with retry
+"""
+import atexit
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import InsertOne, MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure
+
+from metrics import MONGO_WRITE_SECONDS
+
+# Connection pool tuning (per URI, shared by every caller in the process)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "60000"))
+BULK_BATCH_SIZE = int(os.getenv("MONGO_BULK_BATCH_SIZE", "1000"))
+
+DEFAULT_DATABASE = "trenddb"
+
+# Seconds a post stays marked as counted in the rollups; re-scrapes older than this count again
+ROLLUP_COUNTED_TTL = int(os.getenv("ROLLUP_COUNTED_TTL", str(30 * 24 * 3600)))
+
+# Indexes ensured the first time a collection is used: name -> [(keys, options)]
+COLLECTION_INDEXES = {
+    "posts": [
+        ([("timestamp", -1)], {}),
+        ([("topic", 1)], {}),
+        ([("sentiment", 1)], {}),
+        ([("cluster_id", 1)], {}),
+    ],
+    "internet_trends": [
+        ([("keyword", 1), ("timestamp", -1)], {}),
+    ],
+    "news_articles": [
+        ([("url", 1)], {}),
+        ([("stored_at", -1)], {}),
+    ],
+    "topic_rollups": [
+        ([("granularity", 1), ("topic", 1), ("bucket", 1)], {"unique": True}),
+        ([("granularity", 1), ("bucket", -1)], {}),
+    ],
+    "rollup_counted": [
+        ([("counted_at", 1)], {"expireAfterSeconds": ROLLUP_COUNTED_TTL}),
+    ],
+}
+
+# URIs with this scheme use an in-memory mongomock client (offline runs and benchmarks)
+MEMORY_URI_PREFIX = "memory://"
+
+DUPLICATE_KEY = 11000
+
+_clients: Dict[str, MongoClient] = {}
+_ensured = set()
+_lock = threading.Lock()
+
+
+def get_client(uri: str, **options) -> MongoClient:
+    """Return the process-wide pooled client for a URI, creating it on first use"""
+    client = _clients.get(uri)
+    if client is not None:
+        return client
+
+    with _lock:
+        if uri not in _clients:
+            if uri.startswith(MEMORY_URI_PREFIX):
+                import mongomock
+                _clients[uri] = mongomock.MongoClient()
+            else:
+                settings = {
+                    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+                    "minPoolSize": MONGO_MIN_POOL_SIZE,
+                    "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+                    "retryWrites": True,
+                }
+                settings.update(options)
+                _clients[uri] = MongoClient(uri, **settings)
+        return _clients[uri]
+
+
+def ensure_indexes(collection):
+    """Create the registered indexes for a collection once per process"""
+    key = (id(collection.database.client), collection.database.name, collection.name)
+    if key in _ensured:
+        return
+    for keys, options in COLLECTION_INDEXES.get(collection.name, []):
+        collection.create_index(keys, **options)
+    _ensured.add(key)
+
+
+def get_collection(uri: str, collection: str, database: str = DEFAULT_DATABASE):
+    """Collection handle on the pooled client, with its indexes ensured"""
+    col = get_client(uri)[database][collection]
+    ensure_indexes(col)
+    return col
+
+
+def _with_retry(operation, retries: int):
+    for attempt in range(retries):
+        try:
+            return operation(attempt)
+        except (AutoReconnect, ConnectionFailure):
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)  # Exponential backoff
+
+
+def bulk_insert(collection, documents: Iterable[Dict], batch_size: int = BULK_BATCH_SIZE,
+                retries: int = 3) -> int:
+    """
+    Insert documents in unordered batches, retrying transient connection errors
+    _id values are assigned up front, so a retried batch skips what already landed
+    Returns the number of documents inserted
+    """
+    from bson import ObjectId
+
+    inserted = 0
+    batch: List[Dict] = []
+
+    def flush():
+        def insert(attempt):
+            try:
+                return len(collection.insert_many(batch, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                    raise
+                # On a retry the duplicates are this batch's documents that landed before the
+                # connection dropped; on the first attempt they were already stored by someone else
+                return e.details.get("nInserted", 0) + (len(errors) if attempt else 0)
+        with MONGO_WRITE_SECONDS.time(collection=collection.name, operation="insert"):
+            return _with_retry(insert, retries)
+
+    for document in documents:
+        document.setdefault("_id", ObjectId())
+        batch.append(document)
+        if len(batch) >= batch_size:
+            inserted += flush()
+            batch = []
+    if batch:
+        inserted += flush()
+    return inserted
+
+
+# Write operations for bulk_write are (method, args, kwargs) records: sent to a server as
+# pymongo request objects, and applied to memory:// collections by calling the method itself
+WriteOp = Tuple[str, tuple, Dict]
+_REQUESTS = {"insert_one": InsertOne, "update_one": UpdateOne, "replace_one": ReplaceOne}
+
+
+def insert_op(document: Dict) -> WriteOp:
+    return "insert_one", (document,), {}
+
+
+def update_op(filter: Dict, update: Dict, upsert: bool = False) -> WriteOp:
+    return "update_one", (filter, update), {"upsert": upsert}
+
+
+def replace_op(filter: Dict, replacement: Dict, upsert: bool = False) -> WriteOp:
+    return "replace_one", (filter, replacement), {"upsert": upsert}
+
+
+# Update operators that leave the same document however often they are applied
+IDEMPOTENT_OPERATORS = {"$set", "$setOnInsert", "$unset"}
+
+
+def is_idempotent(operation: WriteOp) -> bool:
+    """Safe to re-send after a dropped connection: inserts with a fixed _id, replaces and $set-style updates"""
+    method, args, _ = operation
+    if method == "insert_one":
+        return "_id" in args[0]
+    if method == "update_one":
+        return set(args[1]) <= IDEMPOTENT_OPERATORS
+    return method == "replace_one"
+
+
+def _is_memory(collection) -> bool:
+    return type(collection).__module__.startswith("mongomock")
+
+
+def _apply_serially(collection, operations: List[WriteOp]) -> Dict[str, int]:
+    """
+    mongomock's bulk_write breaks on current pymongo request objects, so
+    memory:// collections apply the operations one at a time instead
+    """
+    counts = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0}
+    for method, args, kwargs in operations:
+        result = getattr(collection, method)(*args, **kwargs)
+        if method == "insert_one":
+            counts["inserted"] += 1
+            continue
+        counts["matched"] += result.matched_count
+        counts["modified"] += result.modified_count
+        counts["upserted"] += result.upserted_id is not None
+    return counts
+
+
+def bulk_write(collection, operations: Iterable[WriteOp], batch_size: int = BULK_BATCH_SIZE,
+               retries: int = 3, ordered: bool = False) -> Dict[str, int]:
+    """
+    Run write operations (insert_op, update_op, replace_op records) in batches; returns summed counts
+    Only batches of idempotent operations are re-sent on a connection error. A batch with
+    $inc or $push may have been partly applied, so it is left to the driver's retryWrites,
+    which retries each write exactly once
+    """
+    totals = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0}
+    batch = []
+
+    def flush():
+        with MONGO_WRITE_SECONDS.time(collection=collection.name, operation="bulk_write"):
+            if _is_memory(collection):
+                counts = _apply_serially(collection, batch)
+            else:
+                requests = [_REQUESTS[method](*args, **kwargs) for method, args, kwargs in batch]
+
+                def write(attempt):
+                    try:
+                        result = collection.bulk_write(requests, ordered=ordered)
+                    except BulkWriteError as e:
+                        # A re-sent insert whose document landed before the connection dropped
+                        errors = e.details.get("writeErrors", [])
+                        if not attempt or any(err.get("code") != DUPLICATE_KEY for err in errors):
+                            raise
+                        return {"inserted": e.details.get("nInserted", 0) + len(errors),
+                                "matched": e.details.get("nMatched", 0), "modified": e.details.get("nModified", 0),
+                                "upserted": e.details.get("nUpserted", 0)}
+                    return {"inserted": result.inserted_count, "matched": result.matched_count,
+                            "modified": result.modified_count, "upserted": result.upserted_count}
+
+                counts = _with_retry(write, retries if all(map(is_idempotent, batch)) else 1)
+        for name, count in counts.items():
+            totals[name] += count
+
+    for operation in operations:
+        batch.append(operation)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return totals
+
+
+def close_all():
+    """Close every pooled client (registered to run at interpreter exit)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _ensured.clear()
+
+
+atexit.register(close_all)
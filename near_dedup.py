@@ -0,0 +1,136 @@
+"""
+Near-duplicate collapse with MinHash LSH
+Clusters retweets, quote-tweets and templated headlines at ingest so expensive
+inference runs once per cluster representative instead of once per copy
+"""
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+
+# Universal hashing modulo a Mersenne prime; 31-bit coefficients keep a*x + b inside uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+_RETWEET = re.compile(r'^\s*rt\s+@\w+:?\s*')
+_NOISE = re.compile(r'https?://\S+|@\w+|[^\w\s]')
+
+
+def shingles(text: str, k: int = 3) -> set:
+    """Word k-shingles of the normalized text (retweet prefix, URLs, mentions and punctuation removed)"""
+    words = _NOISE.sub(' ', _RETWEET.sub('', text.lower())).split()
+    if len(words) < k:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _permutations(num_perm: int, seed: int):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, int(_PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+    return a[:, None], b[:, None]
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = NEAR_DUP_NUM_PERM, seed: int = 1) -> np.ndarray:
+    """(len(texts), num_perm) MinHash signature matrix"""
+    a, b = _permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashed = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingles(text)), dtype=np.uint64
+        )
+        signatures[i] = ((a * hashed + b) % _PRIME).min(axis=1)
+    return signatures
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]  # Path halving
+        i = parent[i]
+    return i
+
+
+class DuplicateClusters:
+    """
+    Result of clustering a batch of texts
+
+    Attributes:
+        representatives: Index of the text standing in for each cluster (its first occurrence)
+        assignment: Cluster number of every text (index into representatives)
+        sizes: Number of texts in each cluster
+        ids: Stable id for each cluster (derived from its representative's signature)
+    """
+
+    def __init__(self, representatives: List[int], assignment: List[int], sizes: List[int], ids: List[str]):
+        self.representatives = representatives
+        self.assignment = assignment
+        self.sizes = sizes
+        self.ids = ids
+
+    def expand(self, values: Sequence) -> List:
+        """Propagate one value per cluster (e.g. a model output) back to every member"""
+        return [values[cluster] for cluster in self.assignment]
+
+    def __len__(self):
+        return len(self.representatives)
+
+
+def cluster_near_duplicates(texts: Sequence[str], threshold: float = NEAR_DUP_THRESHOLD,
+                            num_perm: int = NEAR_DUP_NUM_PERM, bands: int = NEAR_DUP_BANDS) -> DuplicateClusters:
+    """
+    Group texts whose estimated Jaccard similarity is at least `threshold`
+
+    Args:
+        texts: Texts to cluster
+        threshold: Minimum estimated shingle Jaccard similarity for two texts to be merged
+        num_perm: MinHash permutations (must be divisible by bands)
+        bands: LSH bands; more bands finds lower-similarity candidates at a higher verification cost
+
+    Returns:
+        DuplicateClusters
+    """
+    n = len(texts)
+    if n == 0:
+        return DuplicateClusters([], [], [], [])
+
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    parent = list(range(n))
+
+    # Candidate pairs share at least one identical band; verify on the full signature
+    for band in range(bands):
+        buckets: Dict[bytes, int] = {}
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(n):
+            key = chunk[i].tobytes()
+            first = buckets.setdefault(key, i)
+            if first == i:
+                continue
+            root_i, root_first = _find(parent, i), _find(parent, first)
+            if root_i == root_first:
+                continue
+            if np.mean(signatures[i] == signatures[first]) >= threshold:
+                # Lower index wins so each cluster is represented by its first occurrence
+                parent[max(root_i, root_first)] = min(root_i, root_first)
+
+    representatives: List[int] = []
+    cluster_of: Dict[int, int] = {}
+    assignment: List[int] = []
+    for i in range(n):
+        root = _find(parent, i)
+        if root not in cluster_of:
+            cluster_of[root] = len(representatives)
+            representatives.append(root)
+        assignment.append(cluster_of[root])
+
+    sizes = [0] * len(representatives)
+    for cluster in assignment:
+        sizes[cluster] += 1
+    ids = [hashlib.blake2b(signatures[r].tobytes(), digest_size=8).hexdigest() for r in representatives]
+    return DuplicateClusters(representatives, assignment, sizes, ids)
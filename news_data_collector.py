@@ -5,14 +5,21 @@ Analyzes sentiment with enhanced keyword analysis and ML classifier
 """
 
 import json
+import os
 import sys
 import re
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 from urllib.parse import quote_plus
 import requests
-from bs4 import BeautifulSoup
 from sentiment_classifier import SentimentClassifier
+from html_parsing import compile_selector, make_soup, select_first
+from google_news_rss import fetch_rss_items
+from http_cache import install_cache
+from fixture_store import install_fixtures
+from near_dedup import cluster_near_duplicates
+from metrics import ITEMS_CLASSIFIED, POSTS_SCRAPED
+from profiling import configure_from_argv, print_stage_summary, profiling_enabled, stage
 
 # Predefined trending categories
 TRENDING_CATEGORIES = [
@@ -44,6 +51,10 @@ NEGATIVE_KEYWORDS = {
     "controversy": 0.6, "scandal": 0.7, "corruption": 0.7
 }
 
+# Google News selectors, tried in order (compiled once by html_parsing)
+GOOGLE_NEWS_TITLE_SELECTORS = ['h3 a', 'h4 a', 'h3', 'h2', '.JtKRv']
+GOOGLE_NEWS_SOURCE_SELECTORS = ['.wEwyrc', '.NUnG9d', 'div[data-n-tid]', '.IH8C7b', '.QmrVtf']
+
 # Context words that affect sentiment
 CONTEXT_WORDS = ["but", "however", "although", "despite", "yet"]
 
@@ -55,7 +66,7 @@ class NewsItem:
     def __init__(self, title: str, content: str, source: str = "Unknown", 
                  url: str = "", published_at: str = "", 
                  positive_score: float = 0.0, negative_score: float = 0.0,
-                 sentiment_analyzed: bool = False):
+                 sentiment_analyzed: bool = False, cluster_id: str = "", cluster_size: int = 1):
         self.title = title
         self.content = content
         self.source = source
@@ -64,6 +75,8 @@ class NewsItem:
         self.positive_score = positive_score
         self.negative_score = negative_score
         self.sentiment_analyzed = sentiment_analyzed
+        self.cluster_id = cluster_id
+        self.cluster_size = cluster_size
     
     def to_dict(self):
         return {
@@ -71,10 +84,12 @@ class NewsItem:
             "content": self.content,
             "source": self.source,
             "url": self.url,
-            "publishedAt": self.publishedAt if hasattr(self, 'publishedAt') else "",
+            "publishedAt": self.published_at,
             "positiveScore": self.positive_score,
             "negativeScore": self.negative_score,
-            "sentimentAnalyzed": self.sentiment_analyzed
+            "sentimentAnalyzed": self.sentiment_analyzed,
+            "clusterId": self.cluster_id,
+            "clusterSize": self.cluster_size
         }
 
 
@@ -132,13 +147,19 @@ class DashboardData:
 
 
 class NewsDataCollector:
-    def __init__(self, use_ml_classifier: bool = True):
+    def __init__(self, use_ml_classifier: bool = True, google_news_mode: Optional[str] = None):
         self.use_ml_classifier = use_ml_classifier
+        # "html" scrapes news.google.com/search, "rss" reads the much lighter RSS search feed
+        self.google_news_mode = (google_news_mode or os.getenv("GOOGLE_NEWS_MODE", "html")).lower()
         self.classifier = SentimentClassifier("bert_classifier.tflite") if use_ml_classifier else None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # Conditional-request cache shared by every session in this process
+        self.http_cache = install_cache(self.session)
+        # SCRAPER_FIXTURES=record|replay captures or replays responses (offline benchmarks)
+        self.fixtures = install_fixtures(self.session)
     
     def fetch_trending_dashboard(self) -> DashboardData:
         """Fetch trending dashboard data for all categories"""
@@ -153,10 +174,13 @@ class NewsDataCollector:
         # Fetch news for each trending category
         for category in TRENDING_CATEGORIES:
             try:
-                news_items = self.fetch_news_about_topic(category)[:8]
+                with stage("fetch_news") as s:
+                    news_items = self.fetch_news_about_topic(category)[:8]
+                    s.items = len(news_items)
                 
                 # Analyze sentiment for each news item
-                news_items = self._analyze_individual_sentiment(news_items)
+                with stage("sentiment", items=len(news_items)):
+                    news_items = self._analyze_individual_sentiment(news_items)
                 
                 if news_items:
                     # Calculate average sentiment for this category
@@ -227,7 +251,9 @@ class NewsDataCollector:
                             published_at=item.published_at,
                             positive_score=sentiment[0],
                             negative_score=sentiment[1],
-                            sentiment_analyzed=True
+                            sentiment_analyzed=True,
+                            cluster_id=item.cluster_id,
+                            cluster_size=item.cluster_size
                         )
                     )
                 else:
@@ -244,6 +270,7 @@ class NewsDataCollector:
         if self.use_ml_classifier and self.classifier:
             try:
                 results = self.classifier.classify(text)
+                ITEMS_CLASSIFIED.inc(model="tflite")
                 positive_score = results.get('positive', 0.0)
                 negative_score = results.get('negative', 0.0)
                 return (positive_score, negative_score)
@@ -256,6 +283,7 @@ class NewsDataCollector:
     
     def _enhanced_keyword_analysis(self, text: str) -> Tuple[float, float]:
         """Enhanced keyword analysis matching Kotlin implementation"""
+        ITEMS_CLASSIFIED.inc(model="keyword")
         lower_text = text.lower()
         
         positive_score = 0.0
@@ -334,19 +362,24 @@ class NewsDataCollector:
             # news_items.extend(self._scrape_bing_news(topic))  # Can add Bing later
         except Exception as e:
             print(f"Error fetching news for {topic}: {e}")
+        POSTS_SCRAPED.inc(len(news_items), source="google_news")
         
-        # Remove duplicates by title
-        seen = set()
+        # Collapse near-duplicate headlines (syndicated/templated copies) to one item per cluster
+        clusters = cluster_near_duplicates([item.title for item in news_items])
         unique_items = []
-        for item in news_items:
-            if item.title not in seen:
-                seen.add(item.title)
-                unique_items.append(item)
+        for cluster, index in enumerate(clusters.representatives):
+            item = news_items[index]
+            item.cluster_id = clusters.ids[cluster]
+            item.cluster_size = clusters.sizes[cluster]
+            unique_items.append(item)
         
         return unique_items
     
     def _scrape_google_news(self, topic: str) -> List[NewsItem]:
         """Scrape Google News"""
+        if self.google_news_mode == "rss":
+            return self._fetch_google_news_rss(topic)
+        
         news_items = []
         
         try:
@@ -358,24 +391,27 @@ class NewsDataCollector:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try multiple selectors for articles
+            # Only build <article> subtrees, falling back to the older card layout
+            soup = make_soup(response.content, parse_only='article')
             articles = soup.select('article')
             if not articles:
                 # Alternative structure
+                soup = make_soup(response.content, parse_only='.VDXfz')
                 articles = soup.select('.VDXfz')
             
             # Suppress print for API usage
             # print(f"  Found {len(articles)} articles")
             
+            title_selectors = [compile_selector(s) for s in GOOGLE_NEWS_TITLE_SELECTORS]
+            source_selectors = [compile_selector(s) for s in GOOGLE_NEWS_SOURCE_SELECTORS]
+            
             for article in articles[:15]:
                 try:
                     # Try multiple title selectors
                     title_elem = None
                     title = ""
-                    for selector in ['h3 a', 'h4 a', 'h3', 'h2', '.JtKRv']:
-                        title_elem = article.select_one(selector)
+                    for selector in title_selectors:
+                        title_elem = select_first(article, selector)
                         if title_elem:
                             title = title_elem.get_text(strip=True)
                             break
@@ -385,8 +421,8 @@ class NewsDataCollector:
                     
                     # Try multiple source selectors
                     source = "Unknown"
-                    for selector in ['.wEwyrc', '.NUnG9d', 'div[data-n-tid]', '.IH8C7b', '.QmrVtf']:
-                        source_elem = article.select_one(selector)
+                    for selector in source_selectors:
+                        source_elem = select_first(article, selector)
                         if source_elem:
                             source = source_elem.get_text(strip=True)
                             break
@@ -426,6 +462,30 @@ class NewsDataCollector:
         except Exception as e:
             # Suppress print for API usage
             # print(f"Error scraping Google News: {e}")
+            pass
+        
+        return news_items
+    
+    def _fetch_google_news_rss(self, topic: str) -> List[NewsItem]:
+        """Fetch Google News from the RSS search feed"""
+        news_items = []
+        
+        try:
+            for entry in fetch_rss_items(self.session, topic, max_items=15):
+                title = entry["title"]
+                if title and len(title) > 5:  # Filter very short titles
+                    source = entry["publisher"] or "Unknown"
+                    news_items.append(NewsItem(
+                        title=title,
+                        content=f"Source: {source}",
+                        source=source,
+                        url=entry["url"],
+                        published_at=entry["published"]
+                    ))
+        except Exception as e:
+            # Suppress print for API usage
+            # print(f"Error fetching Google News RSS: {e}")
+            pass
         
         return news_items
     
@@ -440,7 +500,7 @@ class NewsDataCollector:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = make_soup(response.content)
             posts = soup.select('h3._eYtD2XCVieq6emjKBH3m')
             contents = soup.select('div._292iotee39Lmt0MkQZ2hPV')
             
@@ -475,7 +535,7 @@ class NewsDataCollector:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = make_soup(response.content)
             cards = soup.select('div.news-card')
             
             for card in cards[:10]:
@@ -511,6 +571,15 @@ def main():
     if json_only:
         sys.argv.remove("--json")
     
+    # --profile[=cprofile|sample] writes per-stage collapsed stacks (or set PROFILE_STAGES)
+    sys.argv = configure_from_argv(sys.argv)
+    
+    # Use the Google News RSS feed instead of scraping the HTML search page
+    google_news_mode = None
+    if "--rss" in sys.argv:
+        sys.argv.remove("--rss")
+        google_news_mode = "rss"
+    
     if len(sys.argv) < 2:
         if not json_only:
             print("Usage: python news_data_collector.py <category>")
@@ -524,7 +593,7 @@ def main():
         # Fetch full dashboard
         if not json_only:
             print("Fetching trending dashboard...")
-        collector = NewsDataCollector(use_ml_classifier=False)  # Disable ML for now
+        collector = NewsDataCollector(use_ml_classifier=False, google_news_mode=google_news_mode)  # Disable ML for now
         dashboard = collector.fetch_trending_dashboard()
         if json_only:
             # JSON only output
@@ -532,11 +601,15 @@ def main():
         else:
             print("\nDashboard Data:")
             print(json.dumps(dashboard.to_dict(), indent=2))
+            if collector.http_cache:
+                print(f"\nHTTP cache: {collector.http_cache.stats()}")
+        if profiling_enabled():
+            print_stage_summary(sys.stderr)
     else:
         # Fetch for specific category
         if not json_only:
             print(f"Fetching news for: {category}")
-        collector = NewsDataCollector(use_ml_classifier=False)  # Disable ML for now
+        collector = NewsDataCollector(use_ml_classifier=False, google_news_mode=google_news_mode)  # Disable ML for now
         news_items = collector.fetch_news_about_topic(category)
         
         if not json_only:
@@ -557,6 +630,8 @@ def main():
                 print(f"   Negative: {item.negative_score:.2f}")
                 if item.url:
                     print(f"   URL: {item.url[:80]}...")
+            if collector.http_cache:
+                print(f"\nHTTP cache: {collector.http_cache.stats()}")
 
 
 if __name__ == "__main__":
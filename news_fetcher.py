@@ -8,7 +8,7 @@ import requests
 from datetime import datetime
 from typing import List, Dict
 from newspaper import Article
-from pymongo import MongoClient
+from mongo_store import bulk_insert, get_collection
 
 # Google Custom Search API configuration
 GOOGLE_CSE_API_KEY = os.getenv("GOOGLE_CSE_API_KEY", "")
@@ -133,18 +133,14 @@ def store_articles_in_mongodb(articles: List[Dict], mongo_uri: str, database: st
         return
     
     try:
-        client = MongoClient(mongo_uri)
-        db = client[database]
-        col = db[collection]
+        col = get_collection(mongo_uri, collection, database)
         
         # Add metadata
         for article in articles:
             article["stored_at"] = datetime.utcnow()
         
-        result = col.insert_many(articles)
-        print(f"✅ Stored {len(result.inserted_ids)} articles in MongoDB")
-        
-        client.close()
+        inserted = bulk_insert(col, articles)
+        print(f"✅ Stored {inserted} articles in MongoDB")
     except Exception as e:
         print(f"Error storing articles: {e}")
 
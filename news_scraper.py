@@ -1,23 +1,82 @@
 import requests
-from bs4 import BeautifulSoup
 from urllib.robotparser import RobotFileParser
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, quote_plus
 import time
 import random
 import json
+import os
 import sys
+from url_filter import PersistentBloomFilter
+from html_parsing import compile_config, make_soup, select_first
+from google_news_rss import google_news_rss_url, parse_rss_items
+from http_cache import install_cache
+from fixture_store import REPLAY, fixture_mode, install_fixtures
+
+# Google News configuration - updated selectors for latest Google News HTML
+GOOGLE_NEWS_CONFIG = {
+    'base_url': 'https://news.google.com',
+    'article_selector': 'article',
+    'title_selector': 'h3 a, h4 a',
+    'link_selector': 'a',
+    'summary_selector': '.Y3v8qd, .FCUp0c',
+    'date_selector': 'time',
+    'image_selector': 'img',
+    'source_selector': '.wEwyrc, .NUnG9d'
+}
+
+# Alternative selectors for older Google News layouts
+GOOGLE_NEWS_ALT_CONFIG = {
+    'base_url': 'https://news.google.com',
+    'article_selector': '.xrnccd',
+    'title_selector': 'h3',
+    'link_selector': 'a',
+    'summary_selector': '.GI74Re',
+    'date_selector': 'time',
+    'source_selector': '.wEwyrc'
+}
+
+# Selector defaults used by extract_news_data when a config omits a field
+EXTRACT_DEFAULTS = {
+    'title_selector': '',
+    'link_selector': 'a',
+    'summary_selector': '',
+    'date_selector': '',
+    'image_selector': 'img',
+    'source_selector': ''
+}
+
+
+def google_news_search_url(query):
+    """Build the Google News search URL for a query"""
+    return f"https://news.google.com/search?q={quote_plus(query)}&hl=en&gl=IN&ceid=IN:en"
 
 class AdvancedNewsScraper:
-    def __init__(self, delay=2):
+    def __init__(self, delay=2, visited_path=None, visited_capacity=1_000_000,
+                 visited_error_rate=0.001, skip_visited=False, google_news_mode=None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Conditional-request cache shared by every session in this process
+        self.http_cache = install_cache(self.session)
+        # SCRAPER_FIXTURES=record|replay captures or replays responses (offline benchmarks)
+        self.fixture_mode = fixture_mode()
+        self.fixtures = install_fixtures(self.session, self.fixture_mode)
         self.delay = delay
-        self.visited_urls = set()
+        # Fixed-memory visited set, persisted across runs when a path is configured
+        self.visited_urls = PersistentBloomFilter(
+            visited_path or os.getenv("SCRAPER_VISITED_PATH") or None,
+            capacity=visited_capacity,
+            error_rate=visited_error_rate
+        )
+        self.skip_visited = skip_visited
+        # "html" scrapes the search page, "rss" reads the RSS search feed instead
+        self.google_news_mode = (google_news_mode or os.getenv("GOOGLE_NEWS_MODE", "html")).lower()
     
     def can_fetch(self, url):
         """Check robots.txt"""
+        if self.fixture_mode == REPLAY:
+            return True  # Replays never touch the network (robots.txt was honoured when recording)
         try:
             parsed = urlparse(url)
             base_url = f"{parsed.scheme}://{parsed.netloc}"
@@ -31,8 +90,16 @@ class AdvancedNewsScraper:
         except:
             return True
     
-    def scrape_with_retry(self, url, max_retries=3):
-        """Scrape with retry mechanism"""
+    def scrape_with_retry(self, url, max_retries=3, listing=False):
+        """
+        Scrape with retry mechanism
+        Listing pages (search results, feeds) are fetched every time and never
+        recorded as visited; only article URLs go into the visited set
+        """
+        if self.skip_visited and not listing and url in self.visited_urls:
+            print(f"Already visited: {url}")
+            return None
+        
         for attempt in range(max_retries):
             try:
                 if not self.can_fetch(url):
@@ -41,9 +108,12 @@ class AdvancedNewsScraper:
                 
                 response = self.session.get(url, timeout=10)
                 response.raise_for_status()
+                if not listing:
+                    self.visited_urls.add(url)
                 
-                # Add random delay to be respectful
-                time.sleep(self.delay + random.uniform(0.5, 1.5))
+                # Add random delay to be respectful (nothing to be polite about on a local hit)
+                if not getattr(response, 'from_cache', False):
+                    time.sleep(self.delay + random.uniform(0.5, 1.5))
                 
                 return response.content
                 
@@ -57,37 +127,39 @@ class AdvancedNewsScraper:
     
     def extract_news_data(self, html, config):
         """Extract structured news data"""
-        soup = BeautifulSoup(html, 'html.parser')
+        selectors = compile_config(config, EXTRACT_DEFAULTS)
+        # Only build the article subtrees - the rest of the page is scripts and chrome
+        soup = make_soup(html, parse_only=config['article_selector'])
         articles = []
         
-        for article_elem in soup.select(config['article_selector']):
+        for article_elem in selectors['article_selector'].select(soup):
             try:
                 article_data = {}
                 
                 # Extract title
-                if title_elem := article_elem.select_one(config.get('title_selector', '')):
+                if title_elem := select_first(article_elem, selectors['title_selector']):
                     article_data['title'] = title_elem.get_text().strip()
                 
                 # Extract link
-                if link_elem := article_elem.select_one(config.get('link_selector', 'a')):
+                if link_elem := select_first(article_elem, selectors['link_selector']):
                     href = link_elem.get('href', '')
                     if href:
                         article_data['url'] = href if href.startswith('http') else urljoin(config['base_url'], href)
                 
                 # Extract summary
-                if summary_elem := article_elem.select_one(config.get('summary_selector', '')):
+                if summary_elem := select_first(article_elem, selectors['summary_selector']):
                     article_data['summary'] = summary_elem.get_text().strip()
                 
                 # Extract date
-                if date_elem := article_elem.select_one(config.get('date_selector', '')):
+                if date_elem := select_first(article_elem, selectors['date_selector']):
                     article_data['date'] = date_elem.get_text().strip()
                 
                 # Extract image
-                if img_elem := article_elem.select_one(config.get('image_selector', 'img')):
+                if img_elem := select_first(article_elem, selectors['image_selector']):
                     article_data['image_url'] = img_elem.get('src', '')
                 
                 # Extract source
-                if source_elem := article_elem.select_one(config.get('source_selector', '')):
+                if source_elem := select_first(article_elem, selectors['source_selector']):
                     article_data['publisher'] = source_elem.get_text().strip()
                 
                 if article_data.get('title') and article_data.get('url'):
@@ -99,58 +171,62 @@ class AdvancedNewsScraper:
         
         return articles
     
-    def search_google_news(self, query, max_results=10):
-        """Search Google News and return results"""
+    def parse_google_news(self, html, max_results=10):
+        """Extract Google News articles from a result page and format them for our API"""
+        articles = self.extract_news_data(html, GOOGLE_NEWS_CONFIG)
+        
+        # If no articles found, try alternative selectors
+        if not articles:
+            print("Primary selectors failed, trying alternative...")
+            articles = self.extract_news_data(html, GOOGLE_NEWS_ALT_CONFIG)
+        
+        # Format for our API
+        formatted = []
+        for article in articles[:max_results]:
+            formatted.append({
+                'title': article.get('title', ''),
+                'description': article.get('summary', ''),
+                'url': article.get('url', ''),
+                'published_date': article.get('date', ''),
+                'publisher': article.get('publisher', 'Google News')
+            })
+        
+        return formatted
+    
+    def parse_google_news_rss(self, feed, max_results=10):
+        """Parse a Google News RSS feed into the same formatted shape as parse_google_news"""
+        formatted = []
+        for entry in parse_rss_items([feed], max_results):
+            if entry['title'] and entry['url']:
+                formatted.append({
+                    'title': entry['title'],
+                    'description': entry['description'],
+                    'url': entry['url'],
+                    'published_date': entry['published'],
+                    'publisher': entry['publisher'] or 'Google News'
+                })
+        return formatted
+    
+    def search_google_news(self, query, max_results=10, new_only=False):
+        """Search Google News and return results (only unseen article URLs if new_only)"""
         # Suppress print for API usage
         # print(f"Searching Google News for: {query}")
         
+        use_rss = self.google_news_mode == "rss"
+        
         # Create Google News search URL
-        search_url = f"https://news.google.com/search?q={query}&hl=en&gl=IN&ceid=IN:en"
+        search_url = google_news_rss_url(query) if use_rss else google_news_search_url(query)
         
         try:
-            html = self.scrape_with_retry(search_url)
+            html = self.scrape_with_retry(search_url, listing=True)
             if not html:
                 print("Failed to fetch Google News")
                 return []
             
-            # Google News configuration - updated selectors for latest Google News HTML
-            config = {
-                'base_url': 'https://news.google.com',
-                'article_selector': 'article',
-                'title_selector': 'h3 a, h4 a',
-                'link_selector': 'a',
-                'summary_selector': '.Y3v8qd, .FCUp0c',
-                'date_selector': 'time',
-                'image_selector': 'img',
-                'source_selector': '.wEwyrc, .NUnG9d'
-            }
-            
-            articles = self.extract_news_data(html, config)
-            
-            # If no articles found, try alternative selectors
-            if not articles:
-                print("Primary selectors failed, trying alternative...")
-                config_alt = {
-                    'base_url': 'https://news.google.com',
-                    'article_selector': '.xrnccd',
-                    'title_selector': 'h3',
-                    'link_selector': 'a',
-                    'summary_selector': '.GI74Re',
-                    'date_selector': 'time',
-                    'source_selector': '.wEwyrc'
-                }
-                articles = self.extract_news_data(html, config_alt)
-            
-            # Format for our API
-            formatted = []
-            for article in articles[:max_results]:
-                formatted.append({
-                    'title': article.get('title', ''),
-                    'description': article.get('summary', ''),
-                    'url': article.get('url', ''),
-                    'published_date': article.get('date', ''),
-                    'publisher': article.get('publisher', 'Google News')
-                })
+            parse = self.parse_google_news_rss if use_rss else self.parse_google_news
+            formatted = parse(html, None if new_only else max_results)
+            if new_only:
+                formatted = [article for article in formatted if self.visited_urls.add(article['url'])][:max_results]
             
             # Suppress print for API usage
             # print(f"Found {len(formatted)} articles")
@@ -162,7 +238,6 @@ class AdvancedNewsScraper:
             # Return empty list on error
             return []
 
-
 def main():
     """Main function to test the scraper"""
     if len(sys.argv) < 2:
@@ -171,12 +246,19 @@ def main():
     
     # Check for JSON-only output flag
     json_only = "--json" in sys.argv or sys.argv[0].endswith("api")
+    # Only return articles not seen in previous runs (needs SCRAPER_VISITED_PATH)
+    new_only = "--new-only" in sys.argv
+    # Read the RSS search feed instead of scraping the HTML results page
+    mode = "rss" if "--rss" in sys.argv else None
     
     query = sys.argv[1] if len(sys.argv) >= 2 else ""
     max_results = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else 10
     
-    scraper = AdvancedNewsScraper(delay=1)
-    articles = scraper.search_google_news(query, max_results)
+    scraper = AdvancedNewsScraper(delay=1, google_news_mode=mode)
+    articles = scraper.search_google_news(query, max_results, new_only=new_only)
+    scraper.visited_urls.close()
+    if scraper.http_cache and not json_only:
+        print(f"HTTP cache: {scraper.http_cache.stats()}", file=sys.stderr)
     
     # Print results as JSON (compact or pretty based on flag)
     if json_only:
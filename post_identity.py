@@ -0,0 +1,31 @@
+"""
+Post identity across re-scrapes
+Pure helpers shared by the rollups and the burst detector: when a post was
+made, and a key that stays the same each time the same post is scraped again
+"""
+import datetime
+import hashlib
+from collections import Counter
+from typing import Dict, List
+
+
+def post_time(post: Dict) -> datetime.datetime:
+    """When a post was made: its own date if the scraper had one, else when it was stored"""
+    return post.get("posted_at") or post.get("timestamp") or datetime.datetime.utcnow()
+
+
+def post_keys(posts: List[Dict]) -> List[str]:
+    """
+    Identity of each post that survives re-scraping: the tweet id, or for posts
+    without one (sample data) a hash of the text plus its occurrence in the batch
+    """
+    keys = []
+    seen = Counter()
+    for post in posts:
+        if post.get("tweet_id"):
+            keys.append(f"tweet:{post['tweet_id']}")
+            continue
+        digest = hashlib.sha1(post.get("text", "").encode('utf-8', 'replace')).hexdigest()
+        keys.append(f"text:{digest}:{seen[digest]}")
+        seen[digest] += 1
+    return keys
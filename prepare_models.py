@@ -0,0 +1,165 @@
+"""
+One-time model preparation
+Exports the sentiment and embedding models to MODELS_DIR as safetensors weights
+(memory-mapped when loaded) plus serialized fast tokenizers, so model_registry
+loads them from local files without hub lookups or network access
+Usage: python prepare_models.py [--force]      export both models
+       python prepare_models.py --onnx         also save ONNX graphs for INFERENCE_BACKEND=onnx
+       python prepare_models.py --benchmark    compare hub-cache and prepared load times
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from model_registry import (EMBEDDING_MODEL, MODELS_DIR, PREPARED_MARKER, SENTIMENT_MODEL, WARMUP_TEXT,
+                            export_onnx, prepared_path)
+
+MODELS = {"sentiment": SENTIMENT_MODEL, "embedding": EMBEDDING_MODEL}
+
+
+def _export_sentiment(name: str, path: str):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(name, use_fast=True)
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"{name} has no fast tokenizer to serialize")
+    model = AutoModelForSequenceClassification.from_pretrained(name)
+    model.save_pretrained(path, safe_serialization=True)
+    tokenizer.save_pretrained(path)  # tokenizer.json: loads without rebuilding from vocab/merges
+
+
+def _export_embedding(name: str, path: str):
+    from sentence_transformers import SentenceTransformer
+
+    SentenceTransformer(name, device="cpu").save(path, safe_serialization=True)
+
+
+EXPORTERS = {"sentiment": _export_sentiment, "embedding": _export_embedding}
+
+
+def _directory_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return round(total / 2 ** 20, 1)
+
+
+def prepare_model(kind: str, name: str, models_dir: str = MODELS_DIR, force: bool = False) -> Dict:
+    """
+    Export one model to <models_dir>/<name with / replaced by -->
+
+    Args:
+        kind: 'sentiment' or 'embedding'
+        name: Hub model name (downloaded through the hub cache if needed)
+        models_dir: Output directory
+        force: Re-export even if a prepared copy exists
+    """
+    path = prepared_path(name, models_dir)
+    marker = os.path.join(path, PREPARED_MARKER)
+    if os.path.exists(marker) and not force:
+        with open(marker, 'r', encoding='utf-8') as f:
+            return dict(json.load(f), skipped=True)
+
+    # Export next to the target and swap in, so loaders never see a partial directory
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    started = time.perf_counter()
+    EXPORTERS[kind](name, tmp)
+    info = {
+        "kind": kind,
+        "name": name,
+        "path": path,
+        "exportSeconds": round(time.perf_counter() - started, 2),
+        "sizeMb": _directory_mb(tmp),
+        "preparedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    with open(os.path.join(tmp, PREPARED_MARKER), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return info
+
+
+def time_load(kind: str) -> Dict:
+    """Import, load and first-inference seconds for one model in this (fresh) process"""
+    started = time.perf_counter()
+    from model_registry import get_model, resolve_source
+    imported = time.perf_counter()
+
+    model = get_model(kind, MODELS[kind], "cpu")
+    loaded = time.perf_counter()
+
+    if kind == "sentiment":
+        model(WARMUP_TEXT)
+    else:
+        model.encode([WARMUP_TEXT], show_progress_bar=False)
+    first = time.perf_counter()
+
+    return {
+        "source": "prepared" if resolve_source(MODELS[kind]) != MODELS[kind] else "hub",
+        "importSeconds": round(imported - started, 3),
+        "loadSeconds": round(loaded - imported, 3),
+        "firstInferenceSeconds": round(first - loaded, 3),
+        "totalSeconds": round(first - started, 3)
+    }
+
+
+def benchmark(models_dir: str = MODELS_DIR) -> Dict:
+    """Cold-process load timings through the hub cache (before) and the prepared copies (after)"""
+    results = {}
+    for kind in MODELS:
+        results[kind] = {}
+        for label, env in (("hub", {"MODELS_DIR": ""}),
+                           ("prepared", {"MODELS_DIR": models_dir, "HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"})):
+            if label == "prepared" and not os.path.exists(os.path.join(prepared_path(MODELS[kind], models_dir), PREPARED_MARKER)):
+                results[kind][label] = {"skipped": "not prepared (run python prepare_models.py)"}
+                continue
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--time-load", kind],
+                env=dict(os.environ, **env), capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                results[kind][label] = {"error": completed.stderr.strip().splitlines()[-1:] or ["failed"]}
+                continue
+            results[kind][label] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export models for fast, offline loading")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--force', action='store_true', help="Re-export models that are already prepared")
+    parser.add_argument('--onnx', action='store_true', help="Also export ONNX graphs (needs optimum[onnxruntime])")
+    parser.add_argument('--benchmark', action='store_true', help="Time hub-cache vs prepared loads")
+    parser.add_argument('--time-load', choices=list(MODELS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.time_load:
+        # Child of --benchmark: only the timing JSON goes to stdout
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        try:
+            result = time_load(args.time_load)
+        finally:
+            sys.stdout = stdout
+        print(json.dumps(result))
+    elif args.benchmark:
+        print(json.dumps(benchmark(args.models_dir), indent=2))
+    else:
+        prepared = []
+        for kind, name in MODELS.items():
+            print(f"📦 Preparing {kind} model {name}...", file=sys.stderr)
+            prepared.append(prepare_model(kind, name, args.models_dir, args.force))
+            if args.onnx:
+                # Exported from the prepared copy just written
+                prepared[-1]["onnxPath"] = export_onnx(kind, name, force=args.force, models_dir=args.models_dir)
+        print(json.dumps(prepared, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Stage-level profiling hooks
+`stage()` wraps a pipeline step (as a context manager or decorator) and records
+its wall time, CPU time and item count. With PROFILE_STAGES=cprofile|sample (or
+--profile on the command line) each stage is also profiled and written out as
+collapsed stacks, ready for flamegraph.pl or speedscope
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+# Paths below this many seconds are dropped when converting cProfile output
+MIN_STACK_SECONDS = 1e-4
+
+_mode: Optional[str] = None
+_records: List[Dict] = []
+_lock = threading.Lock()
+_active = threading.local()  # Only the outermost stage on a thread is profiled
+_run_id = time.strftime("%Y%m%d-%H%M%S")
+
+
+def configure(mode: Optional[str]):
+    """Enable per-stage profiling ('cprofile' or 'sample') or disable it (None or '')"""
+    global _mode
+    mode = mode.lower() if mode else None
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
+    _mode = mode
+
+
+# PROFILE_STAGES gets the same check as --profile=MODE, so a typo fails loudly instead of
+# silently profiling nothing (or crashing in the middle of the first stage)
+configure(os.getenv("PROFILE_STAGES"))
+
+
+def configure_from_argv(argv: List[str]) -> List[str]:
+    """Consume --profile / --profile=MODE from an argv list (cprofile by default); returns the rest"""
+    remaining = []
+    for arg in argv:
+        if arg == "--profile":
+            configure("cprofile")
+        elif arg.startswith("--profile="):
+            configure(arg.split("=", 1)[1])
+        else:
+            remaining.append(arg)
+    return remaining
+
+
+def profiling_enabled() -> bool:
+    return _mode is not None
+
+
+class StageRecord:
+    """Mutable handle yielded by stage(); set `items` inside the block"""
+
+    def __init__(self, name: str, items: Optional[int]):
+        self.name = name
+        self.items = items
+
+
+class _Sampler:
+    """Samples one thread's Python stack every `interval` seconds"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+
+def cprofile_to_collapsed(stats) -> Counter:
+    """
+    Approximate collapsed stacks (microseconds) from a cProfile call graph
+    cProfile keeps caller->callee edges rather than full stacks, so each
+    function's time is split across its callers in proportion to edge time
+    """
+    raw = stats.stats
+    callees: Dict = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]  # Cumulative time along the edge
+
+    stacks = Counter()
+
+    def walk(func, path, share):
+        total_time = raw[func][2]
+        label = ";".join(path)
+        if total_time * share > 0:
+            stacks[label] += int(total_time * share * 1e6)
+        for callee, edge_time in callees.get(func, {}).items():
+            if callee not in raw or callee in path_funcs:
+                continue  # Recursion is folded into the first occurrence
+            callee_share = share * edge_time / max(raw[callee][3], 1e-9)
+            if callee_share * raw[callee][3] < MIN_STACK_SECONDS:
+                continue  # Prune negligible paths so large call graphs stay tractable
+            path_funcs.add(callee)
+            walk(callee, path + [_label(callee)], callee_share)
+            path_funcs.discard(callee)
+
+    for root in (f for f, (_, _, _, _, callers) in raw.items() if not callers):
+        path_funcs = {root}
+        walk(root, [_label(root)], 1.0)
+    return stacks
+
+
+def _write_collapsed(name: str, stacks: Counter) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    path = os.path.join(PROFILE_DIR, f"{_run_id}-{safe}.collapsed")
+    with open(path, 'a', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            if count:
+                f.write(f"{stack} {count}\n")
+    return path
+
+
+@contextmanager
+def stage(name: str, items: Optional[int] = None):
+    """
+    Time a pipeline stage, profiling it when profiling is enabled
+
+    Args:
+        name: Stage name (records with the same name are aggregated in the summary)
+        items: Items processed, if known up front (or set `.items` on the yielded record)
+    """
+    record = StageRecord(name, items)
+    profiler = sampler = None
+    outermost = not getattr(_active, "profiling", False)
+    if _mode and outermost:
+        _active.profiling = True
+        if _mode == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = _Sampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            sampler.start()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        profile_path = None
+        if profiler is not None:
+            profiler.disable()
+            import pstats
+            profile_path = _write_collapsed(name, cprofile_to_collapsed(pstats.Stats(profiler)))
+        elif sampler is not None:
+            profile_path = _write_collapsed(name, sampler.stop())
+        if profiler is not None or sampler is not None:
+            _active.profiling = False
+
+        entry = {"stage": name, "wallSeconds": round(wall, 4), "cpuSeconds": round(cpu, 4), "items": record.items}
+        if record.items and wall > 0:
+            entry["itemsPerSecond"] = round(record.items / wall, 1)
+        if profile_path:
+            entry["profile"] = profile_path
+        with _lock:
+            _records.append(entry)
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator form of stage(); defaults to the function's qualified name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name or fn.__qualname__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stage_records() -> List[Dict]:
+    with _lock:
+        return list(_records)
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+def stage_summary() -> List[Dict]:
+    """Records aggregated by stage name, in first-seen order"""
+    summary: Dict[str, Dict] = {}
+    for record in stage_records():
+        entry = summary.setdefault(record["stage"], {
+            "stage": record["stage"], "calls": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0, "items": 0
+        })
+        entry["calls"] += 1
+        entry["wallSeconds"] = round(entry["wallSeconds"] + record["wallSeconds"], 4)
+        entry["cpuSeconds"] = round(entry["cpuSeconds"] + record["cpuSeconds"], 4)
+        entry["items"] += record["items"] or 0
+    return list(summary.values())
+
+
+def print_stage_summary(file=None):
+    """One line per stage; also written as JSON next to the profiles when profiling"""
+    file = file or sys.stdout
+    summary = stage_summary()
+    if not summary:
+        return
+    print("\nStage timings:", file=file)
+    for entry in summary:
+        items = f", {entry['items']} items" if entry["items"] else ""
+        print(f"   {entry['stage']:<24} wall {entry['wallSeconds']:>9.3f}s  cpu {entry['cpuSeconds']:>9.3f}s"
+              f"  ({entry['calls']} call{'s' if entry['calls'] != 1 else ''}{items})", file=file)
+    if _mode:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{_run_id}-stages.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"mode": _mode, "stages": stage_records()}, f, indent=2)
+        print(f"   Profiles and stage records written to {PROFILE_DIR}/{_run_id}-*", file=file)
@@ -0,0 +1,205 @@
+"""
+Per-topic sentiment rollups
+Pre-aggregated counts, score sums and top examples per topic and time bucket,
+updated incrementally with $inc upserts as posts are stored, so dashboards read
+a handful of documents instead of aggregating raw posts. Posts are bucketed by
+their own date and counted once, however often they are re-scraped
+"""
+import datetime
+import os
+from typing import Dict, Iterable, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from mongo_store import DEFAULT_DATABASE, DUPLICATE_KEY, WriteOp, bulk_write, get_collection, update_op
+from post_identity import post_keys, post_time
+
+ROLLUP_COLLECTION = os.getenv("ROLLUP_COLLECTION", "topic_rollups")
+# Keys of posts already folded into the rollups (expired by a TTL index, see mongo_store)
+COUNTED_COLLECTION = os.getenv("ROLLUP_COUNTED_COLLECTION", "rollup_counted")
+ROLLUP_EXAMPLES = int(os.getenv("ROLLUP_EXAMPLES", "5"))
+
+GRANULARITIES = ("minute", "hour", "day")
+SENTIMENTS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+
+
+def bucket_start(timestamp: datetime.datetime, granularity: str) -> datetime.datetime:
+    """Floor a timestamp to the start of its minute, hour or day bucket"""
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def claim_uncounted(posts: List[Dict], mongo_uri: str, database: str = DEFAULT_DATABASE,
+                    collection: str = COUNTED_COLLECTION) -> Dict[str, Dict]:
+    """
+    Record posts as counted and return those no earlier batch had counted, by key
+    Keys are claimed with unique inserts, so concurrent writers never count a post twice
+    """
+    if not posts:
+        return {}
+    col = get_collection(mongo_uri, collection, database)
+    now = datetime.datetime.utcnow()
+    keys = post_keys(posts)
+    try:
+        col.insert_many([{"_id": key, "counted_at": now} for key in keys], ordered=False)
+        counted = set()
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        counted = {err["index"] for err in errors}
+    return {key: post for i, (key, post) in enumerate(zip(keys, posts)) if i not in counted}
+
+
+def release_claims(keys: List[str], mongo_uri: str, database: str = DEFAULT_DATABASE,
+                   collection: str = COUNTED_COLLECTION):
+    """Drop claims whose rollup write failed, so the next batch counts those posts"""
+    if keys:
+        get_collection(mongo_uri, collection, database).delete_many({"_id": {"$in": keys}})
+
+
+def rollup_operations(posts: Iterable[Dict], granularities=GRANULARITIES,
+                      examples: int = ROLLUP_EXAMPLES) -> List[WriteOp]:
+    """
+    Group posts by (granularity, topic, bucket) and build one upsert per group
+
+    Args:
+        posts: Stored post documents (topic_name, sentiment, score, text, url, posted_at or timestamp)
+        granularities: Bucket sizes to maintain
+        examples: Top examples (by score) kept per bucket
+
+    Returns:
+        Upsert operations for bulk_write
+    """
+    groups: Dict[tuple, Dict] = {}
+    for post in posts:
+        timestamp = post_time(post)
+        topic = post.get("topic_name") or f"Topic {post.get('topic', -1)}"
+        sentiment = post.get("sentiment", "NEUTRAL")
+        if sentiment not in SENTIMENTS:
+            sentiment = "NEUTRAL"
+        score = float(post.get("score", 0.0))
+
+        for granularity in granularities:
+            key = (granularity, topic, bucket_start(timestamp, granularity))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "topic_id": post.get("topic"),
+                    "inc": {"count": 0, "score_sum": 0.0, **{f"sentiments.{s}": 0 for s in SENTIMENTS}},
+                    "examples": []
+                }
+            group["inc"]["count"] += 1
+            group["inc"]["score_sum"] += score
+            group["inc"][f"sentiments.{sentiment}"] += 1
+            group["examples"].append({
+                "text": post.get("text", "")[:280],
+                "url": post.get("url", ""),
+                "sentiment": sentiment,
+                "score": score
+            })
+
+    operations = []
+    for (granularity, topic, bucket), group in groups.items():
+        # Only this batch's best examples need to be pushed; $slice keeps the bucket's overall top N
+        top = sorted(group["examples"], key=lambda e: e["score"], reverse=True)[:examples]
+        operations.append(update_op(
+            {"granularity": granularity, "topic": topic, "bucket": bucket},
+            {
+                "$inc": group["inc"],
+                "$set": {"topic_id": group["topic_id"], "updated_at": datetime.datetime.utcnow()},
+                "$push": {"examples": {"$each": top, "$sort": {"score": -1}, "$slice": examples}}
+            },
+            upsert=True
+        ))
+    return operations
+
+
+def update_rollups(posts: List[Dict], mongo_uri: str, database: str = DEFAULT_DATABASE,
+                   collection: str = ROLLUP_COLLECTION) -> Dict[str, int]:
+    """Fold the posts of a batch that were not counted by an earlier batch into the rollup collection"""
+    claimed = claim_uncounted(posts, mongo_uri, database)
+    col = get_collection(mongo_uri, collection, database)
+    try:
+        totals = bulk_write(col, rollup_operations(claimed.values()))
+    except Exception:
+        release_claims(list(claimed), mongo_uri, database)
+        raise
+    totals["counted"] = len(claimed)
+    return totals
+
+
+def _with_mean(doc: Dict) -> Dict:
+    doc.pop("_id", None)
+    doc["mean_score"] = round(doc["score_sum"] / doc["count"], 4) if doc.get("count") else 0.0
+    return doc
+
+
+def read_rollups(mongo_uri: str, granularity: str = "hour", since: Optional[datetime.datetime] = None,
+                 topic: Optional[str] = None, database: str = DEFAULT_DATABASE,
+                 collection: str = ROLLUP_COLLECTION) -> List[Dict]:
+    """Rollup documents for a granularity, oldest bucket first"""
+    query = {"granularity": granularity}
+    if since is not None:
+        query["bucket"] = {"$gte": bucket_start(since, granularity)}
+    if topic is not None:
+        query["topic"] = topic
+    col = get_collection(mongo_uri, collection, database)
+    return [_with_mean(doc) for doc in col.find(query).sort("bucket", 1)]
+
+
+def topic_summary(rollups: List[Dict]) -> List[Dict]:
+    """Merge bucket documents into one entry per topic (largest first)"""
+    topics: Dict[str, Dict] = {}
+    for doc in rollups:
+        entry = topics.setdefault(doc["topic"], {
+            "topic": doc["topic"], "count": 0, "score_sum": 0.0,
+            "sentiments": {s: 0 for s in SENTIMENTS}, "examples": []
+        })
+        entry["count"] += doc.get("count", 0)
+        entry["score_sum"] += doc.get("score_sum", 0.0)
+        for sentiment in SENTIMENTS:
+            entry["sentiments"][sentiment] += doc.get("sentiments", {}).get(sentiment, 0)
+        entry["examples"].extend(doc.get("examples", []))
+
+    summary = []
+    for entry in topics.values():
+        entry["examples"] = sorted(entry["examples"], key=lambda e: e["score"], reverse=True)[:ROLLUP_EXAMPLES]
+        summary.append(_with_mean(entry))
+    return sorted(summary, key=lambda e: e["count"], reverse=True)
+
+
+def main():
+    """
+    Usage: python rollups.py [minute|hour|day] [--hours N] [--topic NAME] [--summary]
+    Prints rollup documents (or a per-topic summary) as JSON
+    """
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Read per-topic sentiment rollups")
+    parser.add_argument('granularity', nargs='?', default="hour", choices=GRANULARITIES)
+    parser.add_argument('--hours', type=float, default=24, help="Look-back window")
+    parser.add_argument('--topic', default=None)
+    parser.add_argument('--summary', action='store_true', help="One merged entry per topic")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI", "")
+    if not mongo_uri:
+        print("MONGO_URI not set", file=sys.stderr)
+        sys.exit(1)
+
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=args.hours)
+    rollups = read_rollups(mongo_uri, args.granularity, since, args.topic)
+    result = topic_summary(rollups) if args.summary else rollups
+    sys.stdout.write(json.dumps(result, default=str) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Fixed-rate scheduler for the realtime loops
+Ticks stay on a fixed grid (start + k * interval) however long a run takes;
+ticks missed by a slow run are coalesced into a single late run. Each tick
+collects new data, skips processing when the data watermark has not moved,
+and can overlap the collection for tick N+1 with the processing of tick N
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from metrics import ITERATIONS, ITERATION_SECONDS, LAST_ITERATION, LOOP_PHASE_SECONDS, TICKS_MISSED, write_textfile
+
+
+class FixedRateScheduler:
+    """
+    Run collect -> process on a fixed-rate tick
+
+    Args:
+        interval: Seconds between scheduled ticks
+        collect: Gathers the tick's input (scraping, I/O); runs on the scheduler thread
+        process: Consumes what collect returned (model inference, storage)
+        watermark: Maps collected data to a comparable marker; processing is skipped while it is
+            unchanged since the last successful process (None processes every tick)
+        overlap: Run process on a worker thread so the next tick's collect can proceed meanwhile
+            (at most one process is in flight; a tick waits for it before starting another)
+        name: Loop label for metrics and log lines
+    """
+
+    def __init__(self, interval: float, collect: Callable[[], Any], process: Callable[[Any], None],
+                 watermark: Optional[Callable[[Any], Any]] = None, overlap: bool = False, name: str = "loop"):
+        self.interval = interval
+        self.collect = collect
+        self.process = process
+        self.watermark = watermark
+        self.overlap = overlap
+        self.name = name
+        self.ticks = 0
+        self.missed = 0
+        self.idle = 0
+        self._processed_mark = None
+        self._inflight: Optional[threading.Thread] = None
+        self._inflight_result = {}
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Finish the current tick and return from run()"""
+        self._stop.set()
+
+    def _run_process(self, data, mark, started: float, result: dict):
+        try:
+            with LOOP_PHASE_SECONDS.time(loop=self.name, phase="process"):
+                self.process(data)
+        except Exception as e:
+            ITERATIONS.inc(loop=self.name, status="error")
+            result["error"] = e
+            print(f"\n❌ Processing failed: {e}")
+        else:
+            ITERATION_SECONDS.observe(time.perf_counter() - started, loop=self.name)
+            ITERATIONS.inc(loop=self.name, status="ok")
+            LAST_ITERATION.set(time.time(), loop=self.name)
+            result["mark"] = mark
+        write_textfile()
+
+    def _settle(self):
+        """Wait for the in-flight process and adopt its watermark if it succeeded"""
+        if self._inflight is None:
+            return
+        self._inflight.join()
+        if "mark" in self._inflight_result:
+            self._processed_mark = self._inflight_result["mark"]
+        self._inflight = None
+
+    def run_tick(self):
+        """One collect and (unless idle) one process"""
+        self.ticks += 1
+        started = time.perf_counter()
+        try:
+            with LOOP_PHASE_SECONDS.time(loop=self.name, phase="collect"):
+                data = self.collect()
+        except Exception as e:
+            ITERATIONS.inc(loop=self.name, status="error")
+            write_textfile()
+            print(f"\n❌ Collection failed: {e}")
+            return
+
+        # The previous process may still be running; its outcome decides whether this data is new
+        self._settle()
+        mark = self.watermark(data) if self.watermark else None
+        if self.watermark and mark == self._processed_mark:
+            self.idle += 1
+            ITERATIONS.inc(loop=self.name, status="idle")
+            write_textfile()
+            print("💤 No new data since the last run - skipping inference")
+            return
+
+        self._inflight_result = {}
+        if self.overlap:
+            self._inflight = threading.Thread(
+                target=self._run_process, args=(data, mark, started, self._inflight_result),
+                name=f"{self.name}-process", daemon=True
+            )
+            self._inflight.start()
+        else:
+            self._run_process(data, mark, started, self._inflight_result)
+            if "mark" in self._inflight_result:
+                self._processed_mark = mark
+
+    def run(self, max_ticks: Optional[int] = None):
+        """
+        Tick until stop() (or max_ticks ticks)
+        A run that overruns one or more ticks is followed immediately by a single late tick,
+        after which the schedule continues on the original grid
+        """
+        next_tick = time.monotonic()
+        while not self._stop.is_set() and (max_ticks is None or self.ticks < max_ticks):
+            delay = next_tick - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            late = time.monotonic() - next_tick
+            missed = int(late // self.interval) if late > 0 else 0
+            if missed:
+                self.missed += missed
+                TICKS_MISSED.inc(missed, loop=self.name)
+                print(f"⏩ Running {late:.1f}s late - coalescing {missed} missed tick{'s' if missed != 1 else ''}")
+            next_tick += (missed + 1) * self.interval
+
+            self.run_tick()
+            if not self._stop.is_set() and (max_ticks is None or self.ticks < max_ticks):
+                print(f"\n⏰ Next tick in {max(0, next_tick - time.monotonic()):.0f}s...")
+        self._settle()
@@ -6,24 +6,21 @@ import os
 import json
 from typing import List, Dict, Tuple
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from pymongo import MongoClient
-import torch
+from model_registry import EMBEDDING_MODEL, embedding_model, get_device
+from mongo_store import get_collection
+from profiling import configure_from_argv, print_stage_summary, profiling_enabled, stage
 
-# Load model once
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Using device: {device} ({'GPU' if torch.cuda.is_available() else 'CPU'})")
-
-# Initialize model
-MODEL_NAME = "all-MiniLM-L6-v2"  # Lightweight but effective
-model = SentenceTransformer(MODEL_NAME, device=device)
+# torch and sentence-transformers load on the first embedding call, not at import
+MODEL_NAME = EMBEDDING_MODEL  # Lightweight but effective; loaded once per process by the registry
 
 def get_embeddings_for_texts(texts: List[str]) -> np.ndarray:
     """
     Generate embeddings for a list of texts
     Returns numpy array of embeddings
     """
-    embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+    # Per-request path: stays in-process, since spawning encoding_pool workers (each loading
+    # torch and the model) would add seconds to every search; backfills use encoding_pool.py
+    embeddings = embedding_model(get_device()).encode(texts, show_progress_bar=False, convert_to_numpy=True)
     return embeddings
 
 
@@ -62,15 +59,16 @@ def search_similar_documents(
         List of documents with similarity scores
     """
     # Get query embedding
-    query_embedding = get_embeddings_for_texts([query])[0]
+    with stage("query_embedding", items=1):
+        query_embedding = get_embeddings_for_texts([query])[0]
     
-    # Connect to MongoDB
-    client = MongoClient(mongo_uri)
-    db = client["trenddb"]
-    col = db[collection_name]
+    # Shared pooled client (reused across searches in the same process)
+    col = get_collection(mongo_uri, collection_name)
     
     # Get all documents
-    documents = list(col.find({}))
+    with stage("load_documents") as s:
+        documents = list(col.find({}))
+        s.items = len(documents)
     
     if not documents:
         return []
@@ -80,16 +78,18 @@ def search_similar_documents(
     
     # Get embeddings for all documents
     print(f"Computing embeddings for {len(texts)} documents...")
-    embeddings = get_embeddings_for_texts(texts)
-    
-    # Calculate similarities
-    similarities = []
-    for i, doc_embedding in enumerate(embeddings):
-        similarity = cosine_similarity(query_embedding, doc_embedding)
-        similarities.append((documents[i], similarity))
-    
-    # Sort by similarity
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    with stage("document_embeddings", items=len(texts)):
+        embeddings = get_embeddings_for_texts(texts)
+    
+    with stage("rank", items=len(texts)):
+        # Calculate similarities
+        similarities = []
+        for i, doc_embedding in enumerate(embeddings):
+            similarity = cosine_similarity(query_embedding, doc_embedding)
+            similarities.append((documents[i], similarity))
+        
+        # Sort by similarity
+        similarities.sort(key=lambda x: x[1], reverse=True)
     
     # Filter by min_score and return top results
     results = [
@@ -101,8 +101,6 @@ def search_similar_documents(
         if sim >= min_score
     ][:num_results]
     
-    client.close()
-    
     return results
 
 
@@ -137,6 +135,9 @@ def main():
     """
     import sys
     
+    # --profile[=cprofile|sample] writes per-stage collapsed stacks (or set PROFILE_STAGES)
+    sys.argv = configure_from_argv(sys.argv)
+    
     mongo_uri = os.getenv("MONGO_URI", "")
     
     if not mongo_uri:
@@ -185,6 +186,9 @@ def main():
     
     print("\nJSON output:")
     print(json.dumps(output, indent=2, default=str))
+    
+    if profiling_enabled():
+        print_stage_summary(sys.stderr)
 
 
 if __name__ == "__main__":
@@ -3,18 +3,14 @@ Sentiment classifier using TensorFlow Lite model (bert_classifier.tflite)
 Matches the Android app's TextClassifierHelper functionality
 """
 import json
+import os
 import sys
+from importlib.util import find_spec
 from typing import Dict, List, Tuple
 
-# Try to use TensorFlow Lite
-try:
-    import tensorflow as tf
-    import numpy as np
-    TFLITE_AVAILABLE = True
-except ImportError:
-    TFLITE_AVAILABLE = False
-    # Suppress print for API usage
-    # print("Warning: TensorFlow not available, using fallback")
+# Try to use TensorFlow Lite - checked without importing it, since importing tensorflow
+# takes seconds and the keyword fallback (no model file) never needs it
+TFLITE_AVAILABLE = find_spec("tensorflow") is not None and find_spec("numpy") is not None
 
 # Fallback sentiment analysis
 def fallback_sentiment(text: str) -> Tuple[float, float]:
@@ -52,8 +48,9 @@ class SentimentClassifier:
         self.model_path = model_path
         self.interpreter = None
         
-        if TFLITE_AVAILABLE:
+        if TFLITE_AVAILABLE and os.path.exists(model_path):
             try:
+                import tensorflow as tf
                 self.interpreter = tf.lite.Interpreter(model_path=model_path)
                 self.interpreter.allocate_tensors()
                 
@@ -78,6 +75,8 @@ class SentimentClassifier:
             pos, neg = fallback_sentiment(text)
             return {'positive': pos, 'negative': neg}
         
+        import numpy as np
+        
         try:
             # Tokenize and prepare input (simplified - you may need to adjust based on your model)
             # Note: Actual tokenization depends on your tflite model's expected input format
@@ -0,0 +1,150 @@
+"""
+In-process snscrape adapter
+Iterates scraper items lazily instead of shelling out to the snscrape CLI,
+so callers can stop at their limit and never pay interpreter startup per call
+"""
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+
+@functools.lru_cache(maxsize=None)
+def load_sntwitter():
+    """
+    snscrape's Twitter module, imported on first use (None if it cannot be imported)
+    snscrape is optional and has compatibility issues with Python 3.12+
+    """
+    try:
+        import snscrape.modules.twitter as sntwitter
+    except (ImportError, AttributeError):
+        return None
+    return sntwitter
+
+
+class SnscrapeUnavailable(RuntimeError):
+    """snscrape cannot be imported in this interpreter"""
+
+
+def item_to_dict(item) -> Dict:
+    """Normalize a snscrape item (or an already-parsed JSONL dict) to the --jsonl shape"""
+    if isinstance(item, dict):
+        return item
+    user = getattr(item, 'user', None)
+    return {
+        "id": getattr(item, 'id', ''),
+        "rawContent": getattr(item, 'rawContent', None) or getattr(item, 'content', '') or '',
+        "user": {"username": getattr(user, 'username', '')} if user else {},
+        "name": getattr(item, 'name', ''),
+    }
+
+
+class SnscrapeSource:
+    """Live items from snscrape's Twitter scrapers"""
+
+    def __init__(self):
+        self.sntwitter = load_sntwitter()
+        if self.sntwitter is None:
+            raise SnscrapeUnavailable("snscrape is not available (Python 3.12+ compatibility issue)")
+
+    def search(self, query: str) -> Iterable:
+        return self.sntwitter.TwitterSearchScraper(query).get_items()
+
+    def trends(self, location_id: str) -> Iterable:
+        # snscrape's trends scraper has no location parameter; it returns the account's trends
+        return self.sntwitter.TwitterTrendsScraper().get_items()
+
+
+class FakeItemSource:
+    """
+    Replays recorded snscrape --jsonl items in place of the live scrapers
+    Tweets are lines with "rawContent", trends are lines with "name"
+    """
+
+    def __init__(self, path: Optional[str] = None, items: Optional[Iterable[Dict]] = None, delay: float = 0.0):
+        self.path = path
+        self.items = list(items) if items is not None else None
+        self.delay = delay
+
+    def _iter(self) -> Iterator[Dict]:
+        if self.items is not None:
+            lines = iter(self.items)
+        else:
+            lines = (json.loads(line) for line in open(self.path, encoding='utf-8') if line.strip())
+        for item in lines:
+            if self.delay:
+                time.sleep(self.delay)
+            yield item
+
+    def search(self, query: str) -> Iterator[Dict]:
+        return (item for item in self._iter() if item.get('rawContent'))
+
+    def trends(self, location_id: str) -> Iterator[Dict]:
+        return (item for item in self._iter() if item.get('name'))
+
+
+def get_item_source():
+    """FakeItemSource when SNSCRAPE_FAKE_SOURCE points at a JSONL file, live snscrape otherwise"""
+    fake_path = os.getenv("SNSCRAPE_FAKE_SOURCE", "")
+    if fake_path:
+        return FakeItemSource(fake_path)
+    return SnscrapeSource()
+
+
+_DONE = object()
+
+
+def _pump(iterator, limit: int, out: queue.Queue, stop: threading.Event):
+    """Pull up to `limit` items onto `out`, then close the iterator from the thread that ran it"""
+    try:
+        count = 0
+        for item in iterator:
+            out.put(item)
+            count += 1
+            # Stop at the limit-th item, so the scraper never requests another page
+            if count >= limit or stop.is_set():
+                break
+        out.put(_DONE)
+    except BaseException as e:
+        out.put(e)
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
+
+
+def iter_items(items: Iterable, limit: int, timeout: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Yield up to `limit` items as dicts, raising TimeoutError once `timeout` seconds have passed
+    The iterator is consumed on a daemon thread, so the deadline also bounds a
+    scraper that blocks before (or between) yielding items; a timed-out thread is
+    abandoned and stops at its next item
+    """
+    if limit <= 0:
+        return
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    out = queue.Queue()
+    stop = threading.Event()
+    threading.Thread(target=_pump, args=(iter(items), limit, out, stop), name="snscrape-items", daemon=True).start()
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                item = out.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"snscrape exceeded {timeout:.1f}s") from None
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item_to_dict(item)
+    finally:
+        stop.set()
@@ -0,0 +1,56 @@
+"""
+Burst baselines follow post dates and ignore re-scraped posts
+Run with: python -m pytest tests
+"""
+import datetime
+
+from burst_detector import BurstDetector
+
+START = datetime.datetime(2026, 3, 1, 10, 0)
+
+
+def posts(first_id, count, minute, stream="AI", sentiment="POSITIVE"):
+    return [{"tweet_id": str(first_id + i), "posted_at": START + datetime.timedelta(minutes=minute),
+             "stream": stream, "topic_name": f"Label {first_id}", "sentiment": sentiment}
+            for i in range(count)]
+
+
+def test_rescraped_posts_are_observed_once(tmp_path):
+    detector = BurstDetector(str(tmp_path / "state.json"), bucket_seconds=300)
+    batch = posts(0, 10, minute=1)
+    assert detector.observe_posts(batch) == 10
+    assert detector.observe_posts(batch + posts(100, 2, minute=2)) == 2
+    assert detector.status("AI")["count"] == 12
+
+
+def test_volume_follows_post_dates_not_scrape_size(tmp_path):
+    detector = BurstDetector(str(tmp_path / "state.json"), bucket_seconds=300, min_buckets=3)
+    # Steady 5 posts per bucket, each tick re-scraping everything seen so far
+    scraped = []
+    for bucket in range(6):
+        scraped += posts(bucket * 10, 5, minute=bucket * 5)
+        detector.observe_posts(scraped)
+    assert detector.bursts(START + datetime.timedelta(minutes=25)) == []
+
+    scraped += posts(1000, 40, minute=30)
+    detector.observe_posts(scraped)
+    (burst,) = detector.bursts(START + datetime.timedelta(minutes=30))
+    assert burst["topic"] == "AI" and burst["count"] == 40 and "volume" in burst["reasons"]
+
+
+def test_baselines_are_keyed_by_stream_and_persist(tmp_path):
+    path = str(tmp_path / "state.json")
+    detector = BurstDetector(path, bucket_seconds=300)
+    detector.observe_posts(posts(0, 3, minute=1))
+    detector.save()
+
+    reloaded = BurstDetector(path, bucket_seconds=300)
+    # A refit relabels the topic, but the stream key (and the seen posts) carry over
+    assert reloaded.observe_posts(posts(0, 3, minute=1)) == 0
+    assert list(reloaded.topics) == ["AI"]
+
+
+def test_posts_older_than_the_seen_window_are_skipped(tmp_path):
+    detector = BurstDetector(str(tmp_path / "state.json"), bucket_seconds=300, seen_seconds=600)
+    detector.observe_posts(posts(0, 1, minute=60))
+    assert detector.observe_posts(posts(10, 1, minute=0)) == 0
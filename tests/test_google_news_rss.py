@@ -0,0 +1,83 @@
+"""
+Google News RSS parsing over the recorded benchmark feed
+Run with: python -m pytest tests
+"""
+import os
+
+from google_news_rss import fetch_rss_items, parse_rss_items
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "google_news_rss.xml")
+
+
+def chunks(size=1024):
+    with open(FIXTURE, 'rb') as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def test_publisher_suffix_is_stripped_from_title_and_description():
+    first = next(parse_rss_items(chunks()))
+    assert first == {
+        "title": "Crisis energy crisis crisis vaccine health ai vaccine reform",
+        "url": "https://news.google.com/rss/articles/CBMi0000xyz?oc=5",
+        "published": "Mon, 20 Oct 2025 00:15:00 GMT",
+        "publisher": "Reuters",
+        "description": "Crisis energy crisis crisis vaccine health ai vaccine reform"
+    }
+
+
+def test_item_without_source_keeps_its_title():
+    items = list(parse_rss_items(chunks()))
+    assert len(items) == 61
+    assert items[-1]["publisher"] == ""
+    assert items[-1]["title"] == "Monsoon session opens with budget debate - Press Wire"
+
+
+def test_max_items_stops_reading_the_feed():
+    read = []
+
+    def counted():
+        for chunk in chunks():
+            read.append(chunk)
+            yield chunk
+
+    items = list(parse_rss_items(counted(), max_items=3))
+    assert [item["url"] for item in items] == [
+        f"https://news.google.com/rss/articles/CBMi000{i}xyz?oc=5" for i in range(3)]
+    assert len(read) < os.path.getsize(FIXTURE) // 1024
+
+
+class StreamedResponse:
+    def __init__(self):
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        return chunks(chunk_size)
+
+    def close(self):
+        self.closed = True
+
+
+class Session:
+    def __init__(self):
+        self.response = StreamedResponse()
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        return self.response
+
+
+def test_fetch_streams_the_feed_and_closes_it_after_max_items():
+    session = Session()
+    items = list(fetch_rss_items(session, "india", max_items=2, chunk_size=1024))
+    assert len(items) == 2
+    assert session.calls[0][1]["stream"] is True
+    assert session.response.closed
@@ -0,0 +1,125 @@
+"""
+mongo_store bulk-write and retry paths against mongomock
+Run with: python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("pymongo")
+mongomock = pytest.importorskip("mongomock")
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import AutoReconnect
+
+import mongo_store
+from mongo_store import bulk_insert, bulk_write, insert_op, replace_op, update_op
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().trenddb.posts
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(mongo_store.time, "sleep", lambda seconds: None)
+
+
+class FlakyCollection:
+    """Wraps a mongomock collection; the first call lands part of the batch, then drops the connection"""
+
+    def __init__(self, collection, land=0):
+        self._collection = collection
+        self.name = collection.name
+        self.land = land
+        self.calls = 0
+
+    def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.calls == 1:
+            if self.land:
+                self._collection.insert_many(documents[:self.land])
+            raise AutoReconnect("connection reset")
+        return self._collection.insert_many(documents, ordered=ordered)
+
+
+class RecordingCollection:
+    """Stands in for a server collection: records bulk_write requests, failing the first call"""
+    name = "posts"
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+
+    def bulk_write(self, requests, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        self.requests.append(requests)
+
+        class Result:
+            inserted_count = sum(isinstance(r, InsertOne) for r in requests)
+            matched_count = modified_count = sum(isinstance(r, UpdateOne) for r in requests)
+            upserted_count = 0
+        return Result()
+
+
+def test_bulk_insert_batches_and_assigns_ids(collection):
+    documents = [{"text": f"post {i}"} for i in range(25)]
+    assert bulk_insert(collection, documents, batch_size=10) == 25
+    assert collection.count_documents({}) == 25
+    assert all("_id" in doc for doc in documents)
+
+
+def test_bulk_insert_retry_counts_documents_that_landed_before_the_failure(collection):
+    flaky = FlakyCollection(collection, land=4)
+    assert bulk_insert(flaky, [{"text": f"post {i}"} for i in range(10)]) == 10
+    assert flaky.calls == 2
+    assert collection.count_documents({}) == 10
+
+
+def test_bulk_insert_does_not_count_existing_duplicates(collection):
+    collection.insert_one({"_id": "a"})
+    assert bulk_insert(collection, [{"_id": "a"}, {"_id": "b"}]) == 1
+
+
+def test_bulk_insert_gives_up_after_retries(collection):
+    class Down:
+        name = "posts"
+
+        def insert_many(self, documents, ordered=True):
+            raise AutoReconnect("down")
+
+    with pytest.raises(AutoReconnect):
+        bulk_insert(Down(), [{"text": "x"}], retries=2)
+
+
+def test_bulk_write_applies_records_serially_on_memory_collections(collection):
+    totals = bulk_write(collection, [
+        insert_op({"_id": 1, "count": 1}),
+        update_op({"_id": 1}, {"$inc": {"count": 2}}),
+        update_op({"_id": 2}, {"$inc": {"count": 1}}, upsert=True),
+        replace_op({"_id": 3}, {"count": 7}, upsert=True),
+    ], batch_size=3)
+    assert totals == {"inserted": 1, "matched": 1, "modified": 1, "upserted": 2}
+    assert collection.find_one({"_id": 1})["count"] == 3
+    assert collection.find_one({"_id": 3})["count"] == 7
+
+
+def test_bulk_write_sends_pymongo_requests_and_retries():
+    server = RecordingCollection(failures=1)
+    totals = bulk_write(server, [insert_op({"_id": 1}), update_op({"_id": 1}, {"$set": {"x": 1}})])
+    assert totals == {"inserted": 1, "matched": 1, "modified": 1, "upserted": 0}
+    assert [type(r) for r in server.requests[0]] == [InsertOne, UpdateOne]
+
+
+def test_bulk_write_does_not_resend_non_idempotent_batches():
+    server = RecordingCollection(failures=1)
+    with pytest.raises(AutoReconnect):
+        bulk_write(server, [update_op({"_id": 1}, {"$inc": {"count": 1}}, upsert=True)])
+    assert server.requests == []
+
+
+def test_memory_uri_shares_one_client():
+    first = mongo_store.get_collection("memory://tests", "posts")
+    assert mongo_store.get_collection("memory://tests", "posts").database.client is first.database.client
+    assert "timestamp_-1" in first.index_information()
@@ -0,0 +1,63 @@
+"""
+Rollups are bucketed by post date and count each post once across re-scrapes
+Run with: python -m pytest tests
+"""
+import datetime
+import uuid
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("mongomock")
+
+import rollups
+from rollups import read_rollups, update_rollups
+
+
+@pytest.fixture
+def mongo_uri():
+    return f"memory://{uuid.uuid4().hex}"
+
+
+def post(tweet_id, posted_at, sentiment="POSITIVE", text="post"):
+    return {"tweet_id": tweet_id, "posted_at": posted_at, "text": text, "topic_name": "AI",
+            "sentiment": sentiment, "score": 0.9, "url": "", "timestamp": datetime.datetime(2030, 1, 1)}
+
+
+def test_rescraped_posts_are_counted_once(mongo_uri):
+    posted = datetime.datetime(2026, 3, 1, 10, 15)
+    batch = [post("1", posted), post("2", posted, "NEGATIVE")]
+    assert update_rollups(batch, mongo_uri)["counted"] == 2
+    # The next tick re-scrapes the same tweets plus one new one
+    assert update_rollups(batch + [post("3", posted)], mongo_uri)["counted"] == 1
+
+    (hour,) = read_rollups(mongo_uri, "hour")
+    assert hour["count"] == 3
+    assert hour["sentiments"] == {"POSITIVE": 2, "NEGATIVE": 1, "NEUTRAL": 0}
+
+
+def test_posts_are_bucketed_by_their_own_date(mongo_uri):
+    update_rollups([post("1", datetime.datetime(2026, 3, 1, 10, 15)),
+                    post("2", datetime.datetime(2026, 3, 1, 12, 5))], mongo_uri)
+    buckets = [doc["bucket"] for doc in read_rollups(mongo_uri, "hour")]
+    assert buckets == [datetime.datetime(2026, 3, 1, 10), datetime.datetime(2026, 3, 1, 12)]
+
+
+def test_posts_without_ids_keep_repeated_texts_within_a_batch(mongo_uri):
+    batch = [{"text": "same", "sentiment": "NEUTRAL", "topic_name": "AI"}] * 2
+    assert update_rollups(batch, mongo_uri)["counted"] == 2
+    assert update_rollups(batch, mongo_uri)["counted"] == 0
+
+
+def test_posts_are_counted_on_the_next_batch_when_the_rollup_write_fails(mongo_uri, monkeypatch):
+    def fail(collection, operations):
+        raise RuntimeError("write failed")
+
+    batch = [post("1", datetime.datetime(2026, 3, 1, 10, 15))]
+    with monkeypatch.context() as patch:
+        patch.setattr(rollups, "bulk_write", fail)
+        with pytest.raises(RuntimeError):
+            update_rollups(batch, mongo_uri)
+    assert update_rollups(batch, mongo_uri)["counted"] == 1
+    (hour,) = read_rollups(mongo_uri, "hour")
+    assert hour["count"] == 1
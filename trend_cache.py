@@ -0,0 +1,145 @@
+"""
+Shared trend lookup cache
+SQLite-backed TTL cache with stale-while-revalidate and cross-process
+single-flight, so a burst of identical fetch_trends.py calls costs one fetch
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.getenv("TRENDS_CACHE_PATH", ".trend_cache.sqlite")
+
+
+class TrendCache:
+    """
+    Cross-process cache of JSON-serializable results
+
+    Args:
+        path: SQLite database file shared by every process
+        ttl: Seconds a result is served as fresh
+        stale_ttl: Further seconds a result may be served while it is refreshed
+        lease: Seconds an in-flight fetch may hold a key before others take over
+        poll_interval: How often followers check for the leader's result
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 60, stale_ttl: float = 600,
+                 lease: float = 30, poll_interval: float = 0.05):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "fresh_until REAL NOT NULL, stale_until REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS inflight (key TEXT PRIMARY KEY, owner TEXT, lease_until REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[str], float]:
+        """Return (value, 'fresh' | 'stale' | None, stored_at)"""
+        row = self._conn.execute(
+            "SELECT value, stored_at, fresh_until, stale_until FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None, None, 0.0
+        value, stored_at, fresh_until, stale_until = row
+        now = time.time()
+        if now < fresh_until:
+            return json.loads(value), "fresh", stored_at
+        if now < stale_until:
+            return json.loads(value), "stale", stored_at
+        return None, None, stored_at
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(value, default=str), now, now + self.ttl, now + self.ttl + self.stale_ttl)
+        )
+
+    def try_acquire(self, key: str) -> Optional[str]:
+        """
+        Become the single in-flight fetcher for a key (or take over an expired lease)
+
+        Returns:
+            The lease's owner token, needed to release it, or None if another fetcher holds the key
+        """
+        now = time.time()
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        # The connection commits on success and rolls back on error without masking it
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT lease_until FROM inflight WHERE key = ?", (key,)).fetchone()
+            if row and row[0] > now:
+                return None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO inflight VALUES (?, ?, ?)", (key, owner, now + self.lease)
+            )
+        return owner
+
+    def release(self, key: str, owner: str):
+        """Drop the lease only if it is still ours, never a holder that took over after it expired"""
+        self._conn.execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, owner))
+
+    def fetch_and_store(self, key: str, fetch: Callable[[], Any], owner: str) -> Any:
+        """Run fetch as the lease holder, store the result and release the lease"""
+        try:
+            value = fetch()
+            self.put(key, value)
+            return value
+        finally:
+            self.release(key, owner)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any],
+                     revalidate: Optional[Callable[[str, str], None]] = None) -> Tuple[Any, str]:
+        """
+        Serve a key from cache, fetching it at most once across processes
+
+        Args:
+            key: Cache key
+            fetch: Produces the value when this process is the leader
+            revalidate: Called with the key and lease owner token to refresh a
+                        stale entry in the background; without it the stale
+                        entry is refreshed inline
+
+        Returns:
+            (value, status) where status is 'hit', 'stale', 'fetched' or 'coalesced'
+        """
+        value, state, stored_at = self.get(key)
+        if state == "fresh":
+            return value, "hit"
+
+        if state == "stale":
+            owner = self.try_acquire(key)
+            if owner:
+                if revalidate is None:
+                    return self.fetch_and_store(key, fetch, owner), "fetched"
+                revalidate(key, owner)
+            return value, "stale"
+
+        # Miss: one leader fetches, everyone else waits for its result
+        while True:
+            owner = self.try_acquire(key)
+            if owner:
+                return self.fetch_and_store(key, fetch, owner), "fetched"
+
+            while True:
+                time.sleep(self.poll_interval)
+                value, state, new_stored_at = self.get(key)
+                if state and new_stored_at > stored_at:
+                    return value, "coalesced"
+                row = self._conn.execute("SELECT lease_until FROM inflight WHERE key = ?", (key,)).fetchone()
+                if not row or row[0] <= time.time():
+                    # Leader finished without storing or died - try to lead ourselves
+                    break
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,223 @@
+"""
+Incremental Location Trend Poller
+Polls Twitter trends for a location, diffs each fetch against the previous one
+and persists only the deltas (plus periodic checkpoints), so clients can ask
+"what changed since version N" instead of re-downloading the full list
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fetch_trends import fetch_twitter_trending_by_location
+from metrics import ITERATIONS, ITERATION_SECONDS, LAST_ITERATION, start_exporter, write_textfile
+
+DEFAULT_STATE_DIR = os.getenv("TREND_POLLER_DIR", ".trend_poller")
+
+
+def diff_trends(previous: List[str], current: List[str]) -> Dict:
+    """Adds, removes and rank changes between two ranked trend lists (ranks are 1-based)"""
+    old_rank = {name: i + 1 for i, name in enumerate(previous)}
+    new_rank = {name: i + 1 for i, name in enumerate(current)}
+    return {
+        "added": [{"text": name, "rank": rank} for name, rank in new_rank.items() if name not in old_rank],
+        "removed": [{"text": name, "rank": rank} for name, rank in old_rank.items() if name not in new_rank],
+        "moved": [
+            {"text": name, "from": old_rank[name], "to": rank}
+            for name, rank in new_rank.items()
+            if name in old_rank and old_rank[name] != rank
+        ]
+    }
+
+
+def apply_delta(previous: List[str], delta: Dict) -> List[str]:
+    """Rebuild the ranked list a delta was computed against"""
+    removed = {item["text"] for item in delta["removed"]}
+    placed = {item["rank"]: item["text"] for item in delta["added"]}
+    placed.update({item["to"]: item["text"] for item in delta["moved"]})
+    moved = {item["text"] for item in delta["moved"]}
+
+    size = len(previous) - len(removed) + len(delta["added"])
+    current = [None] * size
+    for rank, name in placed.items():
+        current[rank - 1] = name
+    # Unchanged trends keep their rank
+    for i, name in enumerate(previous):
+        if name not in removed and name not in moved:
+            current[i] = name
+    return current
+
+
+class LocationTrendPoller:
+    """
+    Versioned trend list for one location
+
+    Args:
+        location: Location name understood by fetch_twitter_trending_by_location
+        state_dir: Directory for <location>.deltas.jsonl and <location>.checkpoint.json
+        limit: Number of trends fetched per poll
+        checkpoint_every: Write a full checkpoint every N versions
+        retain_deltas: Deltas kept after a checkpoint (older clients get a full snapshot)
+        fetch: Trend fetcher (location, limit) -> list of trend dicts
+    """
+
+    def __init__(self, location: str = "India", state_dir: str = DEFAULT_STATE_DIR, limit: int = 20,
+                 checkpoint_every: int = 20, retain_deltas: int = 200,
+                 fetch: Callable[..., List[Dict]] = fetch_twitter_trending_by_location):
+        self.location = location
+        self.limit = limit
+        self.checkpoint_every = checkpoint_every
+        self.retain_deltas = retain_deltas
+        self.fetch = fetch
+        os.makedirs(state_dir, exist_ok=True)
+        slug = location.lower().replace(' ', '_')
+        self.delta_path = os.path.join(state_dir, f"{slug}.deltas.jsonl")
+        self.checkpoint_path = os.path.join(state_dir, f"{slug}.checkpoint.json")
+
+        self.version = 0
+        self.trends: List[str] = []
+        self.details: Dict[str, Dict] = {}
+        self.deltas: List[Dict] = []
+        self.load()
+
+    def load(self):
+        """Restore the latest checkpoint and replay the deltas written after it"""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self.version = checkpoint["version"]
+            self.trends = checkpoint["trends"]
+            self.details = checkpoint["details"]
+
+        self.deltas = []
+        if os.path.exists(self.delta_path):
+            with open(self.delta_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        delta = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written last line
+                    self.deltas.append(delta)
+                    if delta["version"] > self.version:
+                        self.trends = apply_delta(self.trends, delta)
+                        self.details.update(delta.get("details", {}))
+                        self.version = delta["version"]
+
+    def _write_checkpoint(self):
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.version, "trends": self.trends, "details": self.details}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+        # Compact the delta log to what "since" queries still need
+        self.deltas = self.deltas[-self.retain_deltas:]
+        tmp = f"{self.delta_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for delta in self.deltas:
+                f.write(json.dumps(delta) + '\n')
+        os.replace(tmp, self.delta_path)
+
+    def poll_once(self) -> Optional[Dict]:
+        """Fetch the current trends; record and return a delta if anything changed"""
+        fetched = self.fetch(self.location, limit=self.limit)
+        if not fetched:
+            return None  # Source failure - keep the last known list rather than "removing" everything
+
+        current = []
+        for trend in fetched:
+            if trend["text"] not in current:
+                current.append(trend["text"])
+        delta = diff_trends(self.trends, current)
+        if not (delta["added"] or delta["removed"] or delta["moved"]):
+            return None
+
+        self.version += 1
+        delta["version"] = self.version
+        delta["timestamp"] = datetime.utcnow().isoformat()
+        delta["details"] = {item["text"]: next(t for t in fetched if t["text"] == item["text"]) for item in delta["added"]}
+
+        with open(self.delta_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(delta) + '\n')
+        self.deltas.append(delta)
+        self.trends = current
+        self.details = {name: self.details.get(name) or delta["details"].get(name) for name in current}
+
+        if self.version % self.checkpoint_every == 0:
+            self._write_checkpoint()
+        return delta
+
+    def snapshot(self) -> Dict:
+        return {
+            "location": self.location,
+            "version": self.version,
+            "full": True,
+            "trends": [dict(self.details.get(name) or {"text": name}, rank=i + 1) for i, name in enumerate(self.trends)]
+        }
+
+    def changes_since(self, version: int) -> Dict:
+        """Deltas after `version`, or a full snapshot if they are no longer retained"""
+        if version == self.version:
+            return {"location": self.location, "version": self.version, "full": False, "changes": []}
+
+        oldest = self.deltas[0]["version"] if self.deltas else self.version + 1
+        if version > self.version or version < oldest - 1:
+            return self.snapshot()
+
+        changes = []
+        for delta in self.deltas:
+            if delta["version"] <= version:
+                continue
+            change = {k: v for k, v in delta.items() if k != "details"}
+            # Added trends carry their full details so the client can render them
+            change["added"] = [dict(delta["details"].get(item["text"], {}), **item) for item in delta["added"]]
+            changes.append(change)
+
+        return {"location": self.location, "version": self.version, "full": False, "changes": changes}
+
+    def run(self, interval: float = 120):
+        """Poll forever (one poller process per location)"""
+        print(f"📡 Polling {self.location} trends every {interval}s (version {self.version})", file=sys.stderr)
+        start_exporter()
+        while True:
+            try:
+                with ITERATION_SECONDS.time(loop="trend_poller"):
+                    delta = self.poll_once()
+                if delta:
+                    print(f"v{delta['version']}: +{len(delta['added'])} -{len(delta['removed'])} ~{len(delta['moved'])}", file=sys.stderr)
+                ITERATIONS.inc(loop="trend_poller", status="ok")
+                LAST_ITERATION.set(time.time(), loop="trend_poller")
+            except Exception as e:
+                ITERATIONS.inc(loop="trend_poller", status="error")
+                print(f"❌ Poll failed: {e}", file=sys.stderr)
+            write_textfile()
+            time.sleep(interval)
+
+
+def main():
+    """
+    Usage: python trend_poller.py [location] [--interval SECONDS]   run the polling daemon
+           python trend_poller.py [location] --since VERSION        print changes since VERSION
+           python trend_poller.py [location] --once                 poll once and print the delta
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental location trend poller")
+    parser.add_argument('location', nargs='?', default="India")
+    parser.add_argument('--interval', type=float, default=120)
+    parser.add_argument('--since', type=int, default=None)
+    parser.add_argument('--once', action='store_true')
+    args = parser.parse_args()
+
+    poller = LocationTrendPoller(args.location)
+    if args.since is not None:
+        sys.stdout.write(json.dumps(poller.changes_since(args.since)) + '\n')
+    elif args.once:
+        sys.stdout.write(json.dumps(poller.poll_once() or {"version": poller.version, "changes": []}) + '\n')
+    else:
+        poller.run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Persistent visited-URL filter
+Memory-bounded Bloom filter backed by an mmap'd file, with URL canonicalization
+so the scraper can dedupe URLs in O(1) across restarts
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# File layout: magic, number of bits, number of hash functions, approximate item count
+HEADER_FORMAT = '<8sQQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b'URLBLOOM'
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'ocid', 'cmpid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'igshid'}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings map to the same key
+    Lowercases scheme/host, drops default ports, fragments and tracking params,
+    sorts the query string and strips trailing slashes
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ''))
+
+
+def optimal_parameters(capacity: int, error_rate: float):
+    """Return (num_bits, num_hashes) for the target capacity and false-positive rate"""
+    num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class PersistentBloomFilter:
+    """
+    Fixed-size Bloom filter of canonical URLs
+
+    Args:
+        path: File backing the bit array (in-memory only if None). An existing
+              file keeps the parameters it was created with.
+        capacity: Expected number of distinct URLs
+        error_rate: Target false-positive rate at capacity
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.path = path
+        self._file = None
+
+        if path and os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self._file = open(path, 'r+b')
+            self._bits = mmap.mmap(self._file.fileno(), 0)
+            magic, self.num_bits, self.num_hashes, self.count = struct.unpack_from(HEADER_FORMAT, self._bits, 0)
+            if magic != MAGIC:
+                self.close()
+                raise ValueError(f"{path} is not a URL filter file")
+            return
+
+        self.num_bits, self.num_hashes = optimal_parameters(capacity, error_rate)
+        self.count = 0
+        size = HEADER_SIZE + (self.num_bits + 7) // 8
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'w+b')
+            self._file.truncate(size)
+            self._bits = mmap.mmap(self._file.fileno(), size)
+        else:
+            self._bits = bytearray(size)
+        self._write_header()
+
+    def _write_header(self):
+        struct.pack_into(HEADER_FORMAT, self._bits, 0, MAGIC, self.num_bits, self.num_hashes, self.count)
+
+    def _positions(self, url: str):
+        """Bit positions for a URL using double hashing over one blake2b digest"""
+        digest = hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, url: str) -> bool:
+        bits = self._bits
+        return all(bits[HEADER_SIZE + (pos >> 3)] & (1 << (pos & 7)) for pos in self._positions(url))
+
+    def add(self, url: str) -> bool:
+        """Mark a URL as visited. Returns True if it was (probably) not seen before."""
+        bits = self._bits
+        added = False
+        for pos in self._positions(url):
+            index = HEADER_SIZE + (pos >> 3)
+            mask = 1 << (pos & 7)
+            if not bits[index] & mask:
+                bits[index] |= mask
+                added = True
+        if added:
+            self.count += 1
+            self._write_header()
+        return added
+
+    def __len__(self) -> int:
+        return self.count
+
+    def estimated_false_positive_rate(self) -> float:
+        """False-positive rate at the current fill level"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def flush(self):
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.flush()
+
+    def close(self):
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.flush()
+            self._bits.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()